@@ -354,10 +354,41 @@ def write_name(name, path='leaderboard.txt'):
     print(name)
 
 
+def load_font(name, size, cache_path='font_cache.txt'):
+    """
+    Loads a system font. Searching system fonts is slow, so the found font file is saved to cache file
+    and used on next starts
+    :param name: name of the font
+    :param size: size of the font
+    :param cache_path: path to cache file
+    :return: pygame font
+    """
+    if exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                cached_name, font_path = f.read().split('\n', 1)
+        except (IOError, ValueError):
+            # a truncated or broken cache is ignored, the font is searched again and the cache is rewritten
+            cached_name, font_path = None, None
+        if cached_name == name and (not font_path or exists(font_path)):
+            return pg.font.Font(font_path or None, size)
+
+    font_path = pg.font.match_font(name)
+    try:
+        with open(cache_path, 'w') as f:
+            f.write(f'{name}\n{font_path or ""}')
+    except IOError:
+        print('Unable to write font cache')
+
+    return pg.font.Font(font_path, size)
+
+
 def main():
     global FONT, time_left
-    pg.init()
-    FONT = pg.font.SysFont("Comic Sans MS", 46)
+    # only modules that are used are initialized, pg.init would also start audio, joystick and others
+    pg.display.init()
+    pg.font.init()
+    FONT = load_font("Comic Sans MS", 46)
 
     fps = 50
     screen = pg.display.set_mode((1200, 900))
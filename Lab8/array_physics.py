@@ -0,0 +1,429 @@
+import numpy as np
+
+
+class ArrayPhysics:
+    """
+    Physics backend that keeps state of physical objects in contiguous NumPy arrays and processes
+    integration, border collisions and collision detection as whole-array operations.
+    Physical objects added to it become thin handles: their pos and velocity are read from and written to the arrays
+    """
+    initial_capacity = 64
+
+    def __init__(self, x_border, y_border):
+        """
+        ArrayPhysics constructor
+        :param x_border: tuple (min x, max x) of game borders
+        :param y_border: tuple (min y, max y) of game borders
+        """
+        self.x_border = x_border
+        self.y_border = y_border
+
+        self.count = 0
+        self.objects = []
+
+        capacity = ArrayPhysics.initial_capacity
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.acceleration = np.zeros((capacity, 2))
+        self.drag = np.zeros(capacity)
+        self.radius = np.zeros(capacity)
+        self.energy_conserved = np.ones(capacity)
+        self.collides_with_borders = np.zeros(capacity, dtype=bool)
+        self.continuous = np.zeros(capacity, dtype=bool)
+        self.bounces = np.zeros(capacity, dtype=np.int64)
+        self.sleeping = np.zeros(capacity, dtype=bool)
+        self.frozen = np.zeros(capacity, dtype=bool)
+        self.slow_ticks = np.zeros(capacity, dtype=np.int64)
+        self.collision_layer = np.zeros(capacity, dtype=np.int64)
+        self.collision_mask = np.zeros(capacity, dtype=np.int64)
+
+    def _arrays(self):
+        return ('pos', 'prev_pos', 'velocity', 'acceleration', 'drag', 'radius', 'energy_conserved',
+                'collides_with_borders', 'continuous', 'bounces', 'sleeping', 'frozen', 'slow_ticks',
+                'collision_layer', 'collision_mask')
+
+    def _grow(self):
+        """
+        Doubles capacity of all arrays
+        """
+        for name in self._arrays():
+            array = getattr(self, name)
+            new_array = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+            new_array[:self.count] = array[:self.count]
+            setattr(self, name, new_array)
+
+    def add(self, ph_object):
+        """
+        Moves state of a physical object into arrays and makes the object a handle into them
+        :param ph_object: a physical object to add
+        """
+        if self.count == len(self.radius):
+            self._grow()
+
+        slot = self.count
+        acceleration, drag = ph_object.integration_parameters()
+        self.pos[slot] = tuple(ph_object.pos)
+        self.prev_pos[slot] = ph_object.prev_pos
+        self.velocity[slot] = tuple(ph_object.velocity)
+        self.acceleration[slot] = tuple(acceleration)
+        self.drag[slot] = drag
+        self.radius[slot] = ph_object.radius
+        self.energy_conserved[slot] = ph_object.energy_conserved
+        self.collides_with_borders[slot] = ph_object.collides_with_borders
+        self.continuous[slot] = ph_object.continuous_collision
+        self.bounces[slot] = ph_object.bounces
+        self.sleeping[slot] = ph_object.is_sleeping
+        self.frozen[slot] = ph_object.is_frozen
+        self.slow_ticks[slot] = ph_object.slow_ticks
+        self.collision_layer[slot] = ph_object.collision_layer
+        self.collision_mask[slot] = ph_object.collision_mask
+
+        self.objects.append(ph_object)
+        self.count += 1
+        ph_object.attach_arrays(self, slot)
+
+    def add_many(self, ph_objects, state):
+        """
+        Adds physical objects at once with state given as arrays, e.g. from a snapshot, instead of reading it
+        from every object
+        :param ph_objects: list of physical objects to add
+        :param state: dictionary {array name: values of the objects} with all arrays of the backend
+        """
+        start, end = self.count, self.count + len(ph_objects)
+        while end > len(self.radius):
+            self._grow()
+
+        for name in self._arrays():
+            getattr(self, name)[start:end] = state[name]
+
+        self.objects.extend(ph_objects)
+        self.count = end
+        for slot, ph_object in enumerate(ph_objects, start):
+            ph_object.attach_arrays(self, slot)
+
+    def remove(self, ph_object):
+        """
+        Removes a physical object from arrays by moving the last object into its slot.
+        The object gets its state back and stops being a handle
+        :param ph_object: a physical object to remove
+        :return: True if object was removed, False if it didn't belong to arrays
+        """
+        if ph_object.arrays is not self:
+            return False
+
+        slot = ph_object.slot
+        ph_object.detach_arrays()
+
+        last = self.count - 1
+        if slot != last:
+            for name in self._arrays():
+                array = getattr(self, name)
+                array[slot] = array[last]
+            moved = self.objects[last]
+            self.objects[slot] = moved
+            moved.slot = slot
+
+        self.objects.pop()
+        self.count -= 1
+        return True
+
+    def remember_positions(self):
+        """
+        Saves current positions of all objects as previous ones
+        """
+        self.prev_pos[:self.count] = self.pos[:self.count]
+
+    def integrate(self, dt):
+        """
+        Moves all awake objects with their velocities and applies acceleration and air drag.
+        Objects with continuous collision that passed through borders are bounced back
+        :param dt: time step
+        """
+        n = self.count
+        pos, velocity = self.pos[:n], self.velocity[:n]
+        awake = ~self.sleeping[:n, np.newaxis]
+
+        pos += velocity * (dt * awake)
+        velocity += (self.acceleration[:n] - velocity * self.drag[:n, np.newaxis]) * (dt * awake)
+
+        self.reflect_from_borders()
+
+    def reflect_from_borders(self):
+        """
+        Moves objects with continuous collision that passed through borders back inside, as if they bounced off
+        the border at the moment of impact
+        """
+        n = self.count
+        mask = self.continuous[:n] & self.collides_with_borders[:n]
+        if not mask.any():
+            return
+
+        radius = self.radius[:n]
+        passed = np.zeros(n, dtype=bool)
+        hit = np.zeros(n, dtype=bool)
+        flips = []
+        for axis, (min_border, max_border) in enumerate((self.x_border, self.y_border)):
+            coordinate, velocity = self.pos[:n, axis], self.velocity[:n, axis]
+            low, high = min_border + radius, max_border - radius
+            below, above = mask & (coordinate < low), mask & (coordinate > high)
+
+            outward = (below & (velocity < 0)) | (above & (velocity > 0))
+            flips.append(outward)
+            hit |= outward
+            passed |= below | above
+
+            reflected = np.where(below, 2 * low - coordinate, np.where(above, 2 * high - coordinate, coordinate))
+            coordinate[:] = np.clip(reflected, low, np.maximum(low, high))
+
+        if not hit.any():
+            return
+
+        self.bounces[:n] += hit
+        factor = np.where(hit, np.sqrt(self.energy_conserved[:n]), 1.0)
+        for axis, flip in enumerate(flips):
+            self.velocity[:n, axis] *= np.where(flip, -factor, factor)
+
+    def update_sleep(self, sleep_speed, sleep_ticks, floor_distance):
+        """
+        Puts objects to sleep if they have been slower than sleep_speed for sleep_ticks ticks.
+        Objects pulled down by gravity are counted as slow only on the floor
+        :param sleep_speed: speed below which object is considered slow
+        :param sleep_ticks: number of slow ticks required to fall asleep
+        :param floor_distance: distance to the bottom border at which an object lies on the floor
+        """
+        n = self.count
+        velocity = self.velocity[:n]
+        on_floor = self.pos[:n, 1] >= self.y_border[1] - self.radius[:n] - floor_distance
+        supported = (self.acceleration[:n, 1] <= 0) | on_floor
+        slow = ((velocity * velocity).sum(axis=1) < sleep_speed ** 2) & supported
+        slow_ticks = self.slow_ticks[:n]
+        slow_ticks[:] = np.where(slow, slow_ticks + 1, 0)
+
+        falling_asleep = (slow_ticks >= sleep_ticks) & ~self.sleeping[:n]
+        self.sleeping[:n] |= falling_asleep
+        velocity[falling_asleep] = 0
+
+    def wake(self, slots):
+        """
+        Wakes objects up
+        :param slots: slot index or array of slot indices
+        """
+        self.sleeping[slots] = False
+        self.slow_ticks[slots] = 0
+
+    def freeze_far(self, center, radius):
+        """
+        Freezes objects farther than radius from center and unfreezes the others.
+        Frozen objects are kept asleep with their velocities
+        :param center: tuple (x, y) of the centre
+        :param radius: distance from the centre
+        """
+        n = self.count
+        delta = self.pos[:n] - center
+        far = (delta * delta).sum(axis=1) > radius * radius
+        frozen = self.frozen[:n]
+        self.wake(np.flatnonzero(frozen & ~far))
+        frozen[:] = far
+        self.sleeping[:n] |= far
+
+    def collide_with_borders(self):
+        """
+        Reflects objects that move through game borders. Speed is reduced according to energy conservation factor
+        """
+        n = self.count
+        x, y = self.pos[:n, 0], self.pos[:n, 1]
+        v_x, v_y = self.velocity[:n, 0], self.velocity[:n, 1]
+        radius = self.radius[:n]
+        collides = self.collides_with_borders[:n]
+        min_x, max_x = self.x_border
+        min_y, max_y = self.y_border
+
+        hit_x = collides & (((x <= min_x + radius) & (v_x < 0)) | ((x >= max_x - radius) & (v_x > 0)))
+        hit_y = collides & (((y <= min_y + radius) & (v_y < 0)) | ((y >= max_y - radius) & (v_y > 0)))
+        hit = hit_x | hit_y
+        if not hit.any():
+            return
+
+        self.bounces[:n] += hit
+        factor = np.where(hit, np.sqrt(self.energy_conserved[:n]), 1.0)
+        v_x *= np.where(hit_x, -factor, factor)
+        v_y *= np.where(hit_y, -factor, factor)
+
+    @staticmethod
+    def _expand_ranges(owners, starts, counts):
+        """
+        Expands ranges [start, start + count) into flat arrays of (owner, index) pairs
+        """
+        total = counts.sum()
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+
+        first = np.repeat(owners, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = np.repeat(starts, counts) + offsets
+        return first, second
+
+    @classmethod
+    def _pairs_inside(cls, slots, keys, row):
+        """
+        Finds pairs of slots in the same or adjacent cells. Only half of the neighbouring cells are visited,
+        so each pair is found once
+        :param slots: array of slots
+        :param keys: cell keys of all slots
+        :param row: difference of keys of cells adjacent by x
+        :return: tuple (i, j) of arrays of slots
+        """
+        order = slots[np.argsort(keys[slots], kind='stable')]
+        sorted_keys = keys[order]
+        positions = np.arange(len(order))
+
+        # pairs inside the same cell
+        cell_end = np.searchsorted(sorted_keys, sorted_keys, side='right')
+        first = [positions]
+        second = [positions + 1]
+        counts = [cell_end - positions - 1]
+
+        for d_x, d_y in ((0, 1), (1, -1), (1, 0), (1, 1)):
+            neighbour_keys = sorted_keys + d_x * row + d_y
+            start = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+            end = np.searchsorted(sorted_keys, neighbour_keys, side='right')
+            first.append(positions)
+            second.append(start)
+            counts.append(end - start)
+
+        owners, others = cls._expand_ranges(np.concatenate(first), np.concatenate(second), np.concatenate(counts))
+        return order[owners], order[others]
+
+    @classmethod
+    def _pairs_between(cls, queries, targets, keys, row):
+        """
+        Finds pairs of a query slot and a target slot in the same or adjacent cells
+        :param queries: array of slots, better the smaller group
+        :param targets: array of slots that don't intersect queries
+        :param keys: cell keys of all slots
+        :param row: difference of keys of cells adjacent by x
+        :return: tuple (i, j) of arrays of slots
+        """
+        order = targets[np.argsort(keys[targets], kind='stable')]
+        sorted_keys = keys[order]
+        query_keys = keys[queries]
+
+        starts, counts = [], []
+        for d_x in (-1, 0, 1):
+            for d_y in (-1, 0, 1):
+                neighbour_keys = query_keys + d_x * row + d_y
+                start = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+                end = np.searchsorted(sorted_keys, neighbour_keys, side='right')
+                starts.append(start)
+                counts.append(end - start)
+
+        owners, others = cls._expand_ranges(np.tile(queries, 9), np.concatenate(starts), np.concatenate(counts))
+        return owners, order[others]
+
+    def find_contacts(self, dt=0, wake_speed=0):
+        """
+        Finds all pairs of intersecting objects. Objects are sorted into a grid with cells not smaller than
+        the biggest diameter extended by the distance the object moves during dt, so only objects in the same
+        or adjacent cells are tested. If any object of a pair uses continuous collision, the pair intersects
+        when the objects touch at any moment during dt. Pairs of two sleeping objects and pairs with disjoint
+        collision layers and masks are skipped, sleeping objects touched by awake ones faster than wake_speed
+        are woken up
+        :param dt: duration of the coming step
+        :param wake_speed: minimal speed of an object that wakes up sleeping objects it touches
+        :return: array of shape (k, 2) with slot indices (i < j) of intersecting objects in lexicographic order
+        """
+        n = self.count
+        if n < 2:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        pos, velocity = self.pos[:n], self.velocity[:n]
+        radius = self.radius[:n]
+        reach_radius = radius + np.sqrt((velocity * velocity).sum(axis=1)) * dt
+        cell_size = max(2 * reach_radius.max(), 1.0)
+
+        cells = np.floor(pos / cell_size).astype(np.int64)
+        cells -= cells.min(axis=0) - 1
+        row = cells[:, 1].max() + 2
+        keys = cells[:, 0] * row + cells[:, 1]
+
+        # candidates are only searched between groups of layers that can interact, so a big group that
+        # doesn't collide with itself, e.g. a swarm of enemies, doesn't produce pairs inside it
+        layer, mask = self.collision_layer[:n], self.collision_mask[:n]
+        layers, group_of = np.unique(layer, return_inverse=True)
+        groups = [np.flatnonzero(group_of == g) for g in range(len(layers))]
+        group_masks = [np.bitwise_or.reduce(mask[group]) for group in groups]
+
+        first, second = [], []
+        for a in range(len(layers)):
+            for b in range(a, len(layers)):
+                if not (layers[a] & group_masks[b]) and not (layers[b] & group_masks[a]):
+                    continue
+                if a == b:
+                    group_i, group_j = self._pairs_inside(groups[a], keys, row)
+                else:
+                    queries, targets = sorted((groups[a], groups[b]), key=len)
+                    group_i, group_j = self._pairs_between(queries, targets, keys, row)
+                first.append(group_i)
+                second.append(group_j)
+
+        if not first:
+            return np.zeros((0, 2), dtype=np.int64)
+        i, j = np.concatenate(first), np.concatenate(second)
+
+        interacting = ((layer[i] & mask[j]) | (layer[j] & mask[i])) != 0
+        i, j = i[interacting], j[interacting]
+
+        delta = pos[i] - pos[j]
+        close = (delta * delta).sum(axis=1) <= (reach_radius[i] + reach_radius[j]) ** 2
+        i, j, delta = i[close], j[close], delta[close]
+
+        reach = radius[i] + radius[j]
+        c = (delta * delta).sum(axis=1) - reach * reach
+        touching = c <= 0
+
+        swept = ~touching & (self.continuous[i] | self.continuous[j])
+        if swept.any():
+            relative_velocity = velocity[i[swept]] - velocity[j[swept]]
+            a = (relative_velocity * relative_velocity).sum(axis=1)
+            b = (delta[swept] * relative_velocity).sum(axis=1)
+            discriminant = b * b - a * c[swept]
+            approaching = (b < 0) & (a > 0) & (discriminant >= 0)
+            time = (-b - np.sqrt(np.maximum(discriminant, 0))) / np.where(a > 0, a, 1)
+            touching[swept] = approaching & (time <= dt)
+
+        sleeping = self.sleeping[:n]
+        touching &= ~(sleeping[i] & sleeping[j])
+        i, j = i[touching], j[touching]
+        fast = (velocity * velocity).sum(axis=1) >= wake_speed ** 2
+        self.wake(np.concatenate((i[sleeping[i] & fast[j]], j[sleeping[j] & fast[i]])))
+
+        pairs = np.stack((np.minimum(i, j), np.maximum(i, j)), axis=1)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    def query_radius(self, pos, radius):
+        """
+        Finds objects that intersect a circle
+        :param pos: centre of the circle
+        :param radius: radius of the circle
+        :return: list of objects
+        """
+        n = self.count
+        delta = self.pos[:n] - tuple(pos)
+        reach = self.radius[:n] + radius
+        found = np.nonzero((delta * delta).sum(axis=1) <= reach * reach)[0]
+        return [self.objects[slot] for slot in found]
+
+    def query_rect(self, rect):
+        """
+        Finds objects whose bounding boxes intersect a rectangle
+        :param rect: tuple (x, y, width, height) of a rectangle
+        :return: list of objects
+        """
+        n = self.count
+        left, top, width, height = rect
+        x, y, radius = self.pos[:n, 0], self.pos[:n, 1], self.radius[:n]
+        inside = (x + radius >= left) & (x - radius <= left + width) \
+            & (y + radius >= top) & (y - radius <= top + height)
+        return [self.objects[slot] for slot in np.nonzero(inside)[0]]
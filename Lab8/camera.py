@@ -0,0 +1,72 @@
+from common import Vector
+
+
+class Camera:
+    """
+    Viewport of the screen into the game world. Positions of the world are converted to the screen by subtracting
+    the camera position, the top left corner of the viewport. The viewport never leaves the world
+    """
+
+    def __init__(self, size, world_size):
+        """
+        Camera constructor
+        :param size: tuple (width, height) of the viewport, equal to the screen resolution
+        :param world_size: tuple (width, height) of the world
+        """
+        self.size = size
+        self.world_size = world_size
+        self.pos = Vector(0, 0)
+
+    def follow(self, target):
+        """
+        Centres the viewport on a target as far as world borders allow
+        :param target: tuple (x, y) or Vector of the target position
+        """
+        x, y = target
+        width, height = self.size
+        world_width, world_height = self.world_size
+        self.pos.set(min(max(x - width / 2, 0), max(world_width - width, 0)),
+                     min(max(y - height / 2, 0), max(world_height - height, 0)))
+
+    def center(self):
+        """
+        Returns world position of the centre of the viewport
+        :return: tuple (x, y)
+        """
+        width, height = self.size
+        return self.pos.x + width / 2, self.pos.y + height / 2
+
+    def offset(self):
+        """
+        Returns integer offset that is subtracted from world positions to get screen positions
+        :return: tuple (x, y)
+        """
+        return int(round(self.pos.x)), int(round(self.pos.y))
+
+    def to_screen(self, pos):
+        """
+        Converts a world position to a screen position
+        :param pos: tuple (x, y) of integer world coordinates
+        :return: tuple (x, y) of integer screen coordinates
+        """
+        offset_x, offset_y = self.offset()
+        x, y = pos
+        return x - offset_x, y - offset_y
+
+    def to_world(self, pos):
+        """
+        Converts a screen position, e.g. of the mouse, to a world position
+        :param pos: tuple (x, y) of screen coordinates
+        :return: tuple (x, y) of world coordinates
+        """
+        x, y = pos
+        return x + self.pos.x, y + self.pos.y
+
+    def view_rect(self, margin=0):
+        """
+        Returns the part of the world that is visible on screen
+        :param margin: distance the rectangle is extended by on every side
+        :return: tuple (x, y, width, height)
+        """
+        width, height = self.size
+        return self.pos.x - margin, self.pos.y - margin, width + 2 * margin, height + 2 * margin
@@ -1,7 +1,12 @@
+import math
+from collections import deque
+from functools import partial
+
 import pygame as pg
 import pygame.draw as draw
-from common import GameObject, Vector, Colors, PhysicalObject
-from enemy import Enemy
+from common import GameObject, Vector, Colors, PhysicalObject, CollisionLayers
+from pool import ObjectPool
+from systems import Lifetime, Motion, Renderable
 
 
 class Cannon(GameObject):
@@ -24,31 +29,58 @@ class Cannon(GameObject):
         self.shooting_power = 0
         self.direction = Vector(1, 0)
         self.is_mouse_down = False
-        self._projectiles = []
+        self._projectiles = ObjectPool()
+        self.projectile_pool = ProjectilePool(self)
 
     def update(self):
-        x, y = pg.mouse.get_pos()
-        self.direction = (Vector(x, y) - self.pos).normalize()
+        x, y = self.game.camera.to_world(self.game.mouse_pos)
+        direction = self.direction.set(x - self.pos.x, y - self.pos.y)
+        direction *= 1 / direction.magnitude()
 
         if self.is_mouse_down:
             self.shooting_power = min(self.shooting_power + Cannon.shooting_power_per_second * self.game.dt,
                                       Cannon.max_shooting_power)
 
+    def state_values(self):
+        return super().state_values() + (self.shooting_power, self.direction.x, self.direction.y, self.is_mouse_down)
+
     def draw(self, surface):
-        start_pos = self.pos.int_tuple()
-        end_pos = (self.pos + self.direction * Cannon.line_length).int_tuple()
+        shooting_power = self.shooting_power if self.is_mouse_down else None
+        pos = self.game.camera.to_screen(self.render_pos())
+        self.game.render_queue.add_immediate(partial(Cannon._draw_barrel, pos=pos,
+                                                     direction=self.direction.copy(), shooting_power=shooting_power))
 
-        draw.line(surface, Colors.red, start_pos, end_pos, Cannon.line_width)
+    @staticmethod
+    def _draw_barrel(surface, pos, direction, shooting_power):
+        """
+        Draws the barrel and shooting power. It depends on direction so it is drawn directly, not from a sprite.
+        Gets a copy of cannon's state, so it can be drawn after the cannon has changed
+        :param surface: surface to draw on
+        :param pos: tuple (x, y) of the cannon on screen
+        :param direction: direction of the barrel
+        :param shooting_power: shooting power or None if the mouse button isn't pressed
+        :return: pygame.Rect that bounds the barrel
+        """
+        x, y = pos
+        start_pos = x, y
+        end_pos = (Vector(x, y) + direction * Cannon.line_length).int_tuple()
 
-        if self.is_mouse_down:
-            end_pos = (self.pos + self.direction * Cannon.line_length * max(self.shooting_power, 0.03)).int_tuple()
+        drawn_rect = draw.line(surface, Colors.red, start_pos, end_pos, Cannon.line_width)
+
+        if shooting_power is not None:
+            end_pos = (Vector(x, y) + direction * Cannon.line_length * max(shooting_power, 0.03)).int_tuple()
             # line is drawn incorrectly when it's length is 0 so an indent of 0.03 added
 
-            draw.line(surface, Colors.white, start_pos, end_pos, Cannon.line_width)
+            drawn_rect.union_ip(draw.line(surface, Colors.white, start_pos, end_pos, Cannon.line_width))
+
+        return drawn_rect
 
     def destroy(self):
         super().destroy()
 
+        self.game.unsubscribe_from_event(pg.MOUSEBUTTONDOWN, self._mousebuttondown_listener)
+        self.game.unsubscribe_from_event(pg.MOUSEBUTTONUP, self._mousebuttonup_listener)
+
     def _mousebuttondown_listener(self, event: pg.event.Event):
         """
         MOUSEBUTTONDOWN event listener
@@ -72,45 +104,262 @@ class Cannon(GameObject):
         """
         projectile_pos = self.pos + self.direction * Cannon.line_length
         projectile_velocity = self.direction * (Cannon.projectile_min_velocity + (Cannon.projectile_max_velocity - Cannon.projectile_min_velocity) * self.shooting_power)
-        self._projectiles.append(Projectile(projectile_pos, projectile_velocity, self.game, self))
+        self._projectiles.add(self.projectile_pool.acquire(projectile_pos, projectile_velocity))
 
         self.game.scoreboard.projectile_shot()
 
+    def projectile_removed(self, projectile):
+        """
+        Forgets a projectile of this cannon that was removed from the game and gives it back to the pool
+        :param projectile: removed projectile
+        """
+        self._projectiles.remove(projectile)
+        self.projectile_pool.release(projectile)
+
+
+class ProjectilePool:
+    """
+    Keeps removed projectiles of a cannon so they are reused for new shots instead of being created again
+    """
+    max_free = 256
+
+    def __init__(self, cannon):
+        """
+        ProjectilePool constructor
+        :param cannon: cannon that shoots projectiles from this pool
+        """
+        self.cannon = cannon
+        self.live = 0
+        self.allocated = 0
+        self.recycled = 0
+        self._free = []
+        self._recycle_times = deque()
+
+    def acquire(self, pos, velocity):
+        """
+        Returns a projectile that is added to the game. A free projectile is reused if there is one
+        :param pos: position of the projectile
+        :param velocity: velocity of the projectile
+        :return: projectile
+        """
+        projectile, reused = self._take(pos, velocity)
+        if reused:
+            self.recycled += 1
+            self._recycle_times.append(self._time())
+        else:
+            self.allocated += 1
+        return projectile
+
+    def respawn(self, count, projectiles):
+        """
+        Returns projectiles of a restored snapshot at once. Given projectiles are reused first, then free ones,
+        and the rest are created. Given projectiles that aren't needed are destroyed and become free.
+        Unlike acquire, projectiles aren't counted as allocated or recycled, because they aren't new shots.
+        The caller sets their state and puts them into pools of the game
+        :param count: number of projectiles
+        :param projectiles: list of live projectiles of the cannon
+        :return: list of projectiles
+        """
+        respawned, spare = projectiles[:count], projectiles[count:]
+        for projectile in spare:
+            projectile.is_alive = False
+        self._free.extend(spare[:ProjectilePool.max_free - len(self._free)])
+
+        missing = count - len(respawned)
+        reused = min(missing, len(self._free))
+        if reused:
+            respawned += self._free[-reused:]
+            del self._free[-reused:]
+        game = self.cannon.game
+        respawned += [Projectile(Vector(0, 0), Vector(0, 0), game, self.cannon) for _ in range(missing - reused)]
+
+        for projectile in respawned:
+            projectile.is_alive = True
+        self.live = count
+        return respawned
+
+    def _take(self, pos, velocity):
+        """
+        Reuses a free projectile or creates a new one
+        :return: tuple (projectile, True if it was reused)
+        """
+        self.live += 1
+        if self._free:
+            projectile = self._free.pop()
+            projectile.revive(pos, velocity)
+            return projectile, True
+
+        return Projectile(pos, velocity, self.cannon.game, self.cannon), False
+
+    def release(self, projectile):
+        """
+        Takes back a projectile that was removed from the game
+        :param projectile: removed projectile
+        """
+        self.live -= 1
+        if len(self._free) < ProjectilePool.max_free:
+            self._free.append(projectile)
+
+    def _time(self):
+        game = self.cannon.game
+        return game.tick * game.dt
+
+    def stats(self):
+        """
+        Returns statistics of the pool
+        :return: dictionary with numbers of live and free projectiles, projectiles created and reused in total,
+        and projectiles reused during the last second of game time
+        """
+        now = self._time()
+        while self._recycle_times and self._recycle_times[0] < now - 1:
+            self._recycle_times.popleft()
+
+        return {'live': self.live, 'free': len(self._free), 'allocated': self.allocated,
+                'recycled': self.recycled, 'recycled_per_second': len(self._recycle_times)}
+
 
 class Projectile(PhysicalObject):
     """
-    Represents basic projectile that is shot by a cannon and can damage enemies
+    Represents basic projectile that is shot by a cannon and can damage enemies.
+    A projectile is removed when it exceeds max_age or when it's spent: it exceeded max_bounces or is slower than
+    min_speed after a bounce. A projectile that is spent on the floor settles instead: it stops and falls asleep,
+    and is removed after lying there for max_rest_time
     """
     gravitational_acceleration = Vector.j() * 20
     air_resistance_coefficient = 0.02
     max_radius = 10
     energy_conserved_in_collision = 0.72
+    max_age = 30
+    max_bounces = 12
+    min_speed = 10
+    max_rest_time = 3
+    continuous_collision = True
+    collision_layer = CollisionLayers.projectile
+    collision_mask = CollisionLayers.enemy
 
     def __init__(self, pos, velocity, game, cannon):
+        # components are created before the object is added to the game, because they become part of it's entity
+        self.cannon = cannon
+        self.lifetime = Lifetime()
+
         super().__init__(pos, game, velocity, Projectile.max_radius, collides_with_borders=True, energy_conserved=Projectile.energy_conserved_in_collision)
 
-        self.cannon = cannon
+    @property
+    def age(self):
+        """
+        Time in seconds since the projectile was shot
+        """
+        return self.lifetime.age
+
+    @age.setter
+    def age(self, value):
+        self.lifetime.age = value
+
+    @property
+    def settled_at(self):
+        """
+        Age at which the projectile settled on the floor, infinity if it hasn't settled
+        """
+        return self.lifetime.settled_at
+
+    @settled_at.setter
+    def settled_at(self, value):
+        self.lifetime.settled_at = value
+
+    def revive(self, pos, velocity=None):
+        self.age = 0
+        self.settled_at = math.inf
+        super().revive(pos, velocity)
+
+    def components(self):
+        components = super().components()
+        acceleration, drag = self.integration_parameters()
+        components['motion'] = Motion(acceleration, drag)
+        components['lifetime'] = self.lifetime
+        components['renderable'] = Renderable(Projectile.max_radius, Colors.white)
+        return components
+
+    def state_values(self):
+        return super().state_values() + (self.age, self.settled_at)
+
+    def is_expired(self):
+        """
+        Returns if the projectile should be removed according to lifetime policy
+        :return: True if projectile is expired, False otherwise
+        """
+        age = self.age
+        if age > Projectile.max_age or age - self.settled_at > Projectile.max_rest_time:
+            return True
+
+        # a projectile spent on the floor settles before it's removed
+        return self.is_spent() and not self.is_on_floor()
+
+    def is_spent(self):
+        """
+        Returns if the projectile exceeded max_bounces or is slower than min_speed after a bounce
+        :return: True if projectile is spent, False otherwise
+        """
+        bounces = self.bounces
+        return bounces > Projectile.max_bounces \
+            or (bounces > 0 and self.velocity.magnitude_squared() < Projectile.min_speed ** 2)
+
+    def should_settle(self):
+        """
+        Returns if the projectile is spent and lies on the floor, so it should stop and fall asleep
+        :return: True if projectile should settle, False otherwise
+        """
+        return not self.is_sleeping and self.is_spent() and self.is_on_floor()
+
+    def settle(self):
+        """
+        Stops the projectile and puts it to sleep without waiting for sleep_ticks. If it's woken up and settles
+        again, it's rest time is counted from the first settling
+        """
+        self.velocity = Vector(0, 0)
+        self.is_sleeping = True
+        self.settled_at = min(self.settled_at, self.age)
 
     def update(self):
+        self.age += self.game.dt
+        if self.is_expired():
+            self.destroy()
+            return
+        if self.should_settle():
+            self.settle()
+
+        if self.is_integrated_by_arrays() or self.is_sleeping:
+            return
+
         dt = self.game.dt
 
-        self.pos += self.velocity * dt
-        self.velocity += (Projectile.gravitational_acceleration
-                          - self.velocity * Projectile.air_resistance_coefficient) * dt
+        velocity = self.velocity
+
+        self.pos.add_scaled(velocity, dt)
+        velocity.add_scaled(velocity, -Projectile.air_resistance_coefficient * dt)
+        velocity.add_scaled(Projectile.gravitational_acceleration, dt)
+
+        if self.continuous_collision:
+            self.game.reflect_from_borders(self)
+
+    def integration_parameters(self):
+        return Projectile.gravitational_acceleration, Projectile.air_resistance_coefficient
 
     def draw(self, surface):
-        draw.circle(surface, Colors.white, self.pos.int_tuple(), Projectile.max_radius)
+        self.game.render_queue.add_circle(self.render_pos(), Projectile.max_radius, Colors.white)
 
     def destroy(self):
         super().destroy()
 
-    def check_collision(self, other):
-        return super().check_collision(other)
+    def on_removed(self):
+        self.cannon.projectile_removed(self)
 
-    def on_collision(self, other):
-        if isinstance(other, Enemy):
-            other.destroy()
-            self.destroy()
-            self.game.scoreboard.enemy_destroyed()
-
-        return True
+    @staticmethod
+    def hit_enemy(projectile, enemy):
+        """
+        Collision handler of a projectile and an enemy. Destroys both of them
+        :param projectile: a projectile
+        :param enemy: an enemy that was hit
+        """
+        enemy.destroy()
+        projectile.destroy()
+        projectile.game.scoreboard.enemy_destroyed()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-import cmath
+import math
 import random
 
 
@@ -10,39 +10,112 @@ class Colors:
     black = (0, 0, 0)
     red = (255, 0, 0)
     white = (255, 255, 255)
+    magenta = (255, 0, 255)
+
+
+class CollisionLayers:
+    """
+    Class that contains bit flags of collision layers. A pair of physical objects is checked for collision only if
+    layer of one of them is in collision mask of the other
+    """
+    none = 0
+    projectile = 1
+    enemy = 2
 
 
 class Vector:
     """
-    Class that represents planar vector with it's common operations
+    Class that represents planar vector with it's common operations.
+    Augmented operators (+=, -=, *=) and add_scaled change the vector in place without creating new objects
     """
+    __slots__ = ('x', 'y')
 
     def __init__(self, x, y):
         self.x = x
         self.y = y
-        self._iter_counter = 0
 
     def __add__(self, other):
         return Vector(self.x + other.x, self.y + other.y)
 
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
     def __mul__(self, other):
-        if not isinstance(other, float) and not isinstance(other, int):
+        if not isinstance(other, (float, int)):
             raise TypeError('other must be int or float but received', type(other))
 
         return Vector(self.x * other, self.y * other)
 
+    def __imul__(self, other):
+        if not isinstance(other, (float, int)):
+            raise TypeError('other must be int or float but received', type(other))
+
+        self.x *= other
+        self.y *= other
+        return self
+
     def __iter__(self):
-        return [self.x, self.y].__iter__()
+        yield self.x
+        yield self.y
 
     def __sub__(self, other):
-        return self + (other * (-1))
+        return Vector(self.x - other.x, self.y - other.y)
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __neg__(self):
+        return Vector(-self.x, -self.y)
+
+    def __repr__(self):
+        return f'Vector({self.x}, {self.y})'
+
+    def set(self, x, y):
+        """
+        Changes coordinates of the vector in place
+        :param x: new x coordinate
+        :param y: new y coordinate
+        :return: this vector
+        """
+        self.x = x
+        self.y = y
+        return self
+
+    def copy(self):
+        """
+        Returns a new vector with the same coordinates
+        :return: copy of the vector
+        """
+        return Vector(self.x, self.y)
+
+    def add_scaled(self, other, k):
+        """
+        Adds other * k to this vector in place
+        :param other: vector to add
+        :param k: number other is multiplied by
+        :return: this vector
+        """
+        self.x += other.x * k
+        self.y += other.y * k
+        return self
+
+    def magnitude_squared(self):
+        """
+        Returns squared magnitude of the vector
+        :return: float squared magnitude of vector
+        """
+        return self.x * self.x + self.y * self.y
 
     def magnitude(self):
         """
         Returns magnitude of the vector
         :return: float magnitude of vector
         """
-        return (self.x ** 2 + self.y ** 2) ** (1 / 2)
+        return math.hypot(self.x, self.y)
 
     def normalize(self):
         """
@@ -50,7 +123,7 @@ class Vector:
         :return: Normalized vector - vector with the same direction as this one and magnitude of 1
         """
         magn = self.magnitude()
-        return self * (1 / magn)
+        return Vector(self.x / magn, self.y / magn)
 
     def rotate(self, angle):
         """
@@ -58,9 +131,8 @@ class Vector:
         :param angle: angle to rotate
         :return: rotated vector
         """
-        c_repr = self.x + 1j * self.y
-        new_c_repr = c_repr * cmath.exp(1j * angle)
-        return Vector(new_c_repr.real, new_c_repr.imag)
+        cos, sin = math.cos(angle), math.sin(angle)
+        return Vector(self.x * cos - self.y * sin, self.x * sin + self.y * cos)
 
     def int_tuple(self):
         """
@@ -70,18 +142,19 @@ class Vector:
         return int(round(self.x)), int(round(self.y))
 
     @staticmethod
-    def random_vector(magnitude_range, angle_range=(0, 2 * cmath.pi)):
+    def random_vector(magnitude_range, angle_range=(0, 2 * math.pi), rng=random):
         """
         Creates random vector
         :param magnitude_range: tuple of (min magnitude, max magnitude) of created vector
         :param angle_range: tuple of (min angle, max angle) in radians of created vector. Angle 0 corresponds
         to vector forwarded in positive Ox direction
+        :param rng: random number generator, random module by default
         :return: random vector
         """
         min_magn, max_magn = magnitude_range
         min_angle, max_angle = angle_range
-        magnitude = min_magn + random.random() * (max_magn - min_magn)
-        angle = min_angle + random.random() * (max_angle - min_angle)
+        magnitude = min_magn + rng.random() * (max_magn - min_magn)
+        angle = min_angle + rng.random() * (max_angle - min_angle)
         return Vector(magnitude, 0).rotate(angle)
 
     @staticmethod
@@ -103,8 +176,12 @@ class Vector:
 
 class GameObject(ABC):
     """
-    Represents an abstract game object with it's default properties and methods
+    Represents an abstract game object with it's default properties and methods.
+    Objects that are updated_in_batch aren't updated and drawn by the game one by one, another object does it
+    for many of them at once. Frozen objects aren't updated
     """
+    updated_in_batch = False
+    is_frozen = False
 
     def __init__(self, pos: Vector, game):
         """
@@ -114,11 +191,54 @@ class GameObject(ABC):
         """
         self.pos = pos
         self.game = game
+        self.prev_pos = pos.x, pos.y
 
         self.is_alive = True
 
         game.add_object(self)
 
+    def remember_position(self):
+        """
+        Saves current position as previous one. Called once in every frame before updating
+        """
+        pos = self.pos
+        self.prev_pos = pos.x, pos.y
+
+    def render_pos(self):
+        """
+        Returns position to draw the object at. It is interpolated between previous and current position
+        according to game.alpha
+        :return: tuple of 2 integers
+        """
+        alpha = self.game.alpha
+        prev_x, prev_y = self.prev_pos
+        pos = self.pos
+        return int(round(prev_x + (pos.x - prev_x) * alpha)), int(round(prev_y + (pos.y - prev_y) * alpha))
+
+    def revive(self, pos):
+        """
+        Returns a destroyed object back to the game so it can be reused instead of creating a new one
+        :param pos: new position of the object
+        """
+        self.pos = pos
+        self.prev_pos = pos.x, pos.y
+        self.is_alive = True
+
+        self.game.add_object(self)
+
+    def state_values(self):
+        """
+        Returns numbers that describe simulated state of the object. Used to check that two runs of a game match
+        :return: tuple of numbers
+        """
+        return self.pos.x, self.pos.y
+
+    def on_removed(self):
+        """
+        Called after destroyed object is removed from the game at the end of a tick
+        """
+        pass
+
     @abstractmethod
     def update(self):
         """
@@ -130,9 +250,10 @@ class GameObject(ABC):
     @abstractmethod
     def draw(self, surface):
         """
-        Called once in every frame to draw object on surface
+        Called once in every frame to draw object on surface. Object can either draw on surface directly or
+        queue drawing commands to game.render_queue
         :param surface: surface to draw on
-        :return: None
+        :return: pygame.Rect that bounds everything drawn directly on surface or None if nothing was drawn
         """
         pass
 
@@ -142,38 +263,321 @@ class GameObject(ABC):
         Called to destroy this object
         :return: None
         """
+        self.is_alive = False
         self.game.destroy_object(self)
 
 
 class PhysicalObject(GameObject, ABC):
+    """
+    Represents a game object that moves and collides with other physical objects.
+    An object that is slower than sleep_speed for sleep_ticks ticks falls asleep: it isn't moved and isn't checked
+    against other sleeping objects until an awake object faster than sleep_speed touches it.
+    An object pulled down by gravity falls asleep only on the floor.
+    An object far from the camera is frozen: it sleeps keeping it's velocity and isn't updated until it is near again.
+    Collisions are handled by functions that Game dispatches by collision layers of both objects
+    """
+    sleep_speed = 5
+    sleep_ticks = 25
+    floor_distance = 1
+    continuous_collision = False
+    collision_layer = CollisionLayers.none
+    collision_mask = CollisionLayers.none
+
     def __init__(self, pos, game, velocity, radius, collides_with_borders=False, energy_conserved=1.0):
-        super().__init__(pos, game)
+        self.arrays = None
+        self.slot = None
+        self.entity = None
+        self._velocity = velocity
+        self._bounces = 0
+        self._is_sleeping = False
+        self._is_frozen = False
+        self.slow_ticks = 0
 
-        game.add_physical(self)
+        super().__init__(pos, game)
 
-        self.velocity = velocity
         self.radius = radius
         self.collides_with_borders = collides_with_borders
         self.energy_conserved = energy_conserved
 
-    @abstractmethod
+        game.add_physical(self)
+
+    @property
+    def pos(self):
+        if self.arrays is None:
+            return self._pos
+        x, y = self.arrays.pos[self.slot].tolist()
+        return Vector(x, y)
+
+    @pos.setter
+    def pos(self, value):
+        if self.entity is not None:
+            # components of the entity reference this vector
+            self._pos.set(value.x, value.y)
+        elif self.arrays is None:
+            self._pos = value
+        else:
+            self.arrays.pos[self.slot] = value.x, value.y
+
+    @property
+    def velocity(self):
+        if self.arrays is None:
+            return self._velocity
+        x, y = self.arrays.velocity[self.slot].tolist()
+        return Vector(x, y)
+
+    @velocity.setter
+    def velocity(self, value):
+        if self.entity is not None:
+            self._velocity.set(value.x, value.y)
+        elif self.arrays is None:
+            self._velocity = value
+        else:
+            self.arrays.velocity[self.slot] = value.x, value.y
+
+    def remember_position(self):
+        if self.arrays is None:
+            super().remember_position()
+
+    def render_pos(self):
+        if self.arrays is None:
+            return super().render_pos()
+
+        alpha = self.game.alpha
+        prev_x, prev_y = self.arrays.prev_pos[self.slot].tolist()
+        x, y = self.arrays.pos[self.slot].tolist()
+        return int(round(prev_x + (x - prev_x) * alpha)), int(round(prev_y + (y - prev_y) * alpha))
+
+    @property
+    def bounces(self):
+        """
+        Number of collisions with borders
+        """
+        if self.arrays is None:
+            return self._bounces
+        return int(self.arrays.bounces[self.slot])
+
+    @bounces.setter
+    def bounces(self, value):
+        if self.arrays is None:
+            self._bounces = value
+        else:
+            self.arrays.bounces[self.slot] = value
+
+    @property
+    def is_sleeping(self):
+        """
+        If the object is asleep
+        """
+        if self.arrays is None:
+            return self._is_sleeping
+        return bool(self.arrays.sleeping[self.slot])
+
+    @is_sleeping.setter
+    def is_sleeping(self, value):
+        if self.arrays is None:
+            self._is_sleeping = value
+            if self.entity is not None:
+                # sleeping entities are moved to archetypes with sleeping tag, so systems skip them
+                if value:
+                    self.game.world.add_component(self.entity, 'sleeping')
+                else:
+                    self.game.world.remove_component(self.entity, 'sleeping')
+        else:
+            self.arrays.sleeping[self.slot] = value
+
+    @property
+    def is_frozen(self):
+        """
+        If the object is frozen because it is far from the camera
+        """
+        if self.arrays is None:
+            return self._is_frozen
+        return bool(self.arrays.frozen[self.slot])
+
+    def freeze(self):
+        """
+        Freezes the object. It is put to sleep with it's velocity kept
+        """
+        if self.arrays is None:
+            self._is_frozen = True
+            if self.entity is not None:
+                self.game.world.add_component(self.entity, 'frozen')
+        else:
+            self.arrays.frozen[self.slot] = True
+        self.is_sleeping = True
+
+    def unfreeze(self):
+        """
+        Unfreezes the object, so it moves again
+        """
+        if self.arrays is None:
+            self._is_frozen = False
+            if self.entity is not None:
+                self.game.world.remove_component(self.entity, 'frozen')
+        else:
+            self.arrays.frozen[self.slot] = False
+        self.wake()
+
+    def update_sleep(self):
+        """
+        Counts ticks the object has been slow and puts it to sleep if there were enough of them
+        """
+        if self.velocity.magnitude_squared() >= PhysicalObject.sleep_speed ** 2 or not self.is_supported():
+            self.slow_ticks = 0
+            return
+
+        self.slow_ticks += 1
+        if self.slow_ticks >= PhysicalObject.sleep_ticks:
+            self.is_sleeping = True
+            self.velocity = Vector(0, 0)
+
+    def is_on_floor(self):
+        """
+        Returns if the object touches the bottom border of the game
+        :return: True if the object is on the floor, False otherwise
+        """
+        max_y = self.game._y_border[1]
+        return self.pos.y >= max_y - self.radius - PhysicalObject.floor_distance
+
+    def is_supported(self):
+        """
+        Returns if the object can rest where it is. An object pulled down by gravity rests only on the floor,
+        otherwise it would fall asleep at the top of it's flight
+        :return: True if the object is supported, False otherwise
+        """
+        acceleration, _ = self.integration_parameters()
+        return acceleration.y <= 0 or self.is_on_floor()
+
+    def wake(self):
+        """
+        Wakes the object up so it moves again
+        """
+        if self.arrays is None:
+            self.is_sleeping = False
+            self.slow_ticks = 0
+        else:
+            self.arrays.wake(self.slot)
+
+    def state_values(self):
+        velocity = self.velocity
+        return super().state_values() + (velocity.x, velocity.y, self.bounces, self.is_sleeping)
+
+    def wake_by(self, other):
+        """
+        Wakes the object up if other object touching it is fast enough. Slow objects resting on each other
+        don't wake each other
+        :param other: an awake object that touches this one
+        """
+        if other.velocity.magnitude_squared() >= PhysicalObject.sleep_speed ** 2:
+            self.wake()
+
+    def revive(self, pos, velocity=None):
+        """
+        Returns a destroyed physical object back to the game
+        :param pos: new position of the object
+        :param velocity: new velocity of the object
+        """
+        if velocity is not None:
+            self.velocity = velocity
+        self.bounces = 0
+        self._is_frozen = False
+        self.wake()
+        super().revive(pos)
+
+        self.game.add_physical(self)
+
+    def attach_arrays(self, arrays, slot):
+        """
+        Makes this object a handle into array physics backend
+        :param arrays: ArrayPhysics object that holds state of this object
+        :param slot: index of this object in arrays
+        """
+        self.arrays = arrays
+        self.slot = slot
+
+    def detach_arrays(self):
+        """
+        Copies state of this object back from array physics backend so it no longer depends on it
+        """
+        pos, velocity, bounces, is_sleeping = self.pos, self.velocity, self.bounces, self.is_sleeping
+        self.slow_ticks = int(self.arrays.slow_ticks[self.slot])
+        self._is_frozen = bool(self.arrays.frozen[self.slot])
+        self.prev_pos = tuple(self.arrays.prev_pos[self.slot].tolist())
+        self.arrays = None
+        self.slot = None
+        self.pos, self.velocity, self.bounces, self.is_sleeping = pos, velocity, bounces, is_sleeping
+
+    def integration_parameters(self):
+        """
+        Returns constant acceleration and air drag coefficient applied to this object by array physics backend
+        :return: tuple (acceleration vector, drag coefficient)
+        """
+        return Vector(0, 0), 0.0
+
+    def components(self):
+        """
+        Returns components of an entity that represents this object in entity-component backend.
+        The components reference vectors of this object, so the object stays a facade of the entity
+        :return: dictionary {component name: value}
+        """
+        components = {'owner': self, 'transform': self._pos, 'velocity': self._velocity}
+        if self.continuous_collision:
+            components['continuous'] = None
+        if self._is_sleeping:
+            components['sleeping'] = None
+        if self._is_frozen:
+            components['frozen'] = None
+        return components
+
+    def is_integrated_by_arrays(self):
+        """
+        Returns if motion of this object is integrated by array physics backend instead of it's update method
+        :return: True if object is a handle into array physics backend
+        """
+        return self.arrays is not None
+
     def check_collision(self, other):
         """
-        Returns if this object collides with other
+        Returns if this object collides with other. If any of them uses continuous collision, they collide if they
+        touch at any moment of the coming step
         :param other: other physical object
         :return: True if collides, False otherwise
         """
-        return (self.pos - other.pos).magnitude() <= self.radius + other.radius
+        if self.continuous_collision or other.continuous_collision:
+            return self.time_of_impact(other, self.game.dt) is not None
 
-    @abstractmethod
-    def on_collision(self, other):
+        return (self.pos - other.pos).magnitude_squared() <= (self.radius + other.radius) ** 2
+
+    def time_of_impact(self, other, dt):
         """
-        Called when this object collides with other
-        :param other: an object that collided with this one
-        :return: True if other.on_collision should also be called, False otherwise
+        Finds the moment when this object and other start touching if both move with their current velocities
+        :param other: other physical object
+        :param dt: duration of motion
+        :return: time in range [0, dt] or None if objects don't touch during dt
         """
-        return True
+        pos, other_pos = self.pos, other.pos
+        velocity, other_velocity = self.velocity, other.velocity
+        p_x, p_y = pos.x - other_pos.x, pos.y - other_pos.y
+        v_x, v_y = velocity.x - other_velocity.x, velocity.y - other_velocity.y
+        reach = self.radius + other.radius
+
+        c = p_x * p_x + p_y * p_y - reach * reach
+        if c <= 0:
+            return 0.0
+
+        a = v_x * v_x + v_y * v_y
+        b = p_x * v_x + p_y * v_y
+        if b >= 0 or a == 0:
+            return None
 
+        discriminant = b * b - a * c
+        if discriminant < 0:
+            return None
+
+        time = (-b - math.sqrt(discriminant)) / a
+        return time if time <= dt else None
+
+    @abstractmethod
     def destroy(self):
         super().destroy()
 
@@ -0,0 +1,215 @@
+class Archetype:
+    """
+    Holds entities that have the same set of components. Every component is stored in a separate column,
+    a list where i-th element belongs to i-th entity
+    """
+
+    def __init__(self, component_names):
+        """
+        Archetype constructor
+        :param component_names: frozenset of component names
+        """
+        self.component_names = component_names
+        self.entities = []
+        self.columns = {name: [] for name in component_names}
+
+    def add(self, entity, components):
+        """
+        Appends an entity to columns
+        :param entity: entity id
+        :param components: dictionary {component name: value} with all components of the archetype
+        :return: row of the entity
+        """
+        self.entities.append(entity)
+        for name, column in self.columns.items():
+            column.append(components[name])
+        return len(self.entities) - 1
+
+    def remove(self, row):
+        """
+        Removes an entity by moving the last entity into its row
+        :param row: row of the entity to remove
+        :return: tuple (components of removed entity, entity that was moved into the row or None)
+        """
+        components = {name: column[row] for name, column in self.columns.items()}
+        last = len(self.entities) - 1
+        moved = None
+        if row != last:
+            moved = self.entities[last]
+            self.entities[row] = moved
+            for column in self.columns.values():
+                column[row] = column[last]
+
+        self.entities.pop()
+        for column in self.columns.values():
+            column.pop()
+        return components, moved
+
+
+class Query:
+    """
+    Finds archetypes that have all included components and none of the excluded ones.
+    The list of archetypes is cached and found again only when a new archetype appears in the world
+    """
+
+    def __init__(self, world, include, exclude):
+        self.world = world
+        self.include = include
+        self.exclude = frozenset(exclude)
+        self._archetypes = []
+        self._version = -1
+
+    def archetypes(self):
+        """
+        Returns matching archetypes
+        :return: list of archetypes
+        """
+        if self._version != self.world.archetype_version:
+            self._archetypes = [archetype for archetype in self.world.archetypes.values()
+                                if archetype.component_names.issuperset(self.include)
+                                and not archetype.component_names & self.exclude]
+            self._version = self.world.archetype_version
+        return self._archetypes
+
+    def __iter__(self):
+        """
+        Iterates over matching archetypes that aren't empty
+        :return: iterator of tuples of columns in order of included components
+        """
+        for archetype in self.archetypes():
+            if archetype.entities:
+                yield tuple(archetype.columns[name] for name in self.include)
+
+    def __len__(self):
+        return sum(len(archetype.entities) for archetype in self.archetypes())
+
+
+class World:
+    """
+    Entity-component storage. Entities are integer ids, their components are kept in columns of archetypes.
+    Adding or removing a component moves an entity to another archetype
+    """
+
+    def __init__(self):
+        self.archetypes = {}
+        self.archetype_version = 0
+        self._locations = {}
+        self._queries = {}
+        self._next_entity = 0
+
+    def _archetype(self, component_names):
+        archetype = self.archetypes.get(component_names)
+        if archetype is None:
+            archetype = self.archetypes[component_names] = Archetype(component_names)
+            self.archetype_version += 1
+        return archetype
+
+    def _place(self, entity, components):
+        archetype = self._archetype(frozenset(components))
+        self._locations[entity] = (archetype, archetype.add(entity, components))
+
+    def _take(self, entity):
+        archetype, row = self._locations.pop(entity)
+        components, moved = archetype.remove(row)
+        if moved is not None:
+            self._locations[moved] = (archetype, row)
+        return components
+
+    def create(self, components):
+        """
+        Creates an entity
+        :param components: dictionary {component name: value}. Tag components have value None
+        :return: entity id
+        """
+        entity = self._next_entity
+        self._next_entity += 1
+        self._place(entity, components)
+        return entity
+
+    def create_many(self, component_names, components):
+        """
+        Creates entities that have the same components at once
+        :param component_names: frozenset of component names of all entities
+        :param components: list of dictionaries {component name: value}, one for every entity
+        :return: list of entity ids
+        """
+        archetype = self._archetype(component_names)
+        start, row = self._next_entity, len(archetype.entities)
+        entities = list(range(start, start + len(components)))
+        self._next_entity += len(components)
+
+        archetype.entities.extend(entities)
+        for name, column in archetype.columns.items():
+            column.extend(entity_components[name] for entity_components in components)
+        self._locations.update(zip(entities, ((archetype, row + i) for i in range(len(entities)))))
+        return entities
+
+    def destroy(self, entity):
+        """
+        Removes an entity with all it's components
+        :param entity: entity id
+        :return: dictionary of removed components
+        """
+        return self._take(entity)
+
+    def add_component(self, entity, name, value=None):
+        """
+        Adds a component to an entity or replaces it's value
+        :param entity: entity id
+        :param name: component name
+        :param value: component value, None for tag components
+        """
+        archetype, row = self._locations[entity]
+        if name in archetype.columns:
+            archetype.columns[name][row] = value
+            return
+
+        components = self._take(entity)
+        components[name] = value
+        self._place(entity, components)
+
+    def remove_component(self, entity, name):
+        """
+        Removes a component from an entity
+        :param entity: entity id
+        :param name: component name
+        """
+        archetype, row = self._locations[entity]
+        if name not in archetype.columns:
+            return
+
+        components = self._take(entity)
+        del components[name]
+        self._place(entity, components)
+
+    def has(self, entity, name):
+        """
+        Returns if an entity has a component
+        """
+        return name in self._locations[entity][0].columns
+
+    def get(self, entity, name):
+        """
+        Returns value of a component of an entity
+        """
+        archetype, row = self._locations[entity]
+        return archetype.columns[name][row]
+
+    def query(self, *include, exclude=()):
+        """
+        Returns a cached query
+        :param include: names of components entities must have
+        :param exclude: names of components entities must not have
+        :return: Query
+        """
+        key = (include, frozenset(exclude))
+        query = self._queries.get(key)
+        if query is None:
+            query = self._queries[key] = Query(self, include, exclude)
+        return query
+
+    def __contains__(self, entity):
+        return entity in self._locations
+
+    def __len__(self):
+        return len(self._locations)
@@ -1,53 +1,79 @@
-import random
-
-import pygame.draw as draw
-
-from common import Vector, Colors, PhysicalObject
+from common import Vector, Colors, PhysicalObject, CollisionLayers
+from systems import Renderable, Wander
 
 
 class Enemy(PhysicalObject):
+    collision_layer = CollisionLayers.enemy
+    collision_mask = CollisionLayers.projectile
     velocity_range = (30, 100)
     velocity_time_min = 0.5
     velocity_time_max = 2.5
+    body_radius = 25
 
     @staticmethod
-    def _random_velocity_time():
+    def _random_velocity_time(rng):
         """
         Returns random time till velocity must be changed
+        :param rng: random number generator
         :return: float time
         """
-        return Enemy.velocity_time_min + (Enemy.velocity_time_max - Enemy.velocity_time_min) * random.random()
+        return Enemy.velocity_time_min + (Enemy.velocity_time_max - Enemy.velocity_time_min) * rng.random()
 
     @staticmethod
-    def _random_velocity():
+    def _random_velocity(rng):
         """
         Returns random velocity
+        :param rng: random number generator
         :return: random velocity vector
         """
-        return Vector.random_vector(Enemy.velocity_range)
+        return Vector.random_vector(Enemy.velocity_range, rng=rng)
 
     def __init__(self, pos: Vector, game):
-        super().__init__(pos, game, Enemy._random_velocity(), 25, collides_with_borders=True)
+        velocity = Enemy._random_velocity(game.random)
+        # components are created before the object is added to the game, because they become part of it's entity
+        self.wander = Wander(Enemy._random_velocity_time(game.random))
 
-        self.till_velocity_changed = Enemy._random_velocity_time()
+        super().__init__(pos, game, velocity, Enemy.body_radius, collides_with_borders=True)
+
+    @property
+    def till_velocity_changed(self):
+        """
+        Time in seconds till velocity is changed to a random one
+        """
+        return self.wander.till_velocity_changed
+
+    @till_velocity_changed.setter
+    def till_velocity_changed(self, value):
+        self.wander.till_velocity_changed = value
 
     def update(self):
         dt = self.game.dt
-        self.pos += self.velocity * dt
+        if not (self.is_integrated_by_arrays() or self.is_sleeping):
+            self.pos.add_scaled(self.velocity, dt)
 
         self.till_velocity_changed -= dt
         if self.till_velocity_changed <= 0:
-            self.velocity = Enemy._random_velocity()
-            self.till_velocity_changed = Enemy._random_velocity_time()
+            self.change_velocity()
+
+    def change_velocity(self):
+        """
+        Changes velocity to a random one and chooses when it will be changed next time
+        """
+        self.velocity = Enemy._random_velocity(self.game.random)
+        self.wake()
+        self.till_velocity_changed = Enemy._random_velocity_time(self.game.random)
+
+    def components(self):
+        components = super().components()
+        components['wander'] = self.wander
+        components['renderable'] = Renderable(self.radius, Colors.white)
+        return components
+
+    def state_values(self):
+        return super().state_values() + (self.till_velocity_changed,)
 
     def draw(self, surface):
-        draw.circle(surface, Colors.white, self.pos.int_tuple(), self.radius)
+        self.game.render_queue.add_circle(self.render_pos(), self.radius, Colors.white)
 
     def destroy(self):
         super().destroy()
-
-    def check_collision(self, other):
-        return super().check_collision(other)
-
-    def on_collision(self, other):
-        return True
@@ -0,0 +1,143 @@
+import weakref
+
+import pygame as pg
+
+
+class EventBus:
+    """
+    Passes events to subscribed listeners.
+    Bound methods are referenced weakly, so subscribing doesn't keep an object alive and its listeners are
+    removed when it's collected. Other callables are referenced strongly and must be unsubscribed explicitly
+    """
+    coalesced_types = (pg.MOUSEMOTION,)
+
+    def __init__(self, filter_queue=False):
+        """
+        EventBus constructor
+        :param filter_queue: if True, pygame event queue only accepts event types that have subscribers
+        """
+        self.filter_queue = filter_queue
+        self._listeners = {}
+
+    @staticmethod
+    def _reference(listener):
+        if hasattr(listener, '__self__') and hasattr(listener, '__func__'):
+            return weakref.WeakMethod(listener)
+        return lambda: listener
+
+    def subscribe(self, event_type, listener):
+        """
+        Subscribes a listener function to event so it is called when event happens
+        :param event_type: event.type value of an event to listen
+        :param listener: (event) -> None event listener function
+        """
+        references = self._listeners.get(event_type)
+        if references is None:
+            self._listeners[event_type] = [EventBus._reference(listener)]
+            self._update_queue_filter()
+        else:
+            references.append(EventBus._reference(listener))
+
+    def unsubscribe(self, event_type, listener):
+        """
+        Unsubscribes a listener function from event
+        :param event_type: event.type value of an event
+        :param listener: listener function that was subscribed
+        :return: True if listener was unsubscribed, False if it wasn't subscribed
+        """
+        references = self._listeners.get(event_type, [])
+        for i, reference in enumerate(references):
+            if reference() == listener:
+                references.pop(i)
+                if not references:
+                    self._remove_type(event_type)
+                return True
+
+        return False
+
+    def _remove_type(self, event_type):
+        del self._listeners[event_type]
+        self._update_queue_filter()
+
+    def subscribed_types(self):
+        """
+        Returns event types that have listeners
+        :return: list of event types
+        """
+        return list(self._listeners.keys())
+
+    def _update_queue_filter(self):
+        """
+        Makes pygame event queue accept only event types that have listeners
+        """
+        if not self.filter_queue or not pg.display.get_init():
+            return
+
+        pg.event.set_blocked(None)
+        pg.event.set_allowed(self.subscribed_types())
+
+    def dispatch(self, event):
+        """
+        Passes an event to it's listeners
+        :param event: an event object
+        """
+        references = self._listeners.get(event.type)
+        if references is None:
+            return
+
+        dead = False
+        for reference in tuple(references):
+            listener = reference()
+            if listener is None:
+                dead = True
+            else:
+                listener(event)
+
+        if dead:
+            references[:] = [reference for reference in references if reference() is not None]
+            if not references and self._listeners.get(event.type) is references:
+                self._remove_type(event.type)
+
+    @staticmethod
+    def coalesce(events):
+        """
+        Merges events of high frequency types into one per call. The last event is kept in it's place,
+        relative motion of merged MOUSEMOTION events is summed
+        :param events: list of events
+        :return: list of events
+        """
+        last_index = {}
+        for i, event in enumerate(events):
+            if event.type in EventBus.coalesced_types:
+                last_index[event.type] = i
+        if not last_index:
+            return events
+
+        result = []
+        rel_x, rel_y = 0, 0
+        for i, event in enumerate(events):
+            if event.type not in last_index:
+                result.append(event)
+                continue
+
+            if event.type == pg.MOUSEMOTION:
+                d_x, d_y = getattr(event, 'rel', (0, 0))
+                rel_x, rel_y = rel_x + d_x, rel_y + d_y
+            if i != last_index[event.type]:
+                continue
+
+            if event.type == pg.MOUSEMOTION:
+                attributes = dict(event.dict)
+                attributes['rel'] = (rel_x, rel_y)
+                event = pg.event.Event(pg.MOUSEMOTION, attributes)
+            result.append(event)
+
+        return result
+
+    def dispatch_all(self, events):
+        """
+        Coalesces events and passes them to their listeners
+        :param events: list of events
+        """
+        for event in EventBus.coalesce(events):
+            self.dispatch(event)
@@ -1,13 +1,30 @@
+import argparse
+import asyncio
 import math
+import os
 import random
-import itertools
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
 import pygame as pg
 
-from common import GameObject, Colors, Vector, PhysicalObject
-from cannon import Cannon
+from common import GameObject, Colors, Vector, PhysicalObject, CollisionLayers
+from cannon import Cannon, Projectile
 from enemy import Enemy
 from scoreboard import Scoreboard
+from spatial import SpatialHash, StaticGrid
+from pool import ObjectPool
+from render import SpriteCache, RenderQueue
+from events import EventBus
+from profiler import FrameProfiler, ProfilerOverlay
 from tank import Tank
+from camera import Camera
+from startup import require
+from ecs import World
+import systems
 
 
 class Game:
@@ -16,173 +33,827 @@ class Game:
     """
     min_enemies = 2
     max_enemies = 6
+    collision_cell_size = 64
+    max_ticks_per_frame = 5
+    dirty_area_threshold = 0.4
+    pacing_margin = 0.002
+    culling_margin = 32
+
+    def __init__(self, resolution=(1280, 720), fps=50, background=Colors.black, physics_backend='python',
+                 headless=False, input_source=None, tick_rate=None, profile=False, trace_path=None, seed=None,
+                 stats_path=None, swarm_size=0, world_size=None, update_radius=None):
+        """
+        Game constructor
+        :param resolution: tuple (width, height) of the screen
+        :param fps: frames per second that are drawn
+        :param background: background color
+        :param physics_backend: 'python' to process physics object by object, 'ecs' to keep physical objects as
+        entities that are updated by systems, or 'numpy' to keep physical objects
+        in NumPy arrays and process them all at once
+        :param headless: if True, no window is opened and nothing is drawn
+        :param input_source: () -> list of events function that is called once in every tick instead of pg.event.get
+        :param tick_rate: physics updates per second. Equals fps if None
+        :param profile: if True, time of every frame phase is measured from the start
+        :param trace_path: path to write Chrome trace of profiled frames to when the game is finished
+        :param seed: seed of game's random number generator. A random seed is chosen if None
+        :param stats_path: path of JSON file that scoreboard statistics are periodically saved to, or None
+        :param swarm_size: number of enemies in a swarm that is spawned besides usual enemies
+        :param world_size: tuple (width, height) of the world. The camera follows the tank if it is larger than
+        the screen. Equals resolution if None
+        :param update_radius: physical objects farther than update_radius from the centre of the camera are frozen.
+        Nothing is frozen if None
+        """
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        # the display is needed by pg.event.get even without a window, it's started with the dummy driver if headless
+        require('display')
 
-    def __init__(self, resolution=(1280, 720), fps=50, background=Colors.black):
-        pg.init()
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.random = random.Random(self.seed)
 
         self.resolution = resolution
         self.fps = fps
-        self.dt = 1 / fps
+        self.tick_rate = fps if tick_rate is None else tick_rate
+        self.dt = 1 / self.tick_rate
+        self.alpha = 1.0
         self.background = background
 
+        self.world_size = resolution if world_size is None else world_size
         width, height = resolution
-        self._x_border = (0, width)
-        self._y_border = (0.1 * height, height)
+        world_width, world_height = self.world_size
+        self._x_border = (0, world_width)
+        self._y_border = (0.1 * height, world_height)
 
-        self.screen = pg.display.set_mode(resolution)
-        self.clock = pg.time.Clock()
+        self.camera = Camera(resolution, self.world_size)
+        self.view_rect = self.camera.view_rect(Game.culling_margin)
+        self.update_radius = update_radius
+        self.tank = None
 
-        self.object_pool = []
-        self.physical_pool = []
-        self.event_listeners = {}
+        self.headless = headless
+        self.screen = None if headless else pg.display.set_mode(resolution)
+        self.clock = pg.time.Clock()
+        self.input_source = pg.event.get if input_source is None else input_source
+        self.mouse_pos = (0, 0) if headless else pg.mouse.get_pos()
+
+        self.render_queue = RenderQueue(SpriteCache())
+        self._drawn_rects = None
+
+        self.tick = 0
+        self.started = False
+        self.finished = False
+
+        self.object_pool = ObjectPool()
+        self._unculled_objects = ObjectPool()
+        self.physical_pool = ObjectPool()
+        self._active_physicals = ObjectPool()
+        self._destroyed_objects = []
+        self._destroyed_physicals = []
+        self.event_bus = EventBus(filter_queue=input_source is None)
+        for event_type in (pg.MOUSEMOTION, pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP):
+            self.subscribe_to_event(event_type, self._mouse_listener)
+        self.subscribe_to_event(pg.VIDEOEXPOSE, self._expose_listener)
+        self.subscribe_to_event(pg.QUIT, self._quit_listener)
+        self._spatial_hash = SpatialHash(Game.collision_cell_size)
+        self._frozen_grid = StaticGrid(Game.collision_cell_size)
+        self.collision_handlers = {}
+        self.add_collision_handler(CollisionLayers.projectile, CollisionLayers.enemy, Projectile.hit_enemy)
+
+        self.physics_backend = physics_backend
+        self.physics = None
+        self.world = None
+        self.batched_objects = ObjectPool()
+        if physics_backend == 'numpy':
+            from array_physics import ArrayPhysics
+            self.physics = ArrayPhysics(self._x_border, self._y_border)
+        elif physics_backend == 'ecs':
+            self.world = World()
+        elif physics_backend != 'python':
+            raise ValueError('unknown physics backend', physics_backend)
+
+        self.pair_count = 0
+        self.profiler = FrameProfiler(1 / fps, enabled=profile, trace_path=trace_path)
+
+        self.stats_path = stats_path
+        self.swarm_size = swarm_size
+        self.swarm = None
+        self._event_loop = None
+        self._background_tasks = set()
 
         self.scoreboard = Scoreboard(self)
+        if not headless:
+            self.profiler_overlay = ProfilerOverlay(self, self.profiler)
 
     def add_object(self, game_object: GameObject):
         """
-        Adds new game object to pool. This object is updated and drawn in every frame
+        Adds new game object to pool. This object is updated in every frame and drawn when it is visible.
+        Objects that are updated in batch and, with entity-component backend, physical objects are kept apart.
+        They are updated and drawn by their batch or by systems
         :param game_object: an object to add
         """
-        self.object_pool.append(game_object)
+        if game_object.updated_in_batch or (self.world is not None and isinstance(game_object, PhysicalObject)):
+            self.batched_objects.add(game_object)
+            return
+
+        self.object_pool.add(game_object)
+        if not isinstance(game_object, PhysicalObject):
+            # only physical objects are found by position, others are drawn in every frame
+            self._unculled_objects.add(game_object)
+
+    def object_count(self):
+        """
+        Returns number of game objects
+        """
+        return len(self.object_pool) + len(self.batched_objects)
 
     def destroy_object(self, game_object: GameObject):
         """
-        Tries to destroy a game object
+        Tries to destroy a game object. The object is removed from pool at the end of current tick
         :param game_object: an object to destroy
         :return: if the object was destroyed
         """
-        try:
-            self.object_pool.remove(game_object)
-            return True
-        except ValueError:
+        if game_object not in self.object_pool and game_object not in self.batched_objects:
             return False
 
+        self._destroyed_objects.append(game_object)
+        return True
+
     def add_physical(self, physical_object: PhysicalObject):
         """
         Adds new physical object to pool. Collision of this object with other physical objects is checked every frame
         :param physical_object: an object to add
         """
-        self.physical_pool.append(physical_object)
+        self.physical_pool.add(physical_object)
+        self._active_physicals.add(physical_object)
+        if self.physics is not None:
+            self.physics.add(physical_object)
+        else:
+            # the object can be found by query_rect before the next rebuild of the spatial hash
+            self._spatial_hash.insert(physical_object, self.dt)
+        if self.world is not None:
+            physical_object.entity = self.world.create(physical_object.components())
 
     def destroy_physical(self, physical_object: PhysicalObject):
         """
-        Tries to destroy a physical object
+        Tries to destroy a physical object. The object is removed from pool at the end of current tick
         :param physical_object: an object to destroy
         :return: if the object was destroyed
         """
-        try:
-            self.physical_pool.remove(physical_object)
-            return True
-        except ValueError:
+        if physical_object not in self.physical_pool:
             return False
 
+        self._destroyed_physicals.append(physical_object)
+        return True
+
+    def flush_destroyed(self):
+        """
+        Removes objects destroyed during current tick from pools
+        """
+        removed = [game_object for game_object in self._destroyed_objects
+                   if self.object_pool.remove(game_object) or self.batched_objects.remove(game_object)]
+        self._destroyed_objects.clear()
+        for game_object in removed:
+            self._unculled_objects.remove(game_object)
+
+        for physical_object in self._destroyed_physicals:
+            if not self.physical_pool.remove(physical_object):
+                continue
+            if not self._active_physicals.remove(physical_object):
+                self._frozen_grid.remove(physical_object)
+            if self.physics is not None:
+                self.physics.remove(physical_object)
+            if self.world is not None:
+                self.world.destroy(physical_object.entity)
+                physical_object.entity = None
+        self._destroyed_physicals.clear()
+
+        for game_object in removed:
+            game_object.on_removed()
+
     def subscribe_to_event(self, event_type, listener):
         """
         Subscribes a listener function to event so it is called when event happens
         :param event_type: event.type value of an event to listen
-        :param listener: (event) -> None event listener function
+        :param listener: (event) -> None event listener function. Bound methods are referenced weakly
         """
-        if event_type in self.event_listeners.keys():
-            self.event_listeners[event_type].append(listener)
-        else:
-            self.event_listeners[event_type] = [listener]
+        self.event_bus.subscribe(event_type, listener)
+
+    def unsubscribe_from_event(self, event_type, listener):
+        """
+        Unsubscribes a listener function from event
+        :param event_type: event.type value of an event
+        :param listener: listener function that was subscribed
+        :return: True if listener was unsubscribed, False if it wasn't subscribed
+        """
+        return self.event_bus.unsubscribe(event_type, listener)
+
+    def dispatch_event(self, event):
+        """
+        Passes an event to it's listeners
+        :param event: an event object
+        """
+        self.event_bus.dispatch(event)
+
+    def process_events(self):
+        """
+        Takes events of current tick from input source and dispatches them. MOUSEMOTION events are merged into one
+        """
+        self.event_bus.dispatch_all(self.input_source())
+
+    def _mouse_listener(self, event):
+        """
+        Mouse events listener that tracks mouse position
+        :param event: an event object
+        """
+        self.mouse_pos = event.pos
+
+    def _expose_listener(self, event):
+        """
+        VIDEOEXPOSE event listener. Window contents were lost so the whole screen is redrawn
+        :param event: an event object
+        """
+        self._drawn_rects = None
+
+    def _quit_listener(self, event):
+        """
+        QUIT event listener
+        :param event: an event object
+        """
+        self.finished = True
+        self.on_finished()
 
     def _collide_with_border(self, physical_object):
         """
         Checks and performs collision with border if necessary
         :param physical_object: an object to check
-        :param energy_conserved: how much kinetic energy is conserved during collision
         """
         x, y = physical_object.pos
         min_x, max_x = self._x_border
         min_y, max_y = self._y_border
-        speed = physical_object.velocity.magnitude()
-        direction = physical_object.velocity.normalize()
+        velocity = physical_object.velocity
+        v_x, v_y = velocity.x, velocity.y
         radius = physical_object.radius
-        collided = False
 
-        if (x <= min_x + radius and direction.x < 0) or (x >= max_x - radius and direction.x > 0):
-            speed = math.sqrt(physical_object.energy_conserved * speed**2)
-            direction = Vector(-direction.x, direction.y)
-            physical_object.velocity = direction * speed
-            collided = True
+        hit_x = (x <= min_x + radius and v_x < 0) or (x >= max_x - radius and v_x > 0)
+        hit_y = (y <= min_y + radius and v_y < 0) or (y >= max_y - radius and v_y > 0)
+
+        if hit_x or hit_y:
+            physical_object.bounces += 1
+            factor = math.sqrt(physical_object.energy_conserved)
+            physical_object.velocity = velocity.set(-v_x * factor if hit_x else v_x * factor,
+                                                    -v_y * factor if hit_y else v_y * factor)
+
+    def reflect_from_borders(self, physical_object):
+        """
+        Moves an object that passed through a border during the last step back inside, as if it bounced off
+        the border at the moment of impact. Used for fast objects that can move farther than their size in one step
+        :param physical_object: an object to check
+        """
+        pos = physical_object.pos
+        x, y = pos.x, pos.y
+        radius = physical_object.radius
+        min_x, max_x = self._x_border[0] + radius, self._x_border[1] - radius
+        min_y, max_y = self._y_border[0] + radius, self._y_border[1] - radius
+
+        new_x = 2 * min_x - x if x < min_x else 2 * max_x - x if x > max_x else x
+        new_y = 2 * min_y - y if y < min_y else 2 * max_y - y if y > max_y else y
+        if new_x == x and new_y == y:
+            return
+
+        self._collide_with_border(physical_object)
+        physical_object.pos = pos.set(min(max(new_x, min_x), max_x), min(max(new_y, min_y), max_y))
 
-        if (y <= min_y + radius and direction.y < 0) or (y >= max_y - radius and direction.y > 0):
-            if not collided:
-                speed = math.sqrt(physical_object.energy_conserved * speed ** 2)
-            direction = Vector(direction.x, -direction.y)
-            physical_object.velocity = direction * speed
+    def add_collision_handler(self, layer1, layer2, handler):
+        """
+        Sets a function that is called when objects of two collision layers collide.
+        Objects are checked for collision only if layer of one of them is in collision mask of the other
+        :param layer1: collision layer of the first object
+        :param layer2: collision layer of the second object
+        :param handler: (object1, object2) -> None function that is called with objects in order of their layers
+        """
+        self.collision_handlers[(layer1, layer2)] = (handler, False)
+        if layer1 != layer2:
+            self.collision_handlers[(layer2, layer1)] = (handler, True)
+
+    def _handle_collision(self, object1, object2, handler):
+        """
+        Calls collision handler with objects in order of their layers
+        :param handler: tuple (handler, if objects must be swapped)
+        """
+        function, swapped = handler
+        if swapped:
+            function(object2, object1)
+        else:
+            function(object1, object2)
 
     def update_physics(self):
         """
         Called once in every frame to check collisions
         """
-        for ph_object in self.physical_pool:
+        if self.physics is not None:
+            self._update_array_physics()
+            return
+
+        for ph_object in self._active_physicals:
+            if ph_object.is_sleeping:
+                continue
             if ph_object.collides_with_borders:
                 self._collide_with_border(ph_object)
-        for object1, object2 in itertools.combinations(self.physical_pool, 2):
-            if object1.check_collision(object2):
-                if object1.on_collision(object2):
-                    object2.on_collision(object1)
+            ph_object.update_sleep()
+
+        self._spatial_hash.rebuild(self._active_physicals, self.dt)
+        pairs = self._spatial_hash.candidate_pairs()
+        self.pair_count = len(pairs)
+        handlers = self.collision_handlers
+        dt = self.dt
+        for object1, object2 in pairs:
+            handler = handlers.get((object1.collision_layer, object2.collision_layer))
+            if handler is None or not (object1.is_alive and object2.is_alive):
+                continue
+            # the same test as PhysicalObject.check_collision, done here without a method call for every pair
+            if object1.continuous_collision or object2.continuous_collision:
+                collides = object1.time_of_impact(object2, dt) is not None
+            else:
+                distance = object1.radius + object2.radius
+                collides = (object1.pos - object2.pos).magnitude_squared() <= distance * distance
+            if collides:
+                if object1.is_sleeping:
+                    object1.wake_by(object2)
+                elif object2.is_sleeping:
+                    object2.wake_by(object1)
+                self._handle_collision(object1, object2, handler)
+
+    def _update_array_physics(self):
+        """
+        Checks collisions of physical objects held by array physics backend
+        """
+        self.physics.collide_with_borders()
+        self.physics.update_sleep(PhysicalObject.sleep_speed, PhysicalObject.sleep_ticks,
+                                 PhysicalObject.floor_distance)
+
+        contacts = self.physics.find_contacts(self.dt, PhysicalObject.sleep_speed)
+        self.pair_count = len(contacts)
+        if len(contacts) == 0:
+            return
+
+        objects = list(self.physics.objects)
+        handlers = self.collision_handlers
+        for i, j in contacts.tolist():
+            object1, object2 = objects[i], objects[j]
+            handler = handlers.get((object1.collision_layer, object2.collision_layer))
+            if handler is not None and object1.is_alive and object2.is_alive:
+                self._handle_collision(object1, object2, handler)
+
+    def query_radius(self, pos, radius):
+        """
+        Finds physical objects that intersect a circle. Uses positions from the last physics update
+        :param pos: centre of the circle
+        :param radius: radius of the circle
+        :return: list of physical objects
+        """
+        if self.physics is not None:
+            return self.physics.query_radius(pos, radius)
+        return [ph_object for ph_object in self._spatial_hash.query_radius(pos, radius) if ph_object.is_alive] \
+            + self._frozen_grid.query_radius(pos, radius)
+
+    def query_rect(self, rect):
+        """
+        Finds physical objects that intersect a rectangle. Uses positions from the last physics update
+        :param rect: tuple (x, y, width, height) of a rectangle
+        :return: list of physical objects
+        """
+        if self.physics is not None:
+            return self.physics.query_rect(rect)
+        return [ph_object for ph_object in self._spatial_hash.query_rect(rect) if ph_object.is_alive] \
+            + self._frozen_grid.query_rect(rect)
+
+    def freeze_far_objects(self):
+        """
+        Freezes physical objects farther than update_radius from the centre of the camera and unfreezes
+        the ones that came near. Without array backend frozen objects are moved from the spatial hash to a static
+        grid, so they aren't checked for collisions and cost nothing until the camera comes near
+        """
+        center = self.camera.center()
+        if self.physics is not None:
+            self.physics.freeze_far(center, self.update_radius)
+            return
+
+        x, y = center
+        radius_squared = self.update_radius ** 2
+        for ph_object in list(self._active_physicals):
+            pos = ph_object.pos
+            if (pos.x - x) ** 2 + (pos.y - y) ** 2 > radius_squared:
+                ph_object.freeze()
+                self._active_physicals.remove(ph_object)
+                self._frozen_grid.insert(ph_object)
+
+        for ph_object in self._frozen_grid.query_radius(center, self.update_radius):
+            pos = ph_object.pos
+            if (pos.x - x) ** 2 + (pos.y - y) ** 2 <= radius_squared:
+                ph_object.unfreeze()
+                self._frozen_grid.remove(ph_object)
+                self._active_physicals.add(ph_object)
 
     def update(self):
         """
-        Called once in every frame to update game objects
+        Called once in every frame to update game objects. Frozen objects aren't updated
         """
+        if self.tank is not None:
+            self.camera.follow(self.tank.pos)
+        if self.update_radius is not None:
+            self.freeze_far_objects()
+
         self.update_physics()
+        self.profiler.mark('physics')
+
+        if self.physics is not None:
+            self.physics.remember_positions()
+            self.physics.integrate(self.dt)
+        if self.world is not None:
+            systems.update(self.world, self.dt)
 
         for game_object in self.object_pool:
-            game_object.update()
+            if game_object.is_alive and not game_object.is_frozen:
+                game_object.remember_position()
+                game_object.update()
+
+        self.flush_destroyed()
+        self.tick += 1
+        self.profiler.mark('update')
 
     def draw(self):
         """
-        Called once in every frame to draw game objects
+        Called once in every frame to draw game objects. Objects are drawn between their previous and current
+        positions according to Game.alpha.
+        Only areas where objects were drawn in previous frame are cleared. If they cover more than
+        dirty_area_threshold of the screen, the whole screen is redrawn
+        :return: list of rectangles that changed since previous frame or None if the whole screen changed
         """
-        self.screen.fill(self.background)
+        if self.screen is None:
+            return None
 
-        for game_object in self.object_pool:
-            game_object.draw(self.screen)
+        previous_rects, full_redraw = self._clear_screen()
+        drawn_rects = self.record_draw_commands(self.screen)
+        drawn_rects.extend(self.render_queue.flush(self.screen))
+        return self._dirty_rects(previous_rects, full_redraw, drawn_rects)
+
+    def record_draw_commands(self, surface):
+        """
+        Moves the camera to the tank and lets visible game objects queue their drawing commands into render_queue.
+        Physical objects are found by position in view_rect, so objects outside of the screen cost nothing
+        :param surface: surface for objects that draw directly, or None if drawing is only queued
+        :return: list of rectangles that objects have drawn directly
+        """
+        if self.tank is not None:
+            self.camera.follow(self.tank.render_pos())
+        self.render_queue.offset = self.camera.offset()
+        self.view_rect = self.camera.view_rect(Game.culling_margin)
+
+        drawn_rects = []
+        for game_object in self._unculled_objects:
+            rect = game_object.draw(surface)
+            if rect is not None:
+                drawn_rects.append(rect)
+        if self.world is not None:
+            systems.render(self.world, self.render_queue, self.alpha, self.view_rect)
+            return drawn_rects
+
+        for ph_object in self.query_rect(self.view_rect):
+            if ph_object.updated_in_batch:
+                continue
+            rect = ph_object.draw(surface)
+            if rect is not None:
+                drawn_rects.append(rect)
+        return drawn_rects
+
+    def present(self, render_queue):
+        """
+        Draws commands of a recorded frame on screen
+        :param render_queue: RenderQueue with recorded commands
+        :return: list of rectangles that changed since previous frame or None if the whole screen changed
+        """
+        if self.screen is None:
+            return None
+
+        previous_rects, full_redraw = self._clear_screen()
+        return self._dirty_rects(previous_rects, full_redraw, render_queue.flush(self.screen))
+
+    def _clear_screen(self):
+        """
+        Clears areas drawn in previous frame or the whole screen if they are too big
+        :return: tuple (rectangles of previous frame, True if the whole screen was cleared)
+        """
+        previous_rects = self._drawn_rects
+        full_redraw = previous_rects is None or self._area(previous_rects) > self._full_redraw_area()
+        if full_redraw:
+            self.screen.fill(self.background)
+        else:
+            for rect in previous_rects:
+                self.screen.fill(self.background, rect)
+
+        return previous_rects, full_redraw
+
+    def _dirty_rects(self, previous_rects, full_redraw, drawn_rects):
+        """
+        Remembers drawn rectangles and finds rectangles of the screen to update
+        :return: list of rectangles or None if the whole screen must be updated
+        """
+        self._drawn_rects = drawn_rects
+        if full_redraw:
+            return None
+
+        dirty_rects = previous_rects + drawn_rects
+        if self._area(dirty_rects) > self._full_redraw_area():
+            return None
+        return dirty_rects
+
+    def _full_redraw_area(self):
+        width, height = self.resolution
+        return Game.dirty_area_threshold * width * height
+
+    @staticmethod
+    def _area(rects):
+        return sum(rect.width * rect.height for rect in rects)
+
+    def update_display(self, dirty_rects):
+        """
+        Shows drawn frame on screen
+        :param dirty_rects: list of rectangles to update or None to update the whole screen
+        """
+        if dirty_rects is None:
+            pg.display.update()
+        else:
+            pg.display.update(dirty_rects)
 
     def spawn_enemies(self):
-        number = random.randint(Game.min_enemies, Game.max_enemies + 1)
+        number = self.random.randint(Game.min_enemies, Game.max_enemies + 1)
         self.enemies = [Enemy(Vector(200, 200), self) for i in range(number)]
 
+    def state_checksum(self):
+        """
+        Computes checksum of simulated state of all game objects. Equal games have equal checksums
+        :return: integer checksum
+        """
+        values = [self.tick]
+        for game_object in self.object_pool:
+            values.extend(game_object.state_values())
+        for game_object in self.batched_objects:
+            values.extend(game_object.state_values())
+
+        return zlib.crc32(struct.pack(f'<{len(values)}d', *values))
+
+    def snapshot(self):
+        """
+        Saves state of all objects and random generators into a compact binary snapshot. Must be called between ticks
+        :return: bytes of the snapshot
+        """
+        import snapshot
+        return snapshot.take(self)
+
+    def restore(self, data):
+        """
+        Restores state saved by snapshot. The game continues exactly as the saved one would
+        :param data: bytes or another buffer of the snapshot, e.g. memory-mapped file
+        """
+        import snapshot
+        snapshot.restore(self, data)
+
     def on_finished(self):
         """
         Called when the game is finished
         """
-        pass
+        self.profiler.finish()
+        if self.stats_path is not None:
+            self.schedule(self.scoreboard.save(self.stats_path))
+
+    def start(self):
+        """
+        Creates the tank and first enemies. Called once before the first tick
+        """
+        if self.started:
+            return
+
+        self.started = True
+        self.tank = Tank(self)
+        self.spawn_enemies()
+        if self.swarm_size > 0:
+            from swarm import Swarm
+            self.swarm = Swarm(self, self.swarm_size)
+
+    def step(self, n=1):
+        """
+        Advances the game n ticks as fast as possible without drawing
+        :param n: number of ticks
+        :return: number of ticks done, less than n if the game was finished
+        """
+        self.start()
+
+        for i in range(n):
+            if self.finished:
+                return i
+            self.profiler.start_frame()
+            self.process_events()
+            self.profiler.mark('events')
+            self.update()
+            self.profiler.end_frame(self.object_count(), self.pair_count)
+
+        return n
+
+    def _frame(self, accumulator):
+        """
+        Processes events, updates the game with fixed time step dt as many times as accumulated time requires,
+        but no more than max_ticks_per_frame times, and draws a frame
+        :param accumulator: real time in seconds that isn't simulated yet
+        :return: accumulator left after the frame
+        """
+        self.profiler.start_frame()
+        self.process_events()
+        self.profiler.mark('events')
+
+        ticks = 0
+        while accumulator >= self.dt and ticks < Game.max_ticks_per_frame:
+            self.update()
+            accumulator -= self.dt
+            ticks += 1
+        if ticks == Game.max_ticks_per_frame:
+            accumulator = min(accumulator, self.dt)
+
+        self.alpha = accumulator / self.dt
+        if not self.headless:
+            dirty_rects = self.draw()
+            self.profiler.mark('draw')
+            self.update_display(dirty_rects)
+            self.profiler.mark('display')
+
+        self.profiler.end_frame(self.object_count(), self.pair_count)
+        return accumulator
 
     def start_loop(self):
         """
-        Starts game's main loop. Can execute infinitely long
+        Starts game's main loop. Can execute infinitely long.
+        Game is updated with fixed time step dt as many times as real time elapsed requires, but no more than
+        max_ticks_per_frame times per frame
+        """
+        self.start()
+        accumulator = 0.0
+
+        while not self.finished:
+            accumulator = self._frame(accumulator + self.clock.tick(self.fps) / 1000)
+
+    def _simulate(self, events, ticks):
+        """
+        Dispatches events, updates the game and records draw commands into render_queue.
+        Runs in simulation thread of pipelined loop
+        :param events: list of events
+        :param ticks: number of ticks to do
         """
-        def do_loop():
+        self.event_bus.dispatch_all(events)
+        for i in range(ticks):
             self.update()
-            self.draw()
-            pg.display.update()
+        self.record_draw_commands(None)
+
+    def start_pipelined_loop(self):
+        """
+        Version of start_loop that simulates the next frame in a separate thread while the main thread draws
+        the previous one. Simulation records draw commands into one of two render queues and the main thread draws
+        the other one, the queues are swapped every frame. Draw commands hold copies of object state, so they
+        aren't changed by simulation. Frames are shown one frame later than in start_loop.
+        Game objects must only queue commands when drawing, they get None instead of the surface
+        """
+        self.start()
+        accumulator = 0.0
+        back = self.render_queue
+        front = RenderQueue(back.sprite_cache)
+        has_front = False
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='simulation') as simulation:
+            while not self.finished:
+                accumulator += self.clock.tick(self.fps) / 1000
+                self.profiler.start_frame()
+                events = self.input_source()
+
+                ticks = min(int(accumulator / self.dt), Game.max_ticks_per_frame)
+                accumulator -= ticks * self.dt
+                if ticks == Game.max_ticks_per_frame:
+                    accumulator = min(accumulator, self.dt)
+                self.alpha = accumulator / self.dt
+
+                self.render_queue = back
+                simulated = simulation.submit(self._simulate, events, ticks)
+                if has_front and not self.headless:
+                    dirty_rects = self.present(front)
+                    self.profiler.mark('draw')
+                    self.update_display(dirty_rects)
+                    self.profiler.mark('display')
+
+                simulated.result()
+                self.profiler.mark('simulation')
+                back, front = front, back
+                has_front = True
+                self.profiler.end_frame(self.object_count(), self.pair_count)
+
+        self.render_queue = back
+
+    def attach_loop(self, loop):
+        """
+        Attaches a running event loop to a game that is driven from outside, e.g. by a server calling step,
+        so coroutines passed to schedule run in background on it
+        :param loop: running asyncio event loop, or None to detach it
+        """
+        self._event_loop = loop
 
-        finished = False
+    async def wait_until(self, deadline):
+        """
+        Yields to the event loop until deadline. Sleeps till pacing_margin before it and then yields without
+        sleeping, because asyncio timers aren't precise enough for frame pacing
+        :param deadline: time.perf_counter() value
+        """
+        remaining = deadline - time.perf_counter()
+        if remaining > Game.pacing_margin:
+            await asyncio.sleep(remaining - Game.pacing_margin)
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0)
 
-        self._tank = Tank(self)
-        self.spawn_enemies()
+    async def run(self):
+        """
+        Asynchronous version of start_loop. Between frames control is given to the event loop, so coroutines
+        scheduled with schedule run without blocking frames. Returns when the game is finished and all
+        scheduled coroutines are done
+        """
+        self.start()
+        self.attach_loop(asyncio.get_running_loop())
+        frame_time = 1 / self.fps
+        accumulator = 0.0
+        last_frame = next_frame = time.perf_counter()
 
-        while not finished:
-            self.clock.tick(self.fps)
-            for event in pg.event.get():
-                if event.type in self.event_listeners:
-                    for listener in self.event_listeners[event.type]:
-                        listener(event)
-                if event.type == pg.QUIT:
-                    finished = True
-                    self.on_finished()
+        try:
+            while not self.finished:
+                # if a frame was late, the next one isn't hurried to catch up
+                next_frame = max(next_frame + frame_time, time.perf_counter())
+                await self.wait_until(next_frame)
 
-            do_loop()
+                now = time.perf_counter()
+                accumulator = self._frame(accumulator + now - last_frame)
+                last_frame = now
+
+            if self._background_tasks:
+                await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        finally:
+            self.attach_loop(None)
+
+    def schedule(self, coroutine):
+        """
+        Runs a coroutine in background while the game is run by run. Blocking work should be passed
+        to asyncio.to_thread inside the coroutine. If the game is run by start_loop or step, the coroutine is
+        run to completion immediately
+        :param coroutine: coroutine object
+        :return: asyncio.Task or None if the coroutine was run immediately
+        """
+        if self._event_loop is None:
+            asyncio.run(coroutine)
+            return None
+
+        task = self._event_loop.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    def _background_task_done(self, task):
+        """
+        Forgets a finished background task and reports it's exception
+        :param task: finished asyncio.Task
+        """
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f'Background task failed: {task.exception()!r}', file=sys.stderr)
 
 
 def main():
-    game = Game()
-    game.start_loop()
+    parser = argparse.ArgumentParser(description='Lab8 game')
+    parser.add_argument('--seed', type=int, help='seed of random generator')
+    parser.add_argument('--record', metavar='PATH', help='record input to a file that can be replayed with replay.py')
+    parser.add_argument('--stats', metavar='PATH', help='save scoreboard statistics to a JSON file')
+    parser.add_argument('--asyncio', action='store_true', help='run the game loop in asyncio event loop')
+    parser.add_argument('--pipelined', action='store_true', help='simulate next frame while drawing the previous one')
+    parser.add_argument('--physics', choices=('python', 'numpy', 'ecs'), default='python', help='physics backend')
+    parser.add_argument('--swarm', type=int, default=0, metavar='N', help='spawn a swarm of N enemies')
+    parser.add_argument('--world', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help='size of the world')
+    parser.add_argument('--update-radius', type=float, metavar='R',
+                        help='freeze objects farther than R from the centre of the screen')
+    args = parser.parse_args()
+
+    game = Game(seed=args.seed, stats_path=args.stats, physics_backend=args.physics, swarm_size=args.swarm,
+                world_size=args.world and tuple(args.world), update_radius=args.update_radius)
+    if args.record is not None:
+        from replay import InputRecorder
+        InputRecorder(game, args.record)
+
+    if args.asyncio:
+        asyncio.run(game.run())
+    elif args.pipelined:
+        game.start_pipelined_loop()
+    else:
+        game.start_loop()
 
 
 if __name__ == '__main__':
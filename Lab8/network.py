@@ -0,0 +1,817 @@
+import argparse
+import asyncio
+import math
+import os
+import struct
+import sys
+import time
+from functools import partial
+
+import numpy as np
+import pygame as pg
+
+from cannon import Cannon, Projectile
+from camera import Camera
+from common import Colors, Vector
+from enemy import Enemy
+from render import RenderQueue, SpriteCache
+from startup import require
+from tank import Tank
+
+
+class NetFormat:
+    """
+    Messages of networked game. Every message is prefixed by it's length and starts with a tag byte.
+    States hold quantized positions and velocities of physical objects that are near the camera. A state only
+    holds fields that changed since a baseline state the client has acknowledged. Fields of changed objects
+    are stored column by column, so they are packed and unpacked as whole arrays
+    """
+    magic = b'L8NT'
+    version = 1
+
+    length = struct.Struct('<I')
+    tag = struct.Struct('<B')
+    # magic, version
+    hello = struct.Struct('<4sH')
+    # tick rate, world width, world height
+    welcome = struct.Struct('<dII')
+    # acknowledged tick, aim x, aim y, motion direction, is mouse down
+    input = struct.Struct('<IffbB')
+    # tick, baseline tick, number of removed objects, number of changed objects
+    state = struct.Struct('<IIII')
+    # position, direction, shooting power, is mouse down
+    tank = struct.Struct('<iihhBB')
+
+    hello_tag = 0
+    welcome_tag = 1
+    input_tag = 2
+    state_tag = 3
+
+    no_baseline = 0xFFFFFFFF
+    max_message = 64 * 1024 * 1024
+
+    enemy_kind = 0
+    projectile_kind = 1
+    radii = {enemy_kind: Enemy.body_radius, projectile_kind: Projectile.max_radius}
+
+    # bits of a changed object's mask
+    x_bit = 1
+    y_bit = 2
+    velocity_x_bit = 4
+    velocity_y_bit = 8
+    new_bit = 16
+
+    position_scale = 8
+    velocity_scale = 16
+    direction_scale = 32767
+    power_scale = 255
+
+    # objects this far outside the screen are still sent, so they don't pop in at screen edges
+    relevance_margin = 200
+    history_ticks = 64
+
+
+class NetFrame:
+    """
+    Quantized state of objects near the camera at a tick. Objects are sorted by their network ids
+    """
+
+    def __init__(self, tick, ids, kinds, positions, velocities, tank):
+        """
+        NetFrame constructor
+        :param tick: tick of the game
+        :param ids: uint32 array of network ids
+        :param kinds: uint8 array of object kinds
+        :param positions: int32 array (n, 2) of quantized positions
+        :param velocities: int16 array (n, 2) of quantized velocities
+        :param tank: tuple of quantized tank state in order of NetFormat.tank
+        """
+        self.tick = tick
+        self.ids = ids
+        self.kinds = kinds
+        self.positions = positions
+        self.velocities = velocities
+        self.tank = tank
+
+    @staticmethod
+    def empty():
+        """
+        Returns a frame without objects that is used as a baseline of full states
+        """
+        return NetFrame(NetFormat.no_baseline, np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint8),
+                        np.zeros((0, 2), dtype=np.int32), np.zeros((0, 2), dtype=np.int16), None)
+
+
+def quantize_positions(positions):
+    return np.rint(positions * NetFormat.position_scale).astype(np.int32)
+
+
+def quantize_velocities(velocities):
+    return np.clip(np.rint(velocities * NetFormat.velocity_scale), -32767, 32767).astype(np.int16)
+
+
+def _frame(data):
+    """
+    Prefixes a message with it's length
+    """
+    return NetFormat.length.pack(len(data)) + data
+
+
+def _trim_history(frames, latest_tick):
+    """
+    Removes frames that are history_ticks or more older than the latest one. Every old frame is removed, also
+    when frames of some ticks were skipped
+    :param frames: dictionary {tick: NetFrame}
+    :param latest_tick: tick of the latest frame
+    """
+    oldest = latest_tick - NetFormat.history_ticks
+    for tick in [tick for tick in frames if tick <= oldest]:
+        del frames[tick]
+
+
+async def _read_message(reader):
+    """
+    Reads a message
+    :return: tuple (tag, body)
+    """
+    length, = NetFormat.length.unpack(await reader.readexactly(NetFormat.length.size))
+    if length < NetFormat.tag.size or length > NetFormat.max_message:
+        raise ValueError(f'invalid message length {length}')
+    data = await reader.readexactly(length)
+    return data[0], memoryview(data)[NetFormat.tag.size:]
+
+
+def encode_state(frame, base):
+    """
+    Encodes a state message with objects of frame that changed since base
+    :param frame: NetFrame to send
+    :param base: NetFrame acknowledged by the client or None to send all objects
+    :return: bytes of the message
+    """
+    base_tick = NetFormat.no_baseline if base is None else base.tick
+    base = NetFrame.empty() if base is None else base
+
+    ids = frame.ids
+    mask = np.full(len(ids), NetFormat.new_bit | NetFormat.x_bit | NetFormat.y_bit
+                   | NetFormat.velocity_x_bit | NetFormat.velocity_y_bit, dtype=np.uint8)
+    if len(base.ids):
+        index = np.minimum(np.searchsorted(base.ids, ids), len(base.ids) - 1)
+        existing = np.flatnonzero(base.ids[index] == ids)
+        index = index[existing]
+        position_changed = frame.positions[existing] != base.positions[index]
+        velocity_changed = frame.velocities[existing] != base.velocities[index]
+        mask[existing] = (position_changed[:, 0] * NetFormat.x_bit | position_changed[:, 1] * NetFormat.y_bit
+                          | velocity_changed[:, 0] * NetFormat.velocity_x_bit
+                          | velocity_changed[:, 1] * NetFormat.velocity_y_bit)
+
+    changed = np.flatnonzero(mask)
+    mask = mask[changed]
+    removed = base.ids[~np.isin(base.ids, ids, assume_unique=True)]
+
+    parts = [NetFormat.tag.pack(NetFormat.state_tag),
+             NetFormat.state.pack(frame.tick, base_tick, len(removed), len(changed)),
+             NetFormat.tank.pack(*frame.tank),
+             removed.astype('<u4').tobytes(), ids[changed].astype('<u4').tobytes(), mask.tobytes(),
+             frame.kinds[changed[mask & NetFormat.new_bit != 0]].tobytes()]
+    for bit, column in ((NetFormat.x_bit, frame.positions[:, 0]), (NetFormat.y_bit, frame.positions[:, 1])):
+        parts.append(column[changed[mask & bit != 0]].astype('<i4').tobytes())
+    for bit, column in ((NetFormat.velocity_x_bit, frame.velocities[:, 0]),
+                        (NetFormat.velocity_y_bit, frame.velocities[:, 1])):
+        parts.append(column[changed[mask & bit != 0]].astype('<i2').tobytes())
+    return _frame(b''.join(parts))
+
+
+def decode_state(data, frames):
+    """
+    Decodes a state message
+    :param data: body of the message after the tag
+    :param frames: dictionary {tick: NetFrame} of frames that can be baselines
+    :return: NetFrame
+    """
+    tick, base_tick, removed_count, changed_count = NetFormat.state.unpack_from(data)
+    offset = NetFormat.state.size
+    tank = NetFormat.tank.unpack_from(data, offset)
+    offset += NetFormat.tank.size
+    if base_tick == NetFormat.no_baseline:
+        base = NetFrame.empty()
+    elif base_tick in frames:
+        base = frames[base_tick]
+    else:
+        raise ValueError(f'baseline of tick {base_tick} is unknown')
+
+    def read(dtype, count):
+        nonlocal offset
+        array = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        return array
+
+    removed = read('<u4', removed_count)
+    changed_ids = read('<u4', changed_count)
+    mask = read('u1', changed_count)
+    new = mask & NetFormat.new_bit != 0
+    new_kinds = read('u1', np.count_nonzero(new))
+
+    keep = ~np.isin(base.ids, removed, assume_unique=True)
+    ids, kinds = base.ids[keep], base.kinds[keep]
+    positions, velocities = base.positions[keep], base.velocities[keep]
+
+    # changed objects start from their baseline values, new ones from zeros
+    index = np.searchsorted(ids, changed_ids[~new])
+    changed_positions = np.zeros((changed_count, 2), dtype=np.int32)
+    changed_velocities = np.zeros((changed_count, 2), dtype=np.int16)
+    changed_positions[~new] = positions[index]
+    changed_velocities[~new] = velocities[index]
+    for bit, column in ((NetFormat.x_bit, changed_positions[:, 0]), (NetFormat.y_bit, changed_positions[:, 1])):
+        selected = mask & bit != 0
+        column[selected] = read('<i4', np.count_nonzero(selected))
+    for bit, column in ((NetFormat.velocity_x_bit, changed_velocities[:, 0]),
+                        (NetFormat.velocity_y_bit, changed_velocities[:, 1])):
+        selected = mask & bit != 0
+        column[selected] = read('<i2', np.count_nonzero(selected))
+
+    positions[index] = changed_positions[~new]
+    velocities[index] = changed_velocities[~new]
+    # ids are given in increasing order, so objects that are new since the baseline have the largest ids
+    ids = np.concatenate((ids, changed_ids[new]))
+    kinds = np.concatenate((kinds, new_kinds))
+    positions = np.concatenate((positions, changed_positions[new]))
+    velocities = np.concatenate((velocities, changed_velocities[new]))
+    return NetFrame(tick, ids, kinds, positions, velocities, tank)
+
+
+class ClientConnection:
+    """
+    Connection of a client to the server. Holds the client's last input and traffic statistics
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.acked_tick = None
+        self.aim = None
+        self.motion_direction = 0
+        self.is_mouse_down = False
+
+        self.connected_at = time.perf_counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.states_sent = 0
+        self.full_states = 0
+        self.states_skipped = 0
+        # share of time spent encoding messages the client received, messages are shared by clients
+        self.encode_time = 0.0
+        self.send_time = 0.0
+
+    def stats(self):
+        """
+        Returns traffic and CPU statistics of the client
+        :return: dictionary with totals, bytes per second in both directions, average size of a state and
+        average time spent encoding and sending a state in milliseconds
+        """
+        elapsed = max(time.perf_counter() - self.connected_at, 1e-9)
+        states = max(self.states_sent, 1)
+        return {'bytes_sent': self.bytes_sent, 'bytes_received': self.bytes_received,
+                'states_sent': self.states_sent, 'full_states': self.full_states,
+                'states_skipped': self.states_skipped,
+                'sent_per_second': self.bytes_sent / elapsed, 'received_per_second': self.bytes_received / elapsed,
+                'bytes_per_state': self.bytes_sent / states,
+                'encode_ms_per_state': self.encode_time * 1000 / states,
+                'send_ms_per_state': self.send_time * 1000 / states,
+                'cpu_ms_per_state': (self.encode_time + self.send_time) * 1000 / states}
+
+
+class GameServer:
+    """
+    Runs a headless game as an authoritative server. After every tick clients get the state of objects near
+    the camera, delta-compressed against the last state they have acknowledged.
+    The first connected client controls the tank, it's inputs are turned into events of the game.
+    Works as input source of the game
+    """
+    # states aren't sent to a client while this many bytes are waiting to be sent to it
+    max_buffered = 1024 * 1024
+
+    def __init__(self, game, host='127.0.0.1', port=0):
+        """
+        GameServer constructor
+        :param game: headless game to serve
+        :param host: address to listen on
+        :param port: port to listen on, 0 to choose a free one
+        """
+        self.game = game
+        self.host = host
+        self.port = port
+        self.source = game.input_source
+        game.input_source = self
+
+        self.clients = []
+        self.frames = {}
+        self._ids = {}
+        self._next_id = 0
+        self._server = None
+
+        self.ticks = 0
+        self.tick_time = 0.0
+        self.frame_time = 0.0
+        # encoded messages are shared by clients, so their encoding is counted for the server
+        self.encode_time = 0.0
+        self.states_encoded = 0
+
+    async def start(self):
+        """
+        Starts listening for clients. The chosen port is saved in port
+        """
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Disconnects clients and stops listening
+        """
+        for client in self.clients:
+            client.writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        client = None
+        try:
+            tag, body = await _read_message(reader)
+            if tag != NetFormat.hello_tag or tuple(NetFormat.hello.unpack(body)) != (NetFormat.magic,
+                                                                                     NetFormat.version):
+                return
+
+            client = ClientConnection(writer)
+            width, height = self.game.world_size
+            writer.write(_frame(NetFormat.tag.pack(NetFormat.welcome_tag)
+                                + NetFormat.welcome.pack(self.game.tick_rate, width, height)))
+            self.clients.append(client)
+
+            while True:
+                tag, body = await _read_message(reader)
+                client.bytes_received += NetFormat.length.size + NetFormat.tag.size + len(body)
+                if tag == NetFormat.input_tag:
+                    self._receive_input(client, body)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            if client in self.clients:
+                self.clients.remove(client)
+            writer.close()
+
+    def _receive_input(self, client, body):
+        acked_tick, aim_x, aim_y, motion_direction, is_mouse_down = NetFormat.input.unpack(body)
+        if acked_tick != NetFormat.no_baseline and (client.acked_tick is None or acked_tick > client.acked_tick):
+            client.acked_tick = acked_tick
+        # a client that hasn't moved the mouse yet doesn't aim
+        client.aim = None if math.isnan(aim_x) else (aim_x, aim_y)
+        client.motion_direction = max(-1, min(motion_direction, 1))
+        client.is_mouse_down = bool(is_mouse_down)
+
+    def __call__(self):
+        """
+        Returns events of the wrapped input source and events that bring the tank to the input of the
+        controlling client
+        :return: list of events
+        """
+        events = self.source()
+        if not self.clients or self.game.tank is None:
+            return events
+
+        client, tank, camera = self.clients[0], self.game.tank, self.game.camera
+        if client.aim is not None:
+            x, y = client.aim
+            mouse_pos = round(x - camera.pos.x), round(y - camera.pos.y)
+            if mouse_pos != self.game.mouse_pos:
+                events.append(pg.event.Event(pg.MOUSEMOTION, pos=mouse_pos, rel=(0, 0), buttons=(0, 0, 0)))
+        if client.is_mouse_down != tank.is_mouse_down:
+            event_type = pg.MOUSEBUTTONDOWN if client.is_mouse_down else pg.MOUSEBUTTONUP
+            events.append(pg.event.Event(event_type, pos=self.game.mouse_pos, button=1))
+        if client.motion_direction != tank.motion_direction:
+            keys = {direction: key for key, direction in Tank.motion_keys.items()}
+            if tank.motion_direction != 0:
+                events.append(pg.event.Event(pg.KEYUP, key=keys[tank.motion_direction], mod=0))
+            if client.motion_direction != 0:
+                events.append(pg.event.Event(pg.KEYDOWN, key=keys[client.motion_direction], mod=0))
+        return events
+
+    def capture(self):
+        """
+        Captures quantized state of objects near the camera into frames
+        :return: NetFrame of current tick
+        """
+        game = self.game
+        objects = game.query_rect(game.camera.view_rect(NetFormat.relevance_margin))
+
+        # objects that left the relevant area lose their ids and get new ones when they come back
+        ids, kinds = [], []
+        previous_ids, self._ids = self._ids, {}
+        for ph_object in objects:
+            entry = previous_ids.get(ph_object)
+            if entry is None:
+                kind = NetFormat.projectile_kind if isinstance(ph_object, Projectile) else NetFormat.enemy_kind
+                entry = (self._next_id, kind)
+                self._next_id += 1
+            self._ids[ph_object] = entry
+            ids.append(entry[0])
+            kinds.append(entry[1])
+
+        if game.physics is not None:
+            slots = np.array([ph_object.slot for ph_object in objects], dtype=np.int64)
+            positions, velocities = game.physics.pos[slots], game.physics.velocity[slots]
+        else:
+            positions = np.array([(ph_object.pos.x, ph_object.pos.y) for ph_object in objects]).reshape(-1, 2)
+            velocities = np.array([(ph_object.velocity.x, ph_object.velocity.y)
+                                   for ph_object in objects]).reshape(-1, 2)
+
+        order = np.argsort(np.array(ids, dtype=np.uint32), kind='stable')
+        tank = game.tank
+        tank_state = (*quantize_positions(np.array([tank.pos.x, tank.pos.y])).tolist(),
+                      round(tank.direction.x * NetFormat.direction_scale),
+                      round(tank.direction.y * NetFormat.direction_scale),
+                      round(tank.shooting_power * NetFormat.power_scale), tank.is_mouse_down)
+        frame = NetFrame(game.tick, np.array(ids, dtype=np.uint32)[order], np.array(kinds, dtype=np.uint8)[order],
+                         quantize_positions(positions[order]), quantize_velocities(velocities[order]), tank_state)
+
+        self.frames[game.tick] = frame
+        _trim_history(self.frames, game.tick)
+        return frame
+
+    def broadcast(self, frame):
+        """
+        Sends a frame to all clients. Clients with equal baselines share the encoded message,
+        time of encoding it is split between them
+        :param frame: NetFrame to send
+        """
+        # {base tick: (message, time of encoding, clients that received it)}
+        encoded = {}
+        for client in list(self.clients):
+            writer = client.writer
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > GameServer.max_buffered:
+                client.states_skipped += 1
+                continue
+
+            base = self.frames.get(client.acked_tick)
+            base_tick = None if base is None else base.tick
+            message = encoded.get(base_tick)
+            if message is None:
+                start = time.perf_counter()
+                data = encode_state(frame, base)
+                encode_time = time.perf_counter() - start
+                message = encoded[base_tick] = (data, encode_time, [])
+                self.encode_time += encode_time
+                self.states_encoded += 1
+            data, _, receivers = message
+
+            start = time.perf_counter()
+            writer.write(data)
+            client.send_time += time.perf_counter() - start
+            receivers.append(client)
+            client.bytes_sent += len(data)
+            client.states_sent += 1
+            if base is None:
+                client.full_states += 1
+
+        for data, encode_time, receivers in encoded.values():
+            share = encode_time / len(receivers)
+            for client in receivers:
+                client.encode_time += share
+
+    async def run(self, ticks=None):
+        """
+        Updates the game with it's tick rate and sends state to clients after every tick
+        :param ticks: number of ticks to run, or None to run until the game is finished
+        """
+        game = self.game
+        game.start()
+        game.attach_loop(asyncio.get_running_loop())
+        if self._server is None:
+            await self.start()
+
+        next_tick = time.perf_counter()
+        try:
+            while not game.finished and (ticks is None or self.ticks < ticks):
+                # a late tick isn't hurried to catch up, like frames of Game.run
+                next_tick = max(next_tick + game.dt, time.perf_counter())
+                await game.wait_until(next_tick)
+
+                start = time.perf_counter()
+                game.step(1)
+                captured = time.perf_counter()
+                self.broadcast(self.capture())
+                self.tick_time += captured - start
+                self.frame_time += time.perf_counter() - captured
+                self.ticks += 1
+        finally:
+            game.attach_loop(None)
+
+    def stats(self):
+        """
+        Returns statistics of the server
+        :return: dictionary with number of clients, average time of a tick, average time of capturing and
+        sending a state to all clients and of encoding messages for them in milliseconds, average number of
+        messages encoded per tick, and statistics of every client
+        """
+        ticks = max(self.ticks, 1)
+        return {'clients': len(self.clients), 'tick_ms': self.tick_time * 1000 / ticks,
+                'send_ms': self.frame_time * 1000 / ticks, 'encode_ms': self.encode_time * 1000 / ticks,
+                'encoded_per_tick': self.states_encoded / ticks,
+                'per_client': [client.stats() for client in self.clients]}
+
+
+class GameClient:
+    """
+    Thin client that draws the state received from a server. Objects are drawn interpolation_delay ticks
+    in the past, between two received states, so they move smoothly when states come late.
+    Input of the mouse and motion keys is sent back to the server with acknowledgement of every state
+    """
+    interpolation_delay = 2
+
+    def __init__(self, host='127.0.0.1', port=0, resolution=(1280, 720), fps=50, background=Colors.black,
+                 headless=False):
+        """
+        GameClient constructor
+        :param host: address of the server
+        :param port: port of the server
+        :param resolution: tuple (width, height) of the screen
+        :param fps: frames per second that are drawn
+        :param background: background color
+        :param headless: if True, no window is opened, states are only received and acknowledged
+        """
+        self.host = host
+        self.port = port
+        self.resolution = resolution
+        self.fps = fps
+        self.background = background
+        self.headless = headless
+
+        self.frames = {}
+        self.latest_tick = None
+        self.tick_rate = None
+        self.camera = None
+        self.finished = False
+
+        self.aim = None
+        self.motion_direction = 0
+        self.is_mouse_down = False
+
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.decode_time = 0.0
+
+        self._writer = None
+        self._clock_start = None
+        self._screen = None
+        self._render_queue = RenderQueue(SpriteCache())
+
+    async def connect(self):
+        """
+        Connects to the server and waits for it's welcome
+        """
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._send(NetFormat.hello_tag, NetFormat.hello.pack(NetFormat.magic, NetFormat.version))
+        tag, body = await _read_message(reader)
+        if tag != NetFormat.welcome_tag:
+            raise ValueError('server didn\'t welcome the client')
+
+        self.tick_rate, world_width, world_height = NetFormat.welcome.unpack(body)
+        self.camera = Camera(self.resolution, (world_width, world_height))
+        return reader
+
+    def _send(self, tag, payload):
+        data = _frame(NetFormat.tag.pack(tag) + payload)
+        self._writer.write(data)
+        self.bytes_sent += len(data)
+
+    def send_input(self):
+        """
+        Sends current input and acknowledges the latest state
+        """
+        acked_tick = NetFormat.no_baseline if self.latest_tick is None else self.latest_tick
+        aim_x, aim_y = self.aim if self.aim is not None else (math.nan, math.nan)
+        self._send(NetFormat.input_tag, NetFormat.input.pack(acked_tick, aim_x, aim_y, self.motion_direction,
+                                                             self.is_mouse_down))
+
+    async def receive(self, reader):
+        """
+        Receives states until the connection is closed
+        """
+        try:
+            while not self.finished:
+                tag, body = await _read_message(reader)
+                self.bytes_received += NetFormat.length.size + NetFormat.tag.size + len(body)
+                if tag != NetFormat.state_tag:
+                    continue
+
+                start = time.perf_counter()
+                frame = decode_state(body, self.frames)
+                self.decode_time += time.perf_counter() - start
+                self.frames[frame.tick] = frame
+                if self.latest_tick is None or frame.tick > self.latest_tick:
+                    self.latest_tick = frame.tick
+                _trim_history(self.frames, self.latest_tick)
+                self.send_input()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.finished = True
+
+    def render_tick(self):
+        """
+        Returns tick that is drawn now. It advances with real time interpolation_delay ticks behind the latest
+        state and jumps forward if states came much later than expected
+        """
+        now = time.perf_counter()
+        if self._clock_start is None:
+            self._clock_start = now - self.latest_tick / self.tick_rate
+        tick = (now - self._clock_start) * self.tick_rate - GameClient.interpolation_delay
+        if tick > self.latest_tick:
+            # states are late, time is slowed down till they come
+            self._clock_start = now - self.latest_tick / self.tick_rate
+            tick = self.latest_tick - GameClient.interpolation_delay
+        if tick < self.latest_tick - NetFormat.history_ticks / 2:
+            self._clock_start = now - self.latest_tick / self.tick_rate
+            tick = self.latest_tick - GameClient.interpolation_delay
+        return tick
+
+    def interpolate(self, tick):
+        """
+        Interpolates received states at a tick
+        :param tick: fractional tick
+        :return: tuple (kinds array, positions array (n, 2), tank position (x, y), tank direction,
+        shooting power or None if the mouse button isn't pressed) in world coordinates
+        """
+        ticks = sorted(self.frames)
+        later = next((frame_tick for frame_tick in ticks if frame_tick >= tick), ticks[-1])
+        earlier = max((frame_tick for frame_tick in ticks if frame_tick <= tick), default=later)
+        first, second = self.frames[earlier], self.frames[later]
+        alpha = 0.0 if later == earlier else (tick - earlier) / (later - earlier)
+
+        # objects are drawn at the later state, objects of both states are moved between them
+        positions = second.positions.astype(float)
+        index = np.minimum(np.searchsorted(first.ids, second.ids), max(len(first.ids) - 1, 0))
+        if len(first.ids):
+            both = np.flatnonzero(first.ids[index] == second.ids)
+            previous = first.positions[index[both]]
+            positions[both] = previous + (second.positions[both] - previous) * alpha
+        positions /= NetFormat.position_scale
+
+        first_x, first_y = first.tank[:2]
+        x, y, direction_x, direction_y, power, is_mouse_down = second.tank
+        tank_pos = ((first_x + (x - first_x) * alpha) / NetFormat.position_scale,
+                    (first_y + (y - first_y) * alpha) / NetFormat.position_scale)
+        direction = Vector(direction_x / NetFormat.direction_scale, direction_y / NetFormat.direction_scale)
+        shooting_power = power / NetFormat.power_scale if is_mouse_down else None
+        return second.kinds, positions, tank_pos, direction, shooting_power
+
+    def process_events(self):
+        """
+        Turns mouse and keyboard events into input that is sent to the server
+        """
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                self.finished = True
+            elif event.type == pg.MOUSEMOTION:
+                self.aim = self.camera.to_world(event.pos)
+            elif event.type == pg.MOUSEBUTTONDOWN:
+                self.is_mouse_down = True
+            elif event.type == pg.MOUSEBUTTONUP:
+                self.is_mouse_down = False
+            elif event.type == pg.KEYDOWN and event.key in Tank.motion_keys and self.motion_direction == 0:
+                self.motion_direction = Tank.motion_keys[event.key]
+            elif event.type == pg.KEYUP and event.key in Tank.motion_keys:
+                self.motion_direction = 0
+
+    def draw(self):
+        """
+        Draws interpolated state on screen
+        """
+        kinds, positions, tank_pos, direction, shooting_power = self.interpolate(self.render_tick())
+        camera, queue = self.camera, self._render_queue
+        camera.follow(tank_pos)
+        queue.offset = camera.offset()
+
+        left, top, width, height = camera.view_rect(Enemy.body_radius)
+        x, y = positions[:, 0], positions[:, 1]
+        visible = (x >= left) & (x <= left + width) & (y >= top) & (y <= top + height)
+        for kind, radius in NetFormat.radii.items():
+            selected = np.rint(positions[visible & (kinds == kind)]).astype(int) - radius
+            queue.add_sprites(queue.sprite_cache.circle(radius, Colors.white), selected.tolist())
+
+        screen_width, screen_height = self.resolution
+        size = Vector(Tank.x_size * screen_width, Tank.y_size * screen_width)
+        tank_center = round(tank_pos[0]), round(tank_pos[1])
+        queue.add_rect(((Vector(*tank_center) - size * 0.5).int_tuple(), size.int_tuple()), Colors.white)
+        queue.add_immediate(partial(Cannon._draw_barrel, pos=camera.to_screen(tank_center), direction=direction,
+                                    shooting_power=shooting_power))
+
+        self._screen.fill(self.background)
+        queue.flush(self._screen)
+        pg.display.flip()
+
+    async def run(self, duration=None):
+        """
+        Connects to the server, receives states and draws them until the connection is closed or the window
+        is closed
+        :param duration: time in seconds to run, or None to run until finished
+        """
+        reader = await self.connect()
+        receiving = asyncio.create_task(self.receive(reader))
+        if not self.headless:
+            require('display')
+            self._screen = pg.display.set_mode(self.resolution)
+
+        start = time.perf_counter()
+        try:
+            while not self.finished and (duration is None or time.perf_counter() - start < duration):
+                await asyncio.sleep(1 / self.fps)
+                if self.headless:
+                    continue
+                self.process_events()
+                if self.latest_tick is not None:
+                    self.draw()
+        finally:
+            self.finished = True
+            self._writer.close()
+            receiving.cancel()
+            await asyncio.gather(receiving, return_exceptions=True)
+
+    def stats(self):
+        """
+        Returns traffic statistics of the client
+        :return: dictionary with bytes received and sent and total time spent decoding states in milliseconds
+        """
+        return {'bytes_received': self.bytes_received, 'bytes_sent': self.bytes_sent,
+                'decode_ms': self.decode_time * 1000}
+
+
+def _make_game(args):
+    from main import Game
+
+    return Game(headless=True, input_source=lambda: [], seed=args.seed, physics_backend=args.physics,
+                swarm_size=args.swarm, world_size=args.world and tuple(args.world), update_radius=args.update_radius)
+
+
+async def _serve(args):
+    server = GameServer(_make_game(args), args.host, args.port)
+    await server.start()
+    print(f'serving on {args.host}:{server.port}')
+    try:
+        await server.run()
+    finally:
+        await server.close()
+
+
+async def _benchmark(args):
+    """
+    Runs a server and headless clients over loopback and prints traffic and time statistics per client
+    """
+    server = GameServer(_make_game(args), '127.0.0.1', 0)
+    await server.start()
+    clients = [GameClient(port=server.port, headless=True) for i in range(args.clients)]
+    running = [asyncio.create_task(client.run()) for client in clients]
+    await server.run(args.ticks)
+    stats = server.stats()
+    await server.close()
+    await asyncio.gather(*running, return_exceptions=True)
+
+    print(f'{stats["clients"]} clients, {server.ticks} ticks: tick {stats["tick_ms"]:.2f} ms, '
+          f'capture and send {stats["send_ms"]:.2f} ms, encode {stats["encode_ms"]:.3f} ms '
+          f'({stats["encoded_per_tick"]:.1f} messages per tick)')
+    for i, client_stats in enumerate(stats['per_client']):
+        print(f'client {i}: {client_stats["sent_per_second"] / 1024:.1f} KiB/s, '
+              f'{client_stats["bytes_per_state"]:.0f} bytes per state, {client_stats["full_states"]} full, '
+              f'{client_stats["states_skipped"]} skipped, encode {client_stats["encode_ms_per_state"]:.3f} ms, '
+              f'send {client_stats["send_ms_per_state"]:.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lab8 game with an authoritative server and thin clients')
+    parser.add_argument('mode', choices=('server', 'client', 'benchmark'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5858)
+    parser.add_argument('--seed', type=int, help='seed of random generator of the server')
+    parser.add_argument('--physics', choices=('python', 'numpy', 'ecs'), default='python',
+                        help='physics backend of the server')
+    parser.add_argument('--swarm', type=int, default=0, metavar='N', help='spawn a swarm of N enemies')
+    parser.add_argument('--world', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help='size of the world')
+    parser.add_argument('--update-radius', type=float, metavar='R',
+                        help='freeze objects farther than R from the centre of the screen')
+    parser.add_argument('--clients', type=int, default=4, help='number of headless clients of the benchmark')
+    parser.add_argument('--ticks', type=int, default=500, help='number of ticks of the benchmark')
+    args = parser.parse_args()
+
+    if args.mode == 'client':
+        asyncio.run(GameClient(args.host, args.port).run())
+        return
+
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    try:
+        asyncio.run(_serve(args) if args.mode == 'server' else _benchmark(args))
+    except KeyboardInterrupt:
+        print('server stopped', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
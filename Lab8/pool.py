@@ -0,0 +1,67 @@
+class ObjectPool:
+    """
+    Unordered collection of objects with O(1) addition, removal and membership test.
+    Each object's index is stored, so it is removed by moving the last object into its place
+    """
+
+    def __init__(self):
+        self._objects = []
+        self._indices = {}
+
+    def add(self, obj):
+        """
+        Adds an object to the pool
+        :param obj: an object to add
+        :return: True if object was added, False if it was already in the pool
+        """
+        if obj in self._indices:
+            return False
+
+        self._indices[obj] = len(self._objects)
+        self._objects.append(obj)
+        return True
+
+    def extend(self, objects):
+        """
+        Adds many objects at once. Unlike add, objects aren't checked: they must be distinct and not in the pool
+        :param objects: iterable of objects to add
+        """
+        start = len(self._objects)
+        self._objects.extend(objects)
+        self._indices.update(zip(self._objects[start:], range(start, len(self._objects))))
+
+    def remove(self, obj):
+        """
+        Removes an object from the pool. Order of remaining objects can change
+        :param obj: an object to remove
+        :return: True if object was removed, False if it wasn't in the pool
+        """
+        index = self._indices.pop(obj, None)
+        if index is None:
+            return False
+
+        last = self._objects.pop()
+        if last is not obj:
+            self._objects[index] = last
+            self._indices[last] = index
+
+        return True
+
+    def clear(self):
+        """
+        Removes all objects from the pool
+        """
+        self._objects.clear()
+        self._indices.clear()
+
+    def __contains__(self, obj):
+        return obj in self._indices
+
+    def __iter__(self):
+        return iter(self._objects)
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __getitem__(self, index):
+        return self._objects[index]
@@ -0,0 +1,241 @@
+import json
+import threading
+import time
+from collections import deque
+from functools import partial
+
+import pygame as pg
+
+from common import GameObject, Vector, Colors
+from startup import require
+
+
+class FrameProfiler:
+    """
+    Measures how long phases of every frame take and keeps the last frames in a ring buffer.
+    When disabled, its methods return immediately. Marks made by other threads than the one that started
+    the frame are ignored
+    """
+    capacity = 600
+    max_hitches = 100
+
+    def __init__(self, budget, enabled=False, trace_path=None):
+        """
+        FrameProfiler constructor
+        :param budget: frame time in seconds above which a frame is considered a hitch
+        :param enabled: if frames are measured
+        :param trace_path: path to write Chrome trace to when the game is finished, or None
+        """
+        self.budget = budget
+        self.enabled = enabled
+        self.trace_path = trace_path
+
+        self.frames = [None] * FrameProfiler.capacity
+        self.frame_number = 0
+        self.hitches = deque(maxlen=FrameProfiler.max_hitches)
+
+        self._frame_start = None
+        self._last_mark = None
+        self._spans = None
+        self._thread = None
+
+    def start_frame(self):
+        """
+        Called at the beginning of a frame
+        """
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        self._frame_start = now
+        self._last_mark = now
+        self._spans = []
+        self._thread = threading.get_ident()
+
+    def mark(self, phase):
+        """
+        Records that a phase has finished. The phase started at the previous mark or at the beginning of the frame
+        :param phase: name of the phase
+        """
+        if not self.enabled or self._frame_start is None or threading.get_ident() != self._thread:
+            return
+
+        now = time.perf_counter()
+        self._spans.append((phase, self._last_mark, now))
+        self._last_mark = now
+
+    def end_frame(self, objects=0, pairs=0):
+        """
+        Called at the end of a frame. Saves the frame into ring buffer and checks if it is a hitch
+        :param objects: number of game objects
+        :param pairs: number of checked collision pairs
+        """
+        if not self.enabled or self._frame_start is None:
+            return
+
+        total = time.perf_counter() - self._frame_start
+        self.frames[self.frame_number % FrameProfiler.capacity] = (self._frame_start, total, self._spans,
+                                                                   objects, pairs)
+
+        if total > self.budget:
+            self.hitches.append((self.frame_number, total, self._slowest_phase(self._spans)))
+
+        self.frame_number += 1
+        self._frame_start = None
+
+    @staticmethod
+    def _phase_times(spans):
+        times = {}
+        for phase, start, end in spans:
+            times[phase] = times.get(phase, 0) + end - start
+        return times
+
+    @staticmethod
+    def _slowest_phase(spans):
+        times = FrameProfiler._phase_times(spans)
+        return max(times, key=times.get) if times else None
+
+    def recorded_frames(self):
+        """
+        Returns frames in the ring buffer from the oldest to the newest
+        :return: list of (start, total time, spans, objects, pairs) tuples
+        """
+        if self.frame_number <= FrameProfiler.capacity:
+            return self.frames[:self.frame_number]
+
+        split = self.frame_number % FrameProfiler.capacity
+        return self.frames[split:] + self.frames[:split]
+
+    def stats(self):
+        """
+        Returns statistics of recorded frames
+        :return: dictionary with fps, median and 99th percentile frame time in seconds,
+        and numbers of objects and pairs in the last frame
+        """
+        frames = self.recorded_frames()
+        if not frames:
+            return {'fps': 0.0, 'p50': 0.0, 'p99': 0.0, 'objects': 0, 'pairs': 0}
+
+        totals = sorted(frame[1] for frame in frames)
+        elapsed = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / elapsed if elapsed > 0 else 0.0
+        last = frames[-1]
+        return {'fps': fps,
+                'p50': totals[len(totals) // 2],
+                'p99': totals[min(len(totals) - 1, int(len(totals) * 0.99))],
+                'objects': last[3], 'pairs': last[4]}
+
+    def chrome_trace(self):
+        """
+        Converts recorded frames into Chrome trace event format
+        :return: dictionary that can be saved as JSON and opened in chrome://tracing or Perfetto
+        """
+        frames = self.recorded_frames()
+        origin = frames[0][0] if frames else 0
+        first_number = self.frame_number - len(frames)
+        hitches = {number: phase for number, total, phase in self.hitches}
+
+        def microseconds(seconds):
+            return round(seconds * 1e6, 1)
+
+        events = []
+        for number, (start, total, spans, objects, pairs) in enumerate(frames, first_number):
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': microseconds(start - origin), 'dur': microseconds(total),
+                           'args': {'frame': number, 'objects': objects, 'pairs': pairs}})
+            for phase, phase_start, phase_end in spans:
+                events.append({'name': phase, 'ph': 'X', 'pid': 1, 'tid': 2,
+                               'ts': microseconds(phase_start - origin), 'dur': microseconds(phase_end - phase_start)})
+            if number in hitches:
+                events.append({'name': 'hitch', 'ph': 'i', 's': 'g', 'pid': 1, 'tid': 1,
+                               'ts': microseconds(start - origin), 'args': {'phase': hitches[number]}})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        """
+        Writes recorded frames to a file in Chrome trace event format
+        :param path: path of the file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def finish(self):
+        """
+        Called when the game is finished. Exports the trace if trace_path is set
+        """
+        if self.trace_path is not None and self.frame_number > 0:
+            self.export_chrome_trace(self.trace_path)
+
+
+class ProfilerOverlay(GameObject):
+    """
+    Shows profiler statistics on screen. Toggled with toggle_key, showing it enables the profiler
+    """
+    toggle_key = pg.K_F3
+    font_size = 22
+    line_height = 18
+
+    def __init__(self, game, profiler):
+        super().__init__(Vector(10, 5), game)
+
+        self.profiler = profiler
+        self.visible = profiler.enabled
+        self._font = None
+
+        game.subscribe_to_event(pg.KEYDOWN, self._keydown_listener)
+
+    def update(self):
+        pass
+
+    def state_values(self):
+        return ()
+
+    def draw(self, surface):
+        if self.visible:
+            self.game.render_queue.add_immediate(partial(self._draw_text, lines=self._lines()), layer=1)
+
+    def _lines(self):
+        stats = self.profiler.stats()
+        lines = [f'FPS {stats["fps"]:.1f}',
+                 f'frame p50 {stats["p50"] * 1000:.2f} ms  p99 {stats["p99"] * 1000:.2f} ms',
+                 f'objects {stats["objects"]}  pairs {stats["pairs"]}']
+        if self.profiler.hitches:
+            number, total, phase = self.profiler.hitches[-1]
+            lines.append(f'hitch #{number}: {total * 1000:.1f} ms in {phase}')
+        return lines
+
+    def _draw_text(self, surface, lines):
+        """
+        Draws statistics lines
+        :param surface: surface to draw on
+        :param lines: list of strings
+        :return: pygame.Rect that bounds the text
+        """
+        if self._font is None:
+            require('font')
+            self._font = pg.font.Font(None, ProfilerOverlay.font_size)
+
+        x, y = self.pos.int_tuple()
+        drawn_rect = None
+        for i, line in enumerate(lines):
+            text = self._font.render(line, True, Colors.white)
+            rect = surface.blit(text, (x, y + i * ProfilerOverlay.line_height))
+            drawn_rect = rect if drawn_rect is None else drawn_rect.union(rect)
+
+        return drawn_rect
+
+    def destroy(self):
+        super().destroy()
+
+        self.game.unsubscribe_from_event(pg.KEYDOWN, self._keydown_listener)
+
+    def _keydown_listener(self, event):
+        """
+        KEYDOWN event listener
+        :param event: an event object
+        """
+        if event.key == ProfilerOverlay.toggle_key:
+            self.visible = not self.visible
+            if self.visible:
+                self.profiler.enabled = True
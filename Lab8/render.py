@@ -0,0 +1,169 @@
+import pygame as pg
+import pygame.draw as draw
+
+from common import Colors
+
+
+class SpriteCache:
+    """
+    Holds pre-rasterized sprites of simple shapes so they are drawn once and then only blitted
+    """
+
+    def __init__(self):
+        self._sprites = {}
+
+    @staticmethod
+    def _key_color(color):
+        return Colors.magenta if color == Colors.black else Colors.black
+
+    def _new_sprite(self, size, color):
+        """
+        Creates a sprite surface filled with a key color that isn't drawn when blitting
+        :param size: tuple (width, height) of the sprite
+        :param color: color of the shape that will be drawn on the sprite
+        :return: new surface
+        """
+        key_color = SpriteCache._key_color(color)
+        sprite = pg.Surface(size)
+        sprite.fill(key_color)
+        sprite.set_colorkey(key_color, pg.RLEACCEL)
+        return sprite
+
+    def circle(self, radius, color):
+        """
+        Returns a sprite of a filled circle. It looks the same as draw.circle with equal radius and color
+        :param radius: radius of the circle
+        :param color: color of the circle
+        :return: surface of size (2 * radius, 2 * radius)
+        """
+        key = ('circle', radius, color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._new_sprite((2 * radius, 2 * radius), color)
+            draw.circle(sprite, color, (radius, radius), radius)
+            self._sprites[key] = sprite
+
+        return sprite
+
+    def rect(self, size, color):
+        """
+        Returns a sprite of a filled rectangle
+        :param size: tuple (width, height) of the rectangle
+        :param color: color of the rectangle
+        :return: surface of given size
+        """
+        key = ('rect', size, color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = pg.Surface(size)
+            sprite.fill(color)
+            self._sprites[key] = sprite
+
+        return sprite
+
+    def clear(self):
+        """
+        Removes all sprites from cache
+        """
+        self._sprites.clear()
+
+
+class RenderQueue:
+    """
+    Collects drawing commands of a frame and submits them layer by layer.
+    Consecutive sprites are blitted with a single Surface.blits call, commands that can't be pre-rasterized
+    are kept as functions that are called in their place.
+    Sprites are queued in world coordinates, offset is subtracted from their positions to get screen coordinates
+    """
+
+    def __init__(self, sprite_cache):
+        """
+        RenderQueue constructor
+        :param sprite_cache: SpriteCache to take sprites from
+        """
+        self.sprite_cache = sprite_cache
+        self.offset = (0, 0)
+        self._layers = {}
+
+    def _layer(self, layer):
+        commands = self._layers.get(layer)
+        if commands is None:
+            commands = self._layers[layer] = []
+        return commands
+
+    def add_sprite(self, sprite, pos, layer=0):
+        """
+        Queues blitting of a sprite
+        :param sprite: surface to blit
+        :param pos: tuple (x, y) of top left corner
+        :param layer: layers are drawn in increasing order
+        """
+        x, y = pos
+        offset_x, offset_y = self.offset
+        self._layer(layer).append((sprite, (x - offset_x, y - offset_y)))
+
+    def add_sprites(self, sprite, positions, layer=0):
+        """
+        Queues blitting of a sprite at many positions
+        :param sprite: surface to blit
+        :param positions: iterable of tuples (x, y) of top left corners
+        :param layer: layers are drawn in increasing order
+        """
+        offset_x, offset_y = self.offset
+        self._layer(layer).extend((sprite, (x - offset_x, y - offset_y)) for x, y in positions)
+
+    def add_circle(self, center, radius, color, layer=0):
+        """
+        Queues drawing of a filled circle
+        :param center: tuple (x, y) of integer coordinates of the centre
+        :param radius: radius of the circle
+        :param color: color of the circle
+        :param layer: layers are drawn in increasing order
+        """
+        x, y = center
+        self.add_sprite(self.sprite_cache.circle(radius, color), (x - radius, y - radius), layer)
+
+    def add_rect(self, rect, color, layer=0):
+        """
+        Queues drawing of a filled rectangle
+        :param rect: tuple ((x, y), (width, height)) of the rectangle
+        :param color: color of the rectangle
+        :param layer: layers are drawn in increasing order
+        """
+        pos, size = rect
+        self.add_sprite(self.sprite_cache.rect(size, color), pos, layer)
+
+    def add_immediate(self, draw_function, layer=0):
+        """
+        Queues a function that draws directly on surface. It gets the surface as is, so it must convert world
+        coordinates to screen coordinates itself
+        :param draw_function: (surface) -> pygame.Rect function that draws and returns bounding rectangle
+        :param layer: layers are drawn in increasing order
+        """
+        self._layer(layer).append(draw_function)
+
+    def flush(self, surface):
+        """
+        Draws all queued commands on surface and empties the queue
+        :param surface: surface to draw on
+        :return: list of rectangles that were drawn over
+        """
+        drawn_rects = []
+
+        for layer in sorted(self._layers):
+            batch = []
+            for command in self._layers[layer]:
+                if isinstance(command, tuple):
+                    batch.append(command)
+                    continue
+                if batch:
+                    drawn_rects.extend(surface.blits(batch))
+                    batch = []
+                rect = command(surface)
+                if rect is not None:
+                    drawn_rects.append(rect)
+            if batch:
+                drawn_rects.extend(surface.blits(batch))
+
+        self._layers.clear()
+        return drawn_rects
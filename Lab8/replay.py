@@ -0,0 +1,242 @@
+import argparse
+import struct
+
+import pygame as pg
+
+
+class ReplayFormat:
+    """
+    Binary format of input recordings. A file starts with a header followed by tagged records.
+    Every record starts with a tag byte and a tick number
+    """
+    magic = b'L8RP'
+    version = 4
+    physics_backends = ('python', 'numpy', 'ecs')
+
+    header = struct.Struct('<4sHQdHHhhBIHHd')
+    record = struct.Struct('<BI')
+    checksum = struct.Struct('<I')
+    event_type = struct.Struct('<H')
+
+    event_tag = 0
+    checksum_tag = 1
+
+    # event type: (struct of payload, function that packs event into a tuple, function that unpacks it back)
+    codecs = {
+        pg.MOUSEMOTION: (struct.Struct('<hhhh'),
+                         lambda event: (*event.pos, *event.rel),
+                         lambda values: {'pos': values[0:2], 'rel': values[2:4], 'buttons': (0, 0, 0)}),
+        pg.MOUSEBUTTONDOWN: (struct.Struct('<hhB'),
+                             lambda event: (*event.pos, event.button),
+                             lambda values: {'pos': values[0:2], 'button': values[2]}),
+        pg.MOUSEBUTTONUP: (struct.Struct('<hhB'),
+                           lambda event: (*event.pos, event.button),
+                           lambda values: {'pos': values[0:2], 'button': values[2]}),
+        pg.KEYDOWN: (struct.Struct('<iH'),
+                     lambda event: (event.key, event.mod),
+                     lambda values: {'key': values[0], 'mod': values[1]}),
+        pg.KEYUP: (struct.Struct('<iH'),
+                   lambda event: (event.key, event.mod),
+                   lambda values: {'key': values[0], 'mod': values[1]}),
+        pg.QUIT: (struct.Struct('<'),
+                  lambda event: (),
+                  lambda values: {}),
+    }
+
+
+class InputRecorder:
+    """
+    Records events that a game receives and checksums of its state, so the game can be replayed later.
+    Wraps input source of the game and writes the recording when the game quits or close is called
+    """
+
+    def __init__(self, game, path):
+        """
+        InputRecorder constructor. Must be created before the game is started
+        :param game: game to record
+        :param path: path of the recording file
+        """
+        self.game = game
+        self.path = path
+        self.source = game.input_source
+        game.input_source = self
+
+        width, height = game.resolution
+        mouse_x, mouse_y = game.mouse_pos
+        self._data = bytearray(ReplayFormat.header.pack(ReplayFormat.magic, ReplayFormat.version, game.seed,
+                                                        game.tick_rate, width, height, mouse_x, mouse_y,
+                                                        ReplayFormat.physics_backends.index(game.physics_backend),
+                                                        game.swarm_size, *game.world_size,
+                                                        game.update_radius or 0.0))
+        self._checksum_tick = None
+        self.closed = False
+
+        game.subscribe_to_event(pg.QUIT, self._quit_listener)
+
+    def _record_checksum(self):
+        tick = self.game.tick
+        if tick == self._checksum_tick:
+            return
+
+        self._data += ReplayFormat.record.pack(ReplayFormat.checksum_tag, tick)
+        self._data += ReplayFormat.checksum.pack(self.game.state_checksum())
+        self._checksum_tick = tick
+
+    def _record_event(self, event):
+        codec = ReplayFormat.codecs.get(event.type)
+        if codec is None:
+            return
+
+        payload, pack, _ = codec
+        self._data += ReplayFormat.record.pack(ReplayFormat.event_tag, self.game.tick)
+        self._data += ReplayFormat.event_type.pack(event.type)
+        self._data += payload.pack(*pack(event))
+
+    def __call__(self):
+        """
+        Takes events from wrapped input source and records them
+        :return: list of events
+        """
+        events = self.source()
+        if not self.closed:
+            self._record_checksum()
+            for event in events:
+                self._record_event(event)
+
+        return events
+
+    def close(self):
+        """
+        Records final checksum and writes the recording to file
+        """
+        if self.closed:
+            return
+
+        self._record_checksum()
+        with open(self.path, 'wb') as f:
+            f.write(self._data)
+        self.closed = True
+
+    def _quit_listener(self, event):
+        """
+        QUIT event listener
+        :param event: an event object
+        """
+        self.close()
+
+
+class ReplayInput:
+    """
+    Input source that returns recorded events tick by tick and compares checksums of replayed game
+    with the recorded ones
+    """
+
+    def __init__(self, path):
+        """
+        ReplayInput constructor. Reads the recording
+        :param path: path of the recording file
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        magic, version, self.seed, self.tick_rate, width, height, mouse_x, mouse_y, backend, self.swarm_size, \
+            world_width, world_height, update_radius = ReplayFormat.header.unpack_from(data)
+        if magic != ReplayFormat.magic or version != ReplayFormat.version:
+            raise ValueError(f'{path} is not a recording of version {ReplayFormat.version}')
+
+        self.resolution = (width, height)
+        self.mouse_pos = (mouse_x, mouse_y)
+        self.physics_backend = ReplayFormat.physics_backends[backend]
+        self.world_size = (world_width, world_height)
+        # update radius 0 is stored when nothing is frozen
+        self.update_radius = update_radius or None
+
+        self.events = {}
+        self.checksums = {}
+        self._read_records(data, ReplayFormat.header.size)
+        self.last_tick = max(self.checksums, default=0)
+
+        self.game = None
+        self.divergences = []
+        self._verified_tick = None
+
+    def _read_records(self, data, offset):
+        while offset < len(data):
+            tag, tick = ReplayFormat.record.unpack_from(data, offset)
+            offset += ReplayFormat.record.size
+
+            if tag == ReplayFormat.checksum_tag:
+                self.checksums[tick], = ReplayFormat.checksum.unpack_from(data, offset)
+                offset += ReplayFormat.checksum.size
+                continue
+
+            event_type, = ReplayFormat.event_type.unpack_from(data, offset)
+            offset += ReplayFormat.event_type.size
+            payload, _, unpack = ReplayFormat.codecs[event_type]
+            values = payload.unpack_from(data, offset)
+            offset += payload.size
+            self.events.setdefault(tick, []).append(pg.event.Event(event_type, unpack(values)))
+
+    def verify(self):
+        """
+        Compares checksum of the game at current tick with the recorded one
+        :return: True if checksums are equal or there is no recorded checksum for this tick
+        """
+        tick = self.game.tick
+        expected = self.checksums.get(tick)
+        if expected is None or tick == self._verified_tick:
+            return True
+
+        self._verified_tick = tick
+        actual = self.game.state_checksum()
+        if actual != expected:
+            self.divergences.append((tick, expected, actual))
+            return False
+        return True
+
+    def __call__(self):
+        """
+        Verifies state of the game and returns events recorded at current tick
+        :return: list of events
+        """
+        self.verify()
+        return self.events.get(self.game.tick, [])
+
+
+def replay(path):
+    """
+    Replays a recording in a headless game as fast as possible
+    :param path: path of the recording file
+    :return: ReplayInput with list of divergences, tuples (tick, expected checksum, actual checksum)
+    """
+    from main import Game
+
+    player = ReplayInput(path)
+    game = Game(resolution=player.resolution, physics_backend=player.physics_backend, headless=True,
+                input_source=player, tick_rate=player.tick_rate, seed=player.seed, swarm_size=player.swarm_size,
+                world_size=player.world_size, update_radius=player.update_radius)
+    game.mouse_pos = player.mouse_pos
+    player.game = game
+
+    game.step(player.last_tick)
+    player.verify()
+    game.on_finished()
+    return player
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays a recording of Lab8 game and checks that it is deterministic')
+    parser.add_argument('path', help='path of the recording file')
+    args = parser.parse_args()
+
+    player = replay(args.path)
+
+    print(f'replayed {player.game.tick} ticks of {player.last_tick}')
+    for tick, expected, actual in player.divergences:
+        print(f'tick {tick}: checksum {actual:08x}, recorded {expected:08x}')
+    if not player.divergences:
+        print('no divergences')
+
+
+if __name__ == '__main__':
+    main()
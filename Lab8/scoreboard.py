@@ -1,3 +1,7 @@
+import asyncio
+import json
+import os
+
 from common import GameObject, Vector
 import pygame.draw as draw
 import pygame as pg
@@ -9,6 +13,7 @@ class Scoreboard(GameObject):
     """
     x_pos = 1 / 10
     y_pos = 1 / 5
+    save_interval = 5
     # font = pg.font.SysFont('Calibri', 22)
 
     def __init__(self, game):
@@ -29,8 +34,32 @@ class Scoreboard(GameObject):
         """
         self.scoreboard['enemies_destroyed'] += 1
 
+    def state_values(self):
+        return super().state_values() + tuple(self.scoreboard.values())
+
     def update(self):
-        pass
+        game = self.game
+        if game.stats_path is not None and game.tick > 0 \
+                and game.tick % round(Scoreboard.save_interval * game.tick_rate) == 0:
+            game.schedule(self.save(game.stats_path))
+
+    async def save(self, path):
+        """
+        Saves statistics to a JSON file. The file is written in a separate thread
+        :param path: path of the file
+        """
+        stats = dict(self.scoreboard, tick=self.game.tick)
+        await asyncio.to_thread(Scoreboard._write_stats, path, stats)
+
+    @staticmethod
+    def _write_stats(path, stats):
+        """
+        Writes statistics to a temporary file and replaces the file with it, so the file is never half-written
+        """
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(stats, f)
+        os.replace(temporary_path, path)
 
     def draw(self, surface):
         pass
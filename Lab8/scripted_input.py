@@ -0,0 +1,26 @@
+class ScriptedInput:
+    """
+    Input source that returns prepared events instead of reading them from pygame.
+    Can be passed to Game as input_source to drive it without a user
+    """
+
+    def __init__(self, events_by_tick=None):
+        """
+        ScriptedInput constructor
+        :param events_by_tick: dictionary {tick: list of events} of events to return on each tick
+        """
+        self.events_by_tick = {} if events_by_tick is None else events_by_tick
+        self.tick = 0
+
+    def add(self, tick, event):
+        """
+        Schedules an event
+        :param tick: number of tick when the event should happen
+        :param event: an event object
+        """
+        self.events_by_tick.setdefault(tick, []).append(event)
+
+    def __call__(self):
+        events = self.events_by_tick.pop(self.tick, [])
+        self.tick += 1
+        return events
@@ -0,0 +1,420 @@
+import math
+import struct
+
+import numpy as np
+
+from array_physics import ArrayPhysics
+from cannon import Projectile
+from common import Vector, PhysicalObject
+from ecs import World
+from enemy import Enemy
+from pool import ObjectPool
+from spatial import StaticGrid
+from swarm import Swarm, SwarmEnemy
+
+
+class SnapshotFormat:
+    """
+    Binary format of game snapshots. A snapshot starts with a header that holds counts of all arrays,
+    followed by fixed size blocks of the game state and then by arrays, so every part is at a known offset
+    and arrays are read without copying
+    """
+    magic = b'L8SN'
+    version = 2
+    physics_backends = ('python', 'numpy', 'ecs')
+
+    # magic, version, backend, has swarm, tick, mouse x, mouse y and counts of arrays: physical objects,
+    # object order, batched order, active order, frozen order, slot order, swarm members, enemies, archetypes,
+    # archetype rows and size of archetype names
+    header = struct.Struct('<4sHBBQhh11I')
+    # version, 625 words of Mersenne Twister state, if there is a gaussian and it's value
+    random_state = struct.Struct('<I625IBd')
+    # PCG64 state and increment, if there is a buffered 32 bit value and it's value
+    swarm_random_state = struct.Struct('<16s16sBI')
+    # position, previous position, shooting power, direction, is mouse down, motion direction
+    tank = struct.Struct('<7dBb')
+    scoreboard = struct.Struct('<3q')
+
+    physical = np.dtype([('kind', 'u1'), ('sleeping', 'u1'), ('frozen', 'u1'), ('bounces', '<i4'),
+                         ('slow_ticks', '<i4'), ('pos', '<f8', 2), ('prev_pos', '<f8', 2), ('velocity', '<f8', 2),
+                         ('timer', '<f8'), ('settled_at', '<f8')])
+    order = np.dtype('<i4')
+
+    enemy_kind = 0
+    projectile_kind = 1
+    swarm_member_kind = 2
+
+    # codes of objects that aren't physical in object order
+    tank_code = -1
+    scoreboard_code = -2
+    swarm_code = -3
+
+
+def _physical_records(game, objects):
+    """
+    Collects state of physical objects into a structured array
+    :param objects: list of physical objects
+    :return: array of SnapshotFormat.physical records
+    """
+    records = np.zeros(len(objects), dtype=SnapshotFormat.physical)
+    kinds, timers, settled_at = [], [], []
+    for ph_object in objects:
+        if isinstance(ph_object, SwarmEnemy):
+            kinds.append(SnapshotFormat.swarm_member_kind)
+            timers.append(ph_object.till_velocity_changed)
+            settled_at.append(math.inf)
+        elif isinstance(ph_object, Enemy):
+            kinds.append(SnapshotFormat.enemy_kind)
+            timers.append(ph_object.till_velocity_changed)
+            settled_at.append(math.inf)
+        elif isinstance(ph_object, Projectile):
+            kinds.append(SnapshotFormat.projectile_kind)
+            timers.append(ph_object.age)
+            settled_at.append(ph_object.settled_at)
+        else:
+            raise TypeError(f'{type(ph_object).__name__} can\'t be saved in a snapshot')
+    records['kind'] = kinds
+    records['timer'] = timers
+    records['settled_at'] = settled_at
+
+    if game.physics is not None:
+        # state of all objects is read from arrays at once
+        physics = game.physics
+        slots = np.array([ph_object.slot for ph_object in objects], dtype=np.int64)
+        for name in ('sleeping', 'frozen', 'bounces', 'slow_ticks', 'pos', 'prev_pos', 'velocity'):
+            records[name] = getattr(physics, name)[slots]
+        return records
+
+    records['sleeping'] = [ph_object.is_sleeping for ph_object in objects]
+    records['frozen'] = [ph_object.is_frozen for ph_object in objects]
+    records['bounces'] = [ph_object.bounces for ph_object in objects]
+    records['slow_ticks'] = [ph_object.slow_ticks for ph_object in objects]
+    records['pos'] = [(ph_object.pos.x, ph_object.pos.y) for ph_object in objects]
+    records['prev_pos'] = [ph_object.prev_pos for ph_object in objects]
+    records['velocity'] = [(ph_object.velocity.x, ph_object.velocity.y) for ph_object in objects]
+    return records
+
+
+def take(game):
+    """
+    Saves state of a game. Must be called between ticks
+    :param game: started game
+    :return: bytes of the snapshot
+    """
+    objects = list(game.physical_pool)
+    index_of = {ph_object: i for i, ph_object in enumerate(objects)}
+    codes = {game.tank: SnapshotFormat.tank_code, game.scoreboard: SnapshotFormat.scoreboard_code}
+    if game.swarm is not None:
+        codes[game.swarm] = SnapshotFormat.swarm_code
+
+    def order(iterable):
+        return np.array([index_of[ph_object] for ph_object in iterable], dtype=SnapshotFormat.order)
+
+    object_order = np.array([index_of[game_object] if game_object in index_of else codes[game_object]
+                             for game_object in game.object_pool if game_object in index_of or game_object in codes],
+                            dtype=SnapshotFormat.order)
+    batched_order = order(game.batched_objects)
+    active_order = order(game._active_physicals if game.physics is None else ())
+    frozen_order = order(game._frozen_grid if game.physics is None else ())
+    slot_order = order(game.physics.objects if game.physics is not None else ())
+    swarm_members = order(game.swarm.members if game.swarm is not None else ())
+    enemies = order(enemy for enemy in game.enemies if enemy.is_alive)
+
+    archetypes = list(game.world.archetypes.values()) if game.world is not None else []
+    archetype_names = '\n'.join(','.join(sorted(archetype.component_names)) for archetype in archetypes).encode()
+    archetype_sizes = np.array([len(archetype.entities) for archetype in archetypes], dtype=SnapshotFormat.order)
+    archetype_rows = order(owner for archetype in archetypes for owner in archetype.columns['owner'])
+
+    version, mt_state, gauss = game.random.getstate()
+    tank = game.tank
+    parts = [
+        SnapshotFormat.header.pack(SnapshotFormat.magic, SnapshotFormat.version,
+                                   SnapshotFormat.physics_backends.index(game.physics_backend),
+                                   game.swarm is not None, game.tick, *game.mouse_pos,
+                                   len(objects), len(object_order), len(batched_order), len(active_order),
+                                   len(frozen_order), len(slot_order), len(swarm_members), len(enemies),
+                                   len(archetypes), len(archetype_rows), len(archetype_names)),
+        SnapshotFormat.random_state.pack(version, *mt_state, gauss is not None, gauss or 0.0),
+        SnapshotFormat.tank.pack(tank.pos.x, tank.pos.y, *tank.prev_pos, tank.shooting_power,
+                                 tank.direction.x, tank.direction.y, tank.is_mouse_down, tank.motion_direction),
+        SnapshotFormat.scoreboard.pack(*game.scoreboard.scoreboard.values()),
+    ]
+    if game.swarm is not None:
+        state = game.swarm.rng.bit_generator.state
+        if state['bit_generator'] != 'PCG64':
+            raise ValueError('only PCG64 generator of a swarm can be saved')
+        parts.append(SnapshotFormat.swarm_random_state.pack(state['state']['state'].to_bytes(16, 'little'),
+                                                            state['state']['inc'].to_bytes(16, 'little'),
+                                                            state['has_uint32'], state['uinteger']))
+
+    parts.append(_physical_records(game, objects).tobytes())
+    for array in (object_order, batched_order, active_order, frozen_order, slot_order, swarm_members, enemies,
+                  archetype_sizes, archetype_rows):
+        parts.append(array.tobytes())
+    parts.append(archetype_names)
+    return b''.join(parts)
+
+
+class _Reader:
+    """
+    Reads consecutive parts of a snapshot
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, structure):
+        values = structure.unpack_from(self.data, self.offset)
+        self.offset += structure.size
+        return values
+
+    def array(self, dtype, count):
+        array = np.frombuffer(self.data, dtype=dtype, count=count, offset=self.offset)
+        self.offset += array.nbytes
+        return array
+
+    def bytes(self, size):
+        part = bytes(self.data[self.offset:self.offset + size])
+        self.offset += size
+        return part
+
+
+def _pool(objects):
+    """
+    Returns an ObjectPool of distinct objects in given order
+    """
+    pool = ObjectPool()
+    pool.extend(objects)
+    return pool
+
+
+def _respawn_objects(game, kind_indices, has_swarm):
+    """
+    Returns physical objects for records of a snapshot. Objects of the game are reused by kind, projectiles through
+    the pool of the cannon, and only missing ones are created. Objects that are left over are dropped.
+    Objects are created without physics backend and pools of the game are rebuilt afterwards,
+    so they aren't updated here
+    :param kind_indices: dictionary {kind: array of indices of records of the kind}
+    :return: list of objects in order of records
+    """
+    if has_swarm and game.swarm is None:
+        game.swarm = Swarm(game, 0)
+    elif not has_swarm and game.swarm is not None:
+        game.swarm.is_alive = False
+        game.swarm = None
+
+    enemies, members = [], []
+    for ph_object in game.physical_pool:
+        if isinstance(ph_object, SwarmEnemy):
+            members.append(ph_object)
+        elif isinstance(ph_object, Enemy):
+            enemies.append(ph_object)
+
+    enemy_count = len(kind_indices[SnapshotFormat.enemy_kind])
+    member_count = len(kind_indices[SnapshotFormat.swarm_member_kind])
+    for ph_object in enemies[enemy_count:] + members[member_count:]:
+        ph_object.is_alive = False
+    enemies = enemies[:enemy_count] + [Enemy(Vector(0, 0), game) for _ in range(enemy_count - len(enemies))]
+    members = members[:member_count] + [SwarmEnemy(Vector(0, 0), Vector(0, 0), game, game.swarm)
+                                        for _ in range(member_count - len(members))]
+    for member in members:
+        member.swarm = game.swarm
+    for enemy in enemies + members:
+        enemy.is_alive = True
+
+    tank = game.tank
+    projectiles = tank.projectile_pool.respawn(len(kind_indices[SnapshotFormat.projectile_kind]),
+                                               list(tank._projectiles))
+
+    objects = [None] * sum(len(indices) for indices in kind_indices.values())
+    for kind, kind_objects in ((SnapshotFormat.enemy_kind, enemies), (SnapshotFormat.swarm_member_kind, members),
+                               (SnapshotFormat.projectile_kind, projectiles)):
+        for i, ph_object in zip(kind_indices[kind].tolist(), kind_objects):
+            objects[i] = ph_object
+    return objects
+
+
+def _array_state(objects, records, slot_order):
+    """
+    Returns state of array physics backend for objects in order of their slots. Saved state is taken from records
+    and constant parameters are taken from one object of each kind
+    :return: dictionary {array name: values}
+    """
+    slot_records = records[slot_order]
+    state = {name: slot_records[name]
+             for name in ('pos', 'prev_pos', 'velocity', 'bounces', 'sleeping', 'frozen', 'slow_ticks')}
+
+    kinds, first, inverse = np.unique(slot_records['kind'], return_index=True, return_inverse=True)
+    parameters = {name: [] for name in ('acceleration', 'drag', 'radius', 'energy_conserved',
+                                        'collides_with_borders', 'continuous', 'collision_layer', 'collision_mask')}
+    for slot in first.tolist():
+        ph_object = objects[slot_order[slot]]
+        acceleration, drag = ph_object.integration_parameters()
+        for name, value in (('acceleration', tuple(acceleration)), ('drag', drag), ('radius', ph_object.radius),
+                            ('energy_conserved', ph_object.energy_conserved),
+                            ('collides_with_borders', ph_object.collides_with_borders),
+                            ('continuous', ph_object.continuous_collision),
+                            ('collision_layer', ph_object.collision_layer),
+                            ('collision_mask', ph_object.collision_mask)):
+            parameters[name].append(value)
+    for name, values in parameters.items():
+        state[name] = np.array(values)[inverse]
+    return state
+
+
+def _set_state(objects, records):
+    """
+    Sets saved state of physical objects that aren't handles into arrays
+    """
+    for ph_object, pos, prev_pos, velocity, bounces, sleeping, frozen, slow_ticks in zip(
+            objects, records['pos'].tolist(), records['prev_pos'].tolist(), records['velocity'].tolist(),
+            records['bounces'].tolist(), records['sleeping'].tolist(), records['frozen'].tolist(),
+            records['slow_ticks'].tolist()):
+        # the object has no entity yet, so it's vectors are replaced instead of going through setters
+        ph_object.entity = None
+        ph_object._pos = Vector(*pos)
+        ph_object.prev_pos = tuple(prev_pos)
+        ph_object._velocity = Vector(*velocity)
+        ph_object._bounces = bounces
+        ph_object._is_sleeping = bool(sleeping)
+        ph_object._is_frozen = bool(frozen)
+        ph_object.slow_ticks = slow_ticks
+
+
+def _restore_orders(game, objects, object_order, batched_order, active_order, frozen_order,
+                    archetype_names, archetype_sizes, archetype_rows):
+    """
+    Puts objects into pools, grids and archetypes in the order they had, so the restored game is updated
+    exactly as the saved one
+    """
+    persistent = {SnapshotFormat.tank_code: game.tank, SnapshotFormat.scoreboard_code: game.scoreboard,
+                  SnapshotFormat.swarm_code: game.swarm}
+    ordered = [objects[i] if i >= 0 else persistent[i] for i in object_order.tolist()]
+    ordered_set = set(ordered)
+    # objects that aren't saved, e.g. the profiler overlay, keep their order after the saved ones
+    ordered.extend(game_object for game_object in game.object_pool if game_object not in ordered_set
+                   and game_object.is_alive and not isinstance(game_object, PhysicalObject))
+
+    game.object_pool = _pool(ordered)
+    game._unculled_objects = _pool(game_object for game_object in ordered
+                                   if not isinstance(game_object, PhysicalObject))
+    game.batched_objects = _pool(objects[i] for i in batched_order.tolist())
+    game.physical_pool = _pool(objects)
+    game._frozen_grid = StaticGrid(game._frozen_grid.cell_size)
+
+    if game.physics is not None:
+        game._active_physicals = _pool(objects)
+    else:
+        game._active_physicals = _pool(objects[i] for i in active_order.tolist())
+        for i in frozen_order.tolist():
+            game._frozen_grid.insert(objects[i])
+        game._spatial_hash.rebuild(game._active_physicals, game.dt)
+
+    if game.world is not None:
+        rows = archetype_rows.tolist()
+        start = 0
+        for names, size in zip(archetype_names, archetype_sizes.tolist()):
+            owners = [objects[i] for i in rows[start:start + size]]
+            start += size
+            entities = game.world.create_many(names, [owner.components() for owner in owners])
+            for owner, entity in zip(owners, entities):
+                owner.entity = entity
+
+
+def restore(game, data):
+    """
+    Replaces state of a game with a snapshot. The game must have the same physics backend as the saved one.
+    Objects of the game are reused and their state is set in bulk, the physics backend, the world and pools
+    are replaced with ones filled from the snapshot
+    :param game: game to restore
+    :param data: bytes or another buffer of the snapshot, e.g. memory-mapped file
+    """
+    reader = _Reader(data)
+    magic, version, backend, has_swarm, tick, mouse_x, mouse_y, physical_count, object_count, batched_count, \
+        active_count, frozen_count, slot_count, member_count, enemy_count, archetype_count, row_count, \
+        names_size = reader.unpack(SnapshotFormat.header)
+    if magic != SnapshotFormat.magic or version != SnapshotFormat.version:
+        raise ValueError(f'not a snapshot of version {SnapshotFormat.version}')
+    if SnapshotFormat.physics_backends[backend] != game.physics_backend:
+        raise ValueError(f'snapshot of {SnapshotFormat.physics_backends[backend]} physics backend can\'t be '
+                         f'restored into a game with {game.physics_backend} backend')
+
+    random_state = reader.unpack(SnapshotFormat.random_state)
+    tank_state = reader.unpack(SnapshotFormat.tank)
+    scoreboard_state = reader.unpack(SnapshotFormat.scoreboard)
+    swarm_state = reader.unpack(SnapshotFormat.swarm_random_state) if has_swarm else None
+
+    records = reader.array(SnapshotFormat.physical, physical_count)
+    object_order, batched_order, active_order, frozen_order, slot_order, swarm_members, enemies, \
+        archetype_sizes, archetype_rows = (reader.array(SnapshotFormat.order, count) for count in (
+            object_count, batched_count, active_count, frozen_count, slot_count, member_count, enemy_count,
+            archetype_count, row_count))
+    archetype_names = [frozenset(names.split(',')) if names else frozenset()
+                       for names in reader.bytes(names_size).decode().split('\n')] if archetype_count else []
+
+    game.start()
+    # objects are reused or created apart from the physics backend and the world, which are replaced at once
+    uses_arrays, uses_world = game.physics is not None, game.world is not None
+    # projectiles that aren't needed become free, so they must not keep a slot or an entity of the replaced ones
+    for projectile in game.tank._projectiles:
+        if uses_arrays:
+            projectile.detach_arrays()
+        projectile.entity = None
+    game.physics, game.world = None, None
+
+    kinds = records['kind']
+    kind_indices = {kind: np.flatnonzero(kinds == kind) for kind in (
+        SnapshotFormat.enemy_kind, SnapshotFormat.projectile_kind, SnapshotFormat.swarm_member_kind)}
+    objects = _respawn_objects(game, kind_indices, has_swarm)
+
+    if uses_arrays:
+        game.physics = ArrayPhysics(game._x_border, game._y_border)
+        if objects:
+            game.physics.add_many([objects[i] for i in slot_order.tolist()], _array_state(objects, records, slot_order))
+    else:
+        _set_state(objects, records)
+    if uses_world:
+        game.world = World()
+
+    timers, settled_at = records['timer'], records['settled_at']
+    for i in kind_indices[SnapshotFormat.projectile_kind].tolist():
+        objects[i].age = float(timers[i])
+        objects[i].settled_at = float(settled_at[i])
+    for i in kind_indices[SnapshotFormat.enemy_kind].tolist():
+        objects[i].till_velocity_changed = float(timers[i])
+    game.tank._projectiles = _pool(objects[i] for i in kind_indices[SnapshotFormat.projectile_kind].tolist())
+
+    _restore_orders(game, objects, object_order, batched_order, active_order, frozen_order,
+                    archetype_names, archetype_sizes, archetype_rows)
+
+    if has_swarm:
+        swarm = game.swarm
+        swarm.members = [objects[i] for i in swarm_members.tolist()]
+        for index, member in enumerate(swarm.members):
+            member.index = index
+        if len(swarm.timers) < len(swarm.members):
+            swarm.timers = np.zeros(len(swarm.members))
+        swarm.timers[:len(swarm.members)] = timers[swarm_members]
+        state, increment, has_uint32, uinteger = swarm_state
+        swarm.rng.bit_generator.state = {'bit_generator': 'PCG64',
+                                         'state': {'state': int.from_bytes(state, 'little'),
+                                                   'inc': int.from_bytes(increment, 'little')},
+                                         'has_uint32': has_uint32, 'uinteger': uinteger}
+
+    game.enemies = [objects[i] for i in enemies.tolist()]
+
+    tank = game.tank
+    x, y, prev_x, prev_y, tank.shooting_power, direction_x, direction_y, is_mouse_down, tank.motion_direction = \
+        tank_state
+    tank.pos = Vector(x, y)
+    tank.prev_pos = prev_x, prev_y
+    tank.direction = Vector(direction_x, direction_y)
+    tank.is_mouse_down = bool(is_mouse_down)
+    game.scoreboard.scoreboard.update(zip(game.scoreboard.scoreboard, scoreboard_state))
+
+    version, *mt_state, has_gauss, gauss = random_state
+    game.random.setstate((version, tuple(mt_state), gauss if has_gauss else None))
+    game.tick = tick
+    game.mouse_pos = (mouse_x, mouse_y)
+
@@ -0,0 +1,282 @@
+import math
+
+
+class SpatialHash:
+    """
+    Uniform grid that buckets physical objects by the cells their bounding boxes cover.
+    Used as a collision broadphase so only objects in nearby cells are tested against each other.
+    Pairs where neither object's collision layer is in the other's collision mask are skipped
+    """
+
+    def __init__(self, cell_size):
+        """
+        SpatialHash constructor
+        :param cell_size: side of a square grid cell in pixels
+        """
+        self.cell_size = cell_size
+        self._cells = {}
+        self._objects = []
+        self._sleeping = []
+        self._layers = []
+        self._masks = []
+
+    def _cell_range(self, min_x, min_y, max_x, max_y):
+        """
+        Returns ranges of cell indices that cover a rectangle
+        :param min_x, min_y, max_x, max_y: rectangle borders
+        :return: tuple (x range, y range) of cell indices
+        """
+        size = self.cell_size
+        return (range(math.floor(min_x / size), math.floor(max_x / size) + 1),
+                range(math.floor(min_y / size), math.floor(max_y / size) + 1))
+
+    def _object_cells(self, ph_object, dt):
+        """
+        Returns ranges of cell indices covered by an object while it moves during dt
+        """
+        pos, velocity = ph_object.pos, ph_object.velocity
+        x, y = pos.x, pos.y
+        end_x, end_y = x + velocity.x * dt, y + velocity.y * dt
+        radius = ph_object.radius
+        return self._cell_range(min(x, end_x) - radius, min(y, end_y) - radius,
+                                max(x, end_x) + radius, max(y, end_y) + radius)
+
+    def clear(self):
+        """
+        Removes all objects from the grid
+        """
+        self._cells.clear()
+        self._objects = []
+        self._sleeping = []
+        self._layers = []
+        self._masks = []
+
+    def rebuild(self, physical_objects, dt=0):
+        """
+        Clears the grid and inserts all objects at their current positions
+        :param physical_objects: iterable of physical objects
+        :param dt: if not 0, objects are inserted into all cells they pass through during dt
+        """
+        self.clear()
+        for ph_object in physical_objects:
+            self.insert(ph_object, dt)
+
+    def insert(self, ph_object, dt=0):
+        """
+        Inserts an object at it's current position
+        :param ph_object: physical object
+        :param dt: if not 0, the object is inserted into all cells it passes through during dt
+        """
+        cells = self._cells
+        index = len(self._objects)
+        self._objects.append(ph_object)
+        self._sleeping.append(ph_object.is_sleeping)
+        self._layers.append(ph_object.collision_layer)
+        self._masks.append(ph_object.collision_mask)
+        x_range, y_range = self._object_cells(ph_object, dt)
+        for cell_x in x_range:
+            for cell_y in y_range:
+                key = (cell_x, cell_y)
+                if key in cells:
+                    cells[key].append(index)
+                else:
+                    cells[key] = [index]
+
+    def candidate_pairs(self):
+        """
+        Returns pairs of objects that share at least one cell. Every pair is returned once, ordered the same way
+        itertools.combinations would order them over the inserted objects. Pairs of two sleeping objects and pairs
+        with disjoint collision layers and masks are skipped
+        :return: list of (object1, object2) tuples
+        """
+        pairs = set()
+        sleeping, layers, masks = self._sleeping, self._layers, self._masks
+        for bucket in self._cells.values():
+            if len(bucket) < 2:
+                continue
+
+            # objects of a bucket are grouped by layer, so objects are only compared with groups they can
+            # interact with and a crowd of objects that don't collide with each other stays cheap
+            groups = {}
+            for index in bucket:
+                if layers[index] in groups:
+                    groups[layers[index]].append(index)
+                else:
+                    groups[layers[index]] = [index]
+            group_masks = {group_layer: 0 for group_layer in groups}
+            for index in bucket:
+                group_masks[layers[index]] |= masks[index]
+
+            for first in bucket:
+                if sleeping[first]:
+                    continue
+                layer, mask = layers[first], masks[first]
+                for group_layer, group in groups.items():
+                    if not (group_layer & mask or group_masks[group_layer] & layer):
+                        continue
+                    for second in group:
+                        if not (layer & masks[second] or layers[second] & mask):
+                            continue
+                        if first < second:
+                            pairs.add((first, second))
+                        elif second < first and sleeping[second]:
+                            pairs.add((second, first))
+
+        objects = self._objects
+        return [(objects[i], objects[j]) for i, j in sorted(pairs)]
+
+    def _collect(self, min_x, min_y, max_x, max_y):
+        """
+        Returns indices of objects in cells covering a rectangle
+        :return: sorted list of object indices
+        """
+        x_range, y_range = self._cell_range(min_x, min_y, max_x, max_y)
+        found = set()
+        for cell_x in x_range:
+            for cell_y in y_range:
+                bucket = self._cells.get((cell_x, cell_y))
+                if bucket:
+                    found.update(bucket)
+
+        return sorted(found)
+
+    def query_radius(self, pos, radius):
+        """
+        Finds objects that intersect a circle
+        :param pos: centre of the circle
+        :param radius: radius of the circle
+        :return: list of objects
+        """
+        x, y = pos
+        result = []
+        for index in self._collect(x - radius, y - radius, x + radius, y + radius):
+            ph_object = self._objects[index]
+            max_distance = radius + ph_object.radius
+            if (ph_object.pos.x - x) ** 2 + (ph_object.pos.y - y) ** 2 <= max_distance ** 2:
+                result.append(ph_object)
+
+        return result
+
+    def query_rect(self, rect):
+        """
+        Finds objects whose bounding boxes intersect a rectangle
+        :param rect: tuple (x, y, width, height) of a rectangle
+        :return: list of objects
+        """
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+        result = []
+        for index in self._collect(left, top, right, bottom):
+            ph_object = self._objects[index]
+            x, y, radius = ph_object.pos.x, ph_object.pos.y, ph_object.radius
+            if x + radius >= left and x - radius <= right and y + radius >= top and y - radius <= bottom:
+                result.append(ph_object)
+
+        return result
+
+
+class StaticGrid:
+    """
+    Uniform grid of physical objects that don't move, e.g. frozen ones. Objects are inserted and removed one by one
+    instead of rebuilding the grid in every tick. Objects are found in the order they were inserted into cells
+    """
+
+    def __init__(self, cell_size):
+        """
+        StaticGrid constructor
+        :param cell_size: side of a square grid cell in pixels
+        """
+        self.cell_size = cell_size
+        self._cells = {}
+        self._object_keys = {}
+
+    def _cell_keys(self, min_x, min_y, max_x, max_y):
+        """
+        Returns keys of cells that cover a rectangle
+        :param min_x, min_y, max_x, max_y: rectangle borders
+        :return: list of tuples (cell x, cell y)
+        """
+        size = self.cell_size
+        return [(cell_x, cell_y)
+                for cell_x in range(math.floor(min_x / size), math.floor(max_x / size) + 1)
+                for cell_y in range(math.floor(min_y / size), math.floor(max_y / size) + 1)]
+
+    def insert(self, ph_object):
+        """
+        Inserts an object at it's current position
+        :param ph_object: physical object
+        """
+        x, y, radius = ph_object.pos.x, ph_object.pos.y, ph_object.radius
+        keys = self._cell_keys(x - radius, y - radius, x + radius, y + radius)
+        self._object_keys[ph_object] = keys
+        for key in keys:
+            bucket = self._cells.get(key)
+            if bucket is None:
+                bucket = self._cells[key] = {}
+            bucket[ph_object] = None
+
+    def remove(self, ph_object):
+        """
+        Removes an object
+        :param ph_object: physical object
+        :return: True if the object was removed, False if it wasn't in the grid
+        """
+        keys = self._object_keys.pop(ph_object, None)
+        if keys is None:
+            return False
+
+        for key in keys:
+            bucket = self._cells[key]
+            del bucket[ph_object]
+            if not bucket:
+                del self._cells[key]
+        return True
+
+    def _collect(self, min_x, min_y, max_x, max_y):
+        """
+        Returns objects in cells covering a rectangle
+        :return: list of objects without repetitions
+        """
+        found = {}
+        for key in self._cell_keys(min_x, min_y, max_x, max_y):
+            bucket = self._cells.get(key)
+            if bucket:
+                found.update(bucket)
+
+        return list(found)
+
+    def query_radius(self, pos, radius):
+        """
+        Finds objects that intersect a circle
+        :param pos: centre of the circle
+        :param radius: radius of the circle
+        :return: list of objects
+        """
+        x, y = pos
+        return [ph_object for ph_object in self._collect(x - radius, y - radius, x + radius, y + radius)
+                if (ph_object.pos.x - x) ** 2 + (ph_object.pos.y - y) ** 2 <= (radius + ph_object.radius) ** 2]
+
+    def query_rect(self, rect):
+        """
+        Finds objects whose bounding boxes intersect a rectangle
+        :param rect: tuple (x, y, width, height) of a rectangle
+        :return: list of objects
+        """
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+        result = []
+        for ph_object in self._collect(left, top, right, bottom):
+            x, y, radius = ph_object.pos.x, ph_object.pos.y, ph_object.radius
+            if x + radius >= left and x - radius <= right and y + radius >= top and y - radius <= bottom:
+                result.append(ph_object)
+
+        return result
+
+    def __iter__(self):
+        return iter(self._object_keys)
+
+    def __contains__(self, ph_object):
+        return ph_object in self._object_keys
+
+    def __len__(self):
+        return len(self._object_keys)
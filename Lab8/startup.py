@@ -0,0 +1,143 @@
+import ast
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """
+    Collects how long imports and initialization steps take. Steps measured inside other steps are nested in them
+    """
+
+    def __init__(self):
+        self.steps = []
+        self._depth = 0
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Context manager that records duration of a step
+        :param name: name of the step
+        """
+        index = len(self.steps)
+        self.steps.append((name, 0.0, self._depth))
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.steps[index] = (name, time.perf_counter() - start, self._depth)
+
+    def total(self):
+        """
+        Returns total duration of recorded steps that aren't nested
+        :return: time in seconds
+        """
+        return sum(duration for name, duration, depth in self.steps if depth == 0)
+
+    def format(self):
+        """
+        Returns a table of recorded steps in order they were started, nested steps are indented
+        :return: string with a line per step
+        """
+        total = self.total()
+        lines = [f'{"step":<32}{"ms":>9}{"%":>7}']
+        for name, duration, depth in self.steps:
+            share = 100 * duration / total if total > 0 else 0.0
+            lines.append(f'{"  " * depth + name:<32}{duration * 1000:>9.1f}{share:>7.1f}')
+        lines.append(f'{"total":<32}{total * 1000:>9.1f}')
+        return '\n'.join(lines)
+
+
+report = StartupReport()
+
+
+def require(*modules):
+    """
+    Initializes pygame modules that aren't initialized yet, so only modules that are used are started
+    :param modules: names of pygame modules, e.g. 'display' or 'font'
+    """
+    import pygame as pg
+
+    for name in modules:
+        module = getattr(pg, name)
+        if not module.get_init():
+            with report.measure(f'{name} init'):
+                module.init()
+
+
+def local_imports(module_name):
+    """
+    Returns modules of this directory imported by a module, including imports inside functions, in order of appearance
+    :param module_name: name of the module
+    :return: list of module names
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(directory, f'{module_name}.py')) as file:
+        tree = ast.parse(file.read())
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend((node.lineno, alias.name) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            imports.append((node.lineno, node.module))
+
+    modules = []
+    for _, name in sorted(imports):
+        name = name.split('.')[0]
+        if name not in modules and os.path.exists(os.path.join(directory, f'{name}.py')):
+            modules.append(name)
+    return modules
+
+
+def startup_modules(entry_points=('main', 'network')):
+    """
+    Returns modules that entry points import, each entry point follows the modules it depends on
+    :param entry_points: names of modules that the game is started from
+    :return: list of module names
+    """
+    modules = []
+    for entry_point in entry_points:
+        for name in local_imports(entry_point) + [entry_point]:
+            if name not in modules and name != 'startup':
+                modules.append(name)
+    return modules
+
+
+def main():
+    """
+    Measures cold start of the game and prints where the time goes
+    """
+    # this file is run as __main__, game modules record their steps into the report of imported startup module
+    from startup import report
+
+    if '--headless' in sys.argv:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    # numpy is imported by pygame.surfarray, it's measured separately to show it's share of pygame import
+    for module_name in ['numpy', 'pygame'] + startup_modules():
+        index = len(report.steps)
+        try:
+            with report.measure(f'import {module_name}'):
+                importlib.import_module(module_name)
+        except ImportError:
+            # the step of the failed import is removed with steps nested in it, e.g. by require
+            del report.steps[index:]
+
+    from main import Game
+    with report.measure('Game()'):
+        game = Game(headless='--headless' in sys.argv)
+    with report.measure('Game.start()'):
+        game.start()
+
+    print(report.format())
+
+
+if __name__ == '__main__':
+    main()
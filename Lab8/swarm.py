@@ -0,0 +1,192 @@
+import math
+
+import numpy as np
+
+from common import GameObject, PhysicalObject, Vector, Colors
+from enemy import Enemy
+
+
+class SwarmEnemy(Enemy):
+    """
+    Enemy that belongs to a swarm. It collides like a usual enemy, but it's velocity changes and drawing are done
+    by the swarm for all members at once
+    """
+    updated_in_batch = True
+
+    def __init__(self, pos, velocity, game, swarm):
+        self.swarm = swarm
+        self.index = swarm.add(self)
+
+        PhysicalObject.__init__(self, pos, game, velocity, Enemy.body_radius, collides_with_borders=True)
+
+    @property
+    def till_velocity_changed(self):
+        return float(self.swarm.timers[self.index])
+
+    @till_velocity_changed.setter
+    def till_velocity_changed(self, value):
+        self.swarm.timers[self.index] = value
+
+    def update(self):
+        pass
+
+    def components(self):
+        # swarm changes velocity and draws it's members, so they don't get wander and renderable components
+        return PhysicalObject.components(self)
+
+    def on_removed(self):
+        self.swarm.remove(self)
+
+
+class Swarm(GameObject):
+    """
+    Manages many enemies as a batch. Times till velocity change are kept in an array and counted down at once,
+    new velocities and times are drawn in bulk from a seeded NumPy generator
+    """
+    initial_capacity = 1024
+    spawn_margin = 50
+
+    def __init__(self, game, size):
+        """
+        Swarm constructor. Spawns members at random positions
+        :param game: Game class object
+        :param size: number of enemies
+        """
+        super().__init__(Vector(0, 0), game)
+
+        self.rng = np.random.default_rng(game.random.randrange(2 ** 63))
+        self.members = []
+        self.timers = np.zeros(Swarm.initial_capacity)
+
+        (min_x, max_x), (min_y, max_y) = game._x_border, game._y_border
+        margin = Swarm.spawn_margin
+        xs = self.rng.uniform(min_x + margin, max_x - margin, size).tolist()
+        ys = self.rng.uniform(min_y + margin, max_y - margin, size).tolist()
+        velocities_x, velocities_y = self._random_velocities(size)
+        times = self._random_times(size)
+
+        for x, y, v_x, v_y in zip(xs, ys, velocities_x.tolist(), velocities_y.tolist()):
+            SwarmEnemy(Vector(x, y), Vector(v_x, v_y), game, self)
+        self.timers[:size] = times
+
+    def _random_velocities(self, n):
+        """
+        Draws n random velocities with magnitudes from Enemy.velocity_range
+        :return: tuple (x coordinates, y coordinates) of arrays
+        """
+        magnitude = self.rng.uniform(*Enemy.velocity_range, n)
+        angle = self.rng.uniform(0, 2 * math.pi, n)
+        return magnitude * np.cos(angle), magnitude * np.sin(angle)
+
+    def _random_times(self, n):
+        """
+        Draws n random times till velocity change
+        :return: array of times
+        """
+        return self.rng.uniform(Enemy.velocity_time_min, Enemy.velocity_time_max, n)
+
+    def add(self, member):
+        """
+        Adds a member to the swarm
+        :param member: SwarmEnemy
+        :return: index of the member
+        """
+        index = len(self.members)
+        if index == len(self.timers):
+            self.timers = np.concatenate((self.timers, np.zeros(len(self.timers))))
+
+        self.members.append(member)
+        self.timers[index] = Enemy.velocity_time_max
+        return index
+
+    def remove(self, member):
+        """
+        Removes a member by moving the last member into its place
+        :param member: SwarmEnemy
+        """
+        index, last = member.index, len(self.members) - 1
+        if index != last:
+            moved = self.members[last]
+            self.members[index] = moved
+            self.timers[index] = self.timers[last]
+            moved.index = index
+        self.members.pop()
+
+    def update(self):
+        game = self.game
+        n = len(self.members)
+        if n == 0:
+            return
+
+        # without array and entity-component backends members are moved here instead of their update methods
+        if game.physics is None and game.world is None:
+            dt = game.dt
+            for member in self.members:
+                member.remember_position()
+                if not member.is_sleeping:
+                    member.pos.add_scaled(member.velocity, dt)
+
+        timers = self.timers[:n]
+        timers -= game.dt
+        changing = np.flatnonzero(timers <= 0)
+        if len(changing) == 0:
+            return
+
+        # frozen members get new times, but keep their velocities
+        if game.physics is not None:
+            slots = np.array([self.members[i].slot for i in changing.tolist()])
+            awake = ~game.physics.frozen[slots]
+            slots = slots[awake]
+        else:
+            awake = np.array([not self.members[i].is_frozen for i in changing.tolist()], dtype=bool)
+
+        velocities_x, velocities_y = self._random_velocities(np.count_nonzero(awake))
+        timers[changing] = self._random_times(len(changing))
+        changing = changing[awake]
+
+        if game.physics is not None:
+            game.physics.velocity[slots, 0] = velocities_x
+            game.physics.velocity[slots, 1] = velocities_y
+            game.physics.wake(slots)
+        else:
+            for i, v_x, v_y in zip(changing.tolist(), velocities_x.tolist(), velocities_y.tolist()):
+                member = self.members[i]
+                member.velocity = Vector(v_x, v_y)
+                member.wake()
+
+    def state_values(self):
+        return tuple(self.timers[:len(self.members)].tolist())
+
+    def _render_positions(self):
+        """
+        Returns interpolated positions of members that are inside game.view_rect
+        :return: list of tuples (x, y)
+        """
+        game = self.game
+        left, top, width, height = game.view_rect
+        right, bottom = left + width, top + height
+        if game.physics is None:
+            return [member.render_pos() for member in self.members
+                    if left <= member.pos.x <= right and top <= member.pos.y <= bottom]
+
+        # visible objects are found in arrays first, so only they are checked for being members
+        physics = game.physics
+        x, y = physics.pos[:physics.count, 0], physics.pos[:physics.count, 1]
+        visible = np.flatnonzero((x >= left) & (x <= right) & (y >= top) & (y <= bottom))
+        slots = [slot for slot in visible.tolist() if getattr(physics.objects[slot], 'swarm', None) is self]
+        prev_pos, pos = physics.prev_pos[slots], physics.pos[slots]
+        return np.rint(prev_pos + (pos - prev_pos) * game.alpha).astype(int).tolist()
+
+    def draw(self, surface):
+        if not self.members:
+            return
+
+        radius = Enemy.body_radius
+        sprite = self.game.render_queue.sprite_cache.circle(radius, Colors.white)
+        self.game.render_queue.add_sprites(sprite, ((x - radius, y - radius) for x, y in self._render_positions()))
+
+    def destroy(self):
+        super().destroy()
+
+        for member in list(self.members):
+            member.destroy()
@@ -0,0 +1,217 @@
+import argparse
+import ast
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pygame as pg
+
+
+class ScriptedShooter:
+    """
+    Input source that plays the game instead of a user. It aims at the nearest living enemy leading it by
+    it's velocity, holds the mouse button for hold_ticks and waits reload_ticks between shots.
+    The screen position it last aimed at is kept in aim_pos
+    """
+    hold_ticks = 50
+    reload_ticks = 10
+
+    def __init__(self):
+        self.game = None
+        self.aim_pos = None
+        self._is_holding = False
+        self._wait_ticks = 0
+
+    def _target(self):
+        """
+        Returns the nearest living enemy to the tank
+        :return: enemy or None if all enemies are destroyed
+        """
+        cannon_pos = self.game.tank.pos
+        living = [enemy for enemy in self.game.enemies if enemy.is_alive]
+        if not living:
+            return None
+
+        return min(living, key=lambda enemy: (enemy.pos - cannon_pos).magnitude_squared())
+
+    def _aim_event(self, target):
+        """
+        Returns MOUSEMOTION event that points the cannon at where the target will be when a projectile reaches it
+        """
+        from cannon import Cannon
+
+        cannon_pos = self.game.tank.pos
+        power = min(self.hold_ticks * self.game.dt * Cannon.shooting_power_per_second, Cannon.max_shooting_power)
+        speed = Cannon.projectile_min_velocity + (Cannon.projectile_max_velocity - Cannon.projectile_min_velocity) * power
+        flight_time = (target.pos - cannon_pos).magnitude() / speed
+        self.aim_pos = self.game.camera.to_screen((target.pos + target.velocity * flight_time).int_tuple())
+        return pg.event.Event(pg.MOUSEMOTION, pos=self.aim_pos, rel=(0, 0), buttons=(0, 0, 0))
+
+    def __call__(self):
+        if self._wait_ticks > 0:
+            self._wait_ticks -= 1
+            return []
+
+        target = self._target()
+        if target is None:
+            return []
+
+        # button events move the mouse too, so they are given the aim position
+        aim_event = self._aim_event(target)
+        self._is_holding = not self._is_holding
+        if self._is_holding:
+            self._wait_ticks = self.hold_ticks
+            button_event = pg.event.Event(pg.MOUSEBUTTONDOWN, pos=self.aim_pos, button=1)
+        else:
+            self._wait_ticks = self.reload_ticks
+            button_event = pg.event.Event(pg.MOUSEBUTTONUP, pos=self.aim_pos, button=1)
+
+        return [aim_event, button_event]
+
+
+def _parameter_owners():
+    """
+    Returns classes whose attributes can be swept
+    :return: dictionary {class name: class}
+    """
+    from main import Game
+    from cannon import Cannon, Projectile
+    from enemy import Enemy
+
+    return {'Game': Game, 'Cannon': Cannon, 'Projectile': Projectile, 'Enemy': Enemy,
+            'ScriptedShooter': ScriptedShooter}
+
+
+def _set_parameters(parameters):
+    """
+    Sets class attributes
+    :param parameters: dictionary {'Class.attribute': value}
+    :return: dictionary of previous values
+    """
+    owners = _parameter_owners()
+    previous = {}
+    for name, value in parameters.items():
+        class_name, attribute = name.split('.')
+        owner = owners[class_name]
+        if not hasattr(owner, attribute):
+            raise AttributeError(f'{class_name} has no attribute {attribute}')
+
+        previous[name] = getattr(owner, attribute)
+        setattr(owner, attribute, value)
+
+    return previous
+
+
+def run_session(parameters, seed, max_ticks):
+    """
+    Plays one headless game with scripted shooter until all enemies are destroyed or max_ticks pass
+    :param parameters: dictionary {'Class.attribute': value} of class attributes to set during the game
+    :param seed: seed of the game
+    :param max_ticks: limit of game length
+    :return: dictionary of game statistics
+    """
+    from main import Game
+
+    previous = _set_parameters(parameters)
+    try:
+        shooter = ScriptedShooter()
+        game = Game(headless=True, input_source=shooter, seed=seed)
+        shooter.game = game
+        game.start()
+
+        ticks_to_clear = None
+        while game.tick < max_ticks:
+            game.step()
+            if not any(enemy.is_alive for enemy in game.enemies):
+                ticks_to_clear = game.tick
+                break
+    finally:
+        _set_parameters(previous)
+
+    scoreboard = game.scoreboard.scoreboard
+    shots, kills = scoreboard['projectiles_shot'], scoreboard['enemies_destroyed']
+    return {'seed': seed, **parameters,
+            'enemies': len(game.enemies), 'shots': shots, 'kills': kills,
+            'accuracy': kills / shots if shots else 0.0,
+            'ticks': game.tick, 'ticks_to_clear': ticks_to_clear}
+
+
+def _run_chunk(chunk):
+    return [run_session(*task) for task in chunk]
+
+
+def tasks(grid, seeds, max_ticks):
+    """
+    Generates sessions for every combination of parameter values and every seed
+    :param grid: dictionary {'Class.attribute': list of values}
+    :param seeds: iterable of seeds
+    :param max_ticks: limit of game length
+    :return: generator of (parameters, seed, max_ticks) tuples
+    """
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        for seed in seeds:
+            yield dict(zip(names, values)), seed, max_ticks
+
+
+def run(grid, seeds, max_ticks, output_path, workers=None, chunk_size=None):
+    """
+    Runs sessions in a process pool and writes rows of sessions to a CSV file as soon as their chunk is finished.
+    Chunks are written in order of completion
+    :param grid: dictionary {'Class.attribute': list of values}
+    :param seeds: list of seeds
+    :param max_ticks: limit of game length
+    :param output_path: path of CSV file
+    :param workers: number of processes, number of CPUs if None
+    :param chunk_size: number of sessions sent to a process at once. Chosen so every process gets several chunks if None
+    :return: number of sessions
+    """
+    workers = workers or os.cpu_count()
+    task_list = list(tasks(grid, seeds, max_ticks))
+    if chunk_size is None:
+        chunk_size = max(1, len(task_list) // (workers * 4))
+
+    columns = ['seed', *grid, 'enemies', 'shots', 'kills', 'accuracy', 'ticks', 'ticks_to_clear']
+    with open(output_path, 'w', newline='') as f, \
+            ProcessPoolExecutor(workers) as executor:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        futures = [executor.submit(_run_chunk, task_list[i:i + chunk_size])
+                   for i in range(0, len(task_list), chunk_size)]
+        for future in as_completed(futures):
+            writer.writerows(future.result())
+            f.flush()
+
+    return len(task_list)
+
+
+def _parse_parameter(values):
+    name, *raw_values = values
+    if not raw_values:
+        raise argparse.ArgumentTypeError(f'no values given for {name}')
+    return name, [ast.literal_eval(value) for value in raw_values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plays many headless Lab8 games with a scripted shooter '
+                                                 'for every combination of parameter values')
+    parser.add_argument('--param', nargs='+', action='append', default=[], metavar=('NAME', 'VALUE'),
+                        help='class attribute and it\'s values, e.g. --param Cannon.projectile_max_velocity 400 500. '
+                             'Values are python literals, e.g. "(30, 100)" for Enemy.velocity_range')
+    parser.add_argument('--seeds', type=int, default=10, help='number of seeded games for every combination')
+    parser.add_argument('--max-ticks', type=int, default=3000, help='limit of game length')
+    parser.add_argument('--workers', type=int, help='number of processes')
+    parser.add_argument('--output', default='sweep_results.csv', help='path of CSV file')
+    args = parser.parse_args()
+
+    grid = dict(_parse_parameter(values) for values in args.param)
+    start = time.perf_counter()
+    count = run(grid, range(args.seeds), args.max_ticks, args.output, args.workers)
+    print(f'{count} sessions in {time.perf_counter() - start:.1f} s written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
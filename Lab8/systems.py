@@ -0,0 +1,140 @@
+import math
+
+
+class Lifetime:
+    """
+    Component with age of an entity in seconds and the age at which it settled, infinity if it hasn't settled
+    """
+    __slots__ = ('age', 'settled_at')
+
+    def __init__(self, age=0.0, settled_at=math.inf):
+        self.age = age
+        self.settled_at = settled_at
+
+
+class Motion:
+    """
+    Component with constant acceleration and air drag coefficient that change velocity of an entity
+    """
+    __slots__ = ('acceleration', 'drag')
+
+    def __init__(self, acceleration, drag):
+        self.acceleration = acceleration
+        self.drag = drag
+
+
+class Renderable:
+    """
+    Component that makes an entity drawn as a filled circle
+    """
+    __slots__ = ('radius', 'color')
+
+    def __init__(self, radius, color):
+        self.radius = radius
+        self.color = color
+
+
+class Wander:
+    """
+    Component of an entity that changes velocity to a random one from time to time
+    """
+    __slots__ = ('till_velocity_changed',)
+
+    def __init__(self, till_velocity_changed):
+        self.till_velocity_changed = till_velocity_changed
+
+
+def remember_positions(world):
+    """
+    Saves current positions of entities as previous ones
+    """
+    for owners, transforms in world.query('owner', 'transform'):
+        for owner, pos in zip(owners, transforms):
+            owner.prev_pos = pos.x, pos.y
+
+
+def age(world, dt):
+    """
+    Increases age of entities that aren't frozen, destroys owners that are expired and settles owners that should settle
+    """
+    for owners, lifetimes in world.query('owner', 'lifetime', exclude=('frozen',)):
+        expired = []
+        settled = []
+        for owner, lifetime in zip(owners, lifetimes):
+            lifetime.age += dt
+            if owner.is_expired():
+                expired.append(owner)
+            elif owner.should_settle():
+                settled.append(owner)
+        # both change archetypes of entities, so they are done after the query
+        for owner in expired:
+            owner.destroy()
+        for owner in settled:
+            owner.settle()
+
+
+def move(world, dt):
+    """
+    Moves awake entities with their velocities, applies motion to velocities and bounces entities
+    with continuous collision off borders
+    """
+    for owners, transforms, velocities in world.query('owner', 'transform', 'velocity', exclude=('sleeping',)):
+        for owner, pos, velocity in zip(owners, transforms, velocities):
+            if owner.is_alive:
+                pos.add_scaled(velocity, dt)
+
+    for owners, velocities, motions in world.query('owner', 'velocity', 'motion', exclude=('sleeping',)):
+        for owner, velocity, motion in zip(owners, velocities, motions):
+            if owner.is_alive:
+                velocity.add_scaled(velocity, -motion.drag * dt)
+                velocity.add_scaled(motion.acceleration, dt)
+
+    for owners, continuous in world.query('owner', 'continuous', exclude=('sleeping',)):
+        for owner in owners:
+            if owner.is_alive:
+                owner.game.reflect_from_borders(owner)
+
+
+def wander(world, dt):
+    """
+    Counts down time till velocity change of wandering entities that aren't frozen and lets their owners change it
+    """
+    for owners, wanders in world.query('owner', 'wander', exclude=('frozen',)):
+        changing = []
+        for owner, state in zip(owners, wanders):
+            state.till_velocity_changed -= dt
+            if state.till_velocity_changed <= 0:
+                changing.append(owner)
+        # changing velocity wakes an entity up, which moves it to another archetype, so it's done after iteration
+        for owner in changing:
+            owner.change_velocity()
+
+
+def update(world, dt):
+    """
+    Runs all systems that update entities in order of one tick
+    """
+    remember_positions(world)
+    age(world, dt)
+    move(world, dt)
+    wander(world, dt)
+
+
+def render(world, render_queue, alpha, view_rect):
+    """
+    Queues drawing of renderable entities between their previous and current positions.
+    Entities outside of the view are skipped
+    :param render_queue: RenderQueue to queue drawing to
+    :param alpha: interpolation factor between previous and current positions
+    :param view_rect: tuple (x, y, width, height) of the visible part of the world
+    """
+    left, top, width, height = view_rect
+    right, bottom = left + width, top + height
+    for owners, transforms, renderables in world.query('owner', 'transform', 'renderable'):
+        for owner, pos, renderable in zip(owners, transforms, renderables):
+            radius = renderable.radius
+            if pos.x + radius < left or pos.x - radius > right or pos.y + radius < top or pos.y - radius > bottom:
+                continue
+            prev_x, prev_y = owner.prev_pos
+            center = (int(round(prev_x + (pos.x - prev_x) * alpha)), int(round(prev_y + (pos.y - prev_y) * alpha)))
+            render_queue.add_circle(center, renderable.radius, renderable.color)
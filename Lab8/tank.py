@@ -1,6 +1,5 @@
 from cannon import Cannon
 import pygame as pg
-import pygame.draw as draw
 
 from common import Vector, Colors
 
@@ -18,7 +17,7 @@ class Tank(Cannon):
     y_size = 1 / 15
 
     def __init__(self, game):
-        width, height = game.resolution
+        width, height = game.world_size
         super().__init__(Vector(Tank.x_pos * width, Tank.y_pos * height), game)
 
         game.subscribe_to_event(pg.KEYDOWN, self._keydown_listener)
@@ -29,20 +28,30 @@ class Tank(Cannon):
     def draw(self, surface):
         width, height = self.game.resolution
         size_vector = Vector(Tank.x_size * width, Tank.y_size * width)
-        rect = (self.pos - size_vector * 0.5).int_tuple(), size_vector.int_tuple()
+        x, y = self.render_pos()
+        rect = (Vector(x, y) - size_vector * 0.5).int_tuple(), size_vector.int_tuple()
 
-        draw.rect(surface, Colors.white, rect)
+        self.game.render_queue.add_rect(rect, Colors.white)
         super().draw(surface)
 
+    def state_values(self):
+        return super().state_values() + (self.motion_direction,)
+
     def update(self):
         super().update()
 
         motion_zone_start, motion_zone_finish = Tank.motion_zone_border
-        width, height = self.game.resolution
+        width, height = self.game.world_size
 
         if (motion_zone_start * width < self.pos.x or self.motion_direction == 1) \
                 and (self.pos.x < motion_zone_finish * width or self.motion_direction == -1):
-            self.pos += Vector.i() * self.motion_direction * Tank.speed * self.game.dt
+            self.pos.x += self.motion_direction * Tank.speed * self.game.dt
+
+    def destroy(self):
+        super().destroy()
+
+        self.game.unsubscribe_from_event(pg.KEYDOWN, self._keydown_listener)
+        self.game.unsubscribe_from_event(pg.KEYUP, self._keyup_listener)
 
     def _keydown_listener(self, event):
         """
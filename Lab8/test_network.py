@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+from main import Game
+from network import GameClient, GameServer, NetFormat, NetFrame, _trim_history, decode_state, encode_state, \
+    quantize_positions
+
+
+class StateEncodingTest(unittest.TestCase):
+    """
+    Checks that a state message decodes against it's baseline into the encoded frame
+    """
+
+    def assertFramesEqual(self, decoded, frame):
+        self.assertEqual(decoded.tick, frame.tick)
+        self.assertEqual(tuple(decoded.tank), tuple(frame.tank))
+        for name in ('ids', 'kinds', 'positions', 'velocities'):
+            np.testing.assert_array_equal(getattr(decoded, name), getattr(frame, name), err_msg=name)
+
+    @staticmethod
+    def _round_trip(frame, base):
+        message = encode_state(frame, base)
+        body = message[NetFormat.length.size + NetFormat.tag.size:]
+        frames = {} if base is None else {base.tick: base}
+        return decode_state(body, frames)
+
+    @staticmethod
+    def _frame(tick, ids, positions, velocities):
+        ids = np.array(ids, dtype=np.uint32)
+        return NetFrame(tick, ids, (ids % 2).astype(np.uint8), np.array(positions, dtype=np.int32).reshape(-1, 2),
+                        np.array(velocities, dtype=np.int16).reshape(-1, 2), (10, 20, 0, 100, 5, False))
+
+    def test_changed_new_and_removed_objects(self):
+        base = self._frame(7, [1, 2, 3, 5], [(0, 0), (10, 10), (20, 20), (30, 30)],
+                           [(1, 1), (2, 2), (3, 3), (4, 4)])
+        frame = self._frame(9, [2, 3, 4, 6], [(10, 10), (21, 20), (40, 40), (50, 50)],
+                            [(2, 2), (3, -3), (5, 5), (6, 6)])
+
+        self.assertFramesEqual(self._round_trip(frame, base), frame)
+        self.assertFramesEqual(self._round_trip(frame, None), frame)
+
+    def test_captured_game_states(self):
+        game = Game(headless=True, input_source=lambda: [], physics_backend='numpy', swarm_size=200, seed=5)
+        game.start()
+        server = GameServer(game)
+
+        game.step(1)
+        base = server.capture()
+        game.step(10)
+        frame = server.capture()
+
+        self.assertGreater(len(frame.ids), 0)
+        self.assertFramesEqual(self._round_trip(frame, base), frame)
+        self.assertFramesEqual(self._round_trip(frame, None), frame)
+
+
+class HistoryTest(unittest.TestCase):
+    """
+    Checks that old frames are forgotten when ticks were skipped
+    """
+
+    def test_trim_removes_all_old_frames(self):
+        frames = {tick: None for tick in range(0, 200, 3)}
+        _trim_history(frames, 198)
+        self.assertEqual(min(frames), 198 - NetFormat.history_ticks + 1)
+        self.assertTrue(all(tick > 198 - NetFormat.history_ticks for tick in frames))
+
+
+class LoopbackTest(unittest.TestCase):
+    """
+    Runs a server and a headless client over loopback and checks that the client sees the server's state
+    """
+    ticks = 30
+
+    async def _serve(self, game):
+        server = GameServer(game)
+        await server.start()
+        client = GameClient(port=server.port, headless=True)
+        running = asyncio.create_task(client.run())
+        try:
+            await server.run(LoopbackTest.ticks)
+            deadline = time.perf_counter() + 5
+            while client.latest_tick != game.tick and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            return server.stats(), client, client.interpolate(client.latest_tick)
+        finally:
+            client.finished = True
+            await server.close()
+            await asyncio.gather(running, return_exceptions=True)
+
+    def test_client_state_matches_server(self):
+        game = Game(headless=True, input_source=lambda: [], physics_backend='numpy', swarm_size=100, seed=2)
+        stats, client, (kinds, positions, tank_pos, direction, shooting_power) = asyncio.run(self._serve(game))
+
+        self.assertEqual(client.latest_tick, game.tick)
+
+        objects = game.query_rect(game.camera.view_rect(NetFormat.relevance_margin))
+        self.assertGreater(len(objects), 0)
+        # positions are compared quantized, as they are sent
+        expected = quantize_positions(np.array([(ph_object.pos.x, ph_object.pos.y) for ph_object in objects]))
+        received = np.rint(positions * NetFormat.position_scale).astype(expected.dtype)
+        self.assertEqual(sorted(map(tuple, received.tolist())), sorted(map(tuple, expected.tolist())))
+        tolerance = 1 / NetFormat.position_scale
+        self.assertAlmostEqual(tank_pos[0], game.tank.pos.x, delta=tolerance)
+        self.assertAlmostEqual(tank_pos[1], game.tank.pos.y, delta=tolerance)
+
+        self.assertEqual(stats['clients'], 1)
+        client_stats = stats['per_client'][0]
+        self.assertGreater(client_stats['bytes_sent'], 0)
+        self.assertGreater(client_stats['encode_ms_per_state'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from cannon import Projectile
+from common import Vector
+from main import Game
+
+
+class SleepTest(unittest.TestCase):
+    """
+    Checks that projectiles spent on the floor settle and fall asleep on every physics backend,
+    and that spent projectiles are still retired
+    """
+    backends = ('python', 'numpy', 'ecs')
+    ticks = 1600
+
+    @staticmethod
+    def _shoot(backend, direction, bounces):
+        """
+        Shoots a projectile with it's bounces set, e.g. so it's spent by it's next bounce
+        :return: tuple (game, projectile)
+        """
+        game = Game(headless=True, input_source=lambda: [], seed=1, physics_backend=backend)
+        game.start()
+        for enemy in list(game.enemies):
+            enemy.destroy()
+        game.flush_destroyed()
+
+        game.tank.direction = direction
+        game.tank.shoot()
+        projectile, = game.tank._projectiles
+        projectile.bounces = bounces
+        return game, projectile
+
+    @staticmethod
+    def _shoot_down(backend):
+        """
+        Shoots a projectile down to the floor, it's spent by it's first bounce off the floor
+        """
+        return SleepTest._shoot(backend, Vector(0.9, 0.4), Projectile.max_bounces)
+
+    @staticmethod
+    def _run_until(game, condition):
+        for _ in range(SleepTest.ticks):
+            game.update()
+            if condition():
+                return True
+        return False
+
+    def test_projectile_falls_asleep_on_floor(self):
+        for backend in SleepTest.backends:
+            with self.subTest(backend=backend):
+                game, projectile = self._shoot_down(backend)
+                self.assertTrue(self._run_until(game, lambda: projectile.is_sleeping))
+
+                self.assertTrue(projectile.is_alive)
+                self.assertTrue(projectile.is_on_floor())
+                self.assertEqual(projectile.velocity.magnitude_squared(), 0)
+
+    def test_sleeping_projectile_isnt_moved(self):
+        game, projectile = self._shoot_down('python')
+        self._run_until(game, lambda: projectile.is_sleeping)
+
+        pos = tuple(projectile.pos)
+        for _ in range(10):
+            game.update()
+        self.assertEqual(tuple(projectile.pos), pos)
+
+    def test_settled_projectile_is_removed_after_rest_time(self):
+        for backend in SleepTest.backends:
+            with self.subTest(backend=backend):
+                game, projectile = self._shoot_down(backend)
+                self._run_until(game, lambda: projectile.is_sleeping)
+                settled_tick = game.tick
+
+                self.assertTrue(self._run_until(game, lambda: not projectile.is_alive))
+                self.assertAlmostEqual((game.tick - settled_tick) * game.dt, Projectile.max_rest_time, delta=0.1)
+                self.assertEqual(len(game.tank._projectiles), 0)
+
+    def test_spent_projectile_is_retired_in_air(self):
+        for backend in SleepTest.backends:
+            with self.subTest(backend=backend):
+                game, projectile = self._shoot(backend, Vector(0, -1), Projectile.max_bounces + 1)
+                game.update()
+                self.assertFalse(projectile.is_alive)
+                self.assertFalse(projectile.is_on_floor())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame as pg
+
+from main import Game
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    Checks that a restored game continues exactly as the saved one
+    """
+    ticks = 300
+
+    @staticmethod
+    def _game(backend):
+        game = Game(headless=True, input_source=lambda: [], physics_backend=backend, swarm_size=50,
+                    world_size=(2560, 1000), seed=3)
+        game.start()
+        return game
+
+    @staticmethod
+    def _play(game, start, ticks):
+        """
+        Plays ticks with the tank moving and shooting in turns
+        :return: state checksum after the last tick
+        """
+        for tick in range(start, start + ticks):
+            if tick % 20 == 0:
+                game.dispatch_event(pg.event.Event(pg.MOUSEMOTION, pos=(tick % 1280, 100 + tick % 300),
+                                                   rel=(0, 0), buttons=(0, 0, 0)))
+            elif tick % 20 == 1:
+                game.dispatch_event(pg.event.Event(pg.MOUSEBUTTONDOWN, pos=(0, 0), button=1))
+            elif tick % 20 == 15:
+                game.dispatch_event(pg.event.Event(pg.MOUSEBUTTONUP, pos=(0, 0), button=1))
+            if tick % 100 == 3:
+                game.dispatch_event(pg.event.Event(pg.KEYDOWN, key=pg.K_d, mod=0, unicode='d', scancode=7))
+            elif tick % 100 == 40:
+                game.dispatch_event(pg.event.Event(pg.KEYUP, key=pg.K_d, mod=0, unicode='d', scancode=7))
+            game.update()
+        return game.state_checksum()
+
+    def test_restored_game_continues_as_saved(self):
+        for backend in ('python', 'numpy', 'ecs'):
+            with self.subTest(backend=backend):
+                saved = self._game(backend)
+                self._play(saved, 0, SnapshotTest.ticks)
+                data = saved.snapshot()
+
+                restored = self._game(backend)
+                self._play(restored, 0, 50)
+                restored.restore(data)
+                self.assertEqual(restored.state_checksum(), saved.state_checksum())
+
+                expected = self._play(saved, SnapshotTest.ticks, SnapshotTest.ticks)
+                self.assertEqual(self._play(restored, SnapshotTest.ticks, SnapshotTest.ticks), expected)
+
+    def test_game_restored_after_it_went_on_continues_as_saved(self):
+        for backend in ('python', 'numpy', 'ecs'):
+            with self.subTest(backend=backend):
+                game = self._game(backend)
+                self._play(game, 0, SnapshotTest.ticks)
+                data = game.snapshot()
+                checksum = game.state_checksum()
+                expected = self._play(game, SnapshotTest.ticks, SnapshotTest.ticks)
+
+                # objects of the game and free projectiles are reused by the restore
+                game.restore(data)
+                self.assertEqual(game.state_checksum(), checksum)
+                self.assertEqual(self._play(game, SnapshotTest.ticks, SnapshotTest.ticks), expected)
+
+    def test_restore_keeps_projectile_pool_stats(self):
+        game = self._game('python')
+        self._play(game, 0, SnapshotTest.ticks)
+        pool = game.tank.projectile_pool
+        stats = pool.stats()
+
+        game.restore(game.snapshot())
+        self.assertEqual(pool.stats(), stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import math
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from main import Game
+from sweep import ScriptedShooter, run_session
+
+
+class ScriptedShooterTest(unittest.TestCase):
+    """
+    Checks that the scripted shooter points the cannon at it's targets
+    """
+
+    def test_cannon_points_at_aim(self):
+        shooter = ScriptedShooter()
+        game = Game(headless=True, input_source=shooter, seed=4)
+        shooter.game = game
+        game.start()
+
+        aims = 0
+        for _ in range(300):
+            previous_aim = shooter.aim_pos
+            game.step()
+            if shooter.aim_pos is None or shooter.aim_pos == previous_aim:
+                continue
+
+            aims += 1
+            tank = game.tank
+            x, y = game.camera.to_world(shooter.aim_pos)
+            expected = math.atan2(y - tank.pos.y, x - tank.pos.x)
+            self.assertAlmostEqual(math.atan2(tank.direction.y, tank.direction.x), expected, places=6)
+        self.assertGreater(aims, 2)
+
+    def test_session_hits_enemies(self):
+        row = run_session({}, seed=4, max_ticks=1500)
+        self.assertGreater(row['kills'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
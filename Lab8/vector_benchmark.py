@@ -0,0 +1,81 @@
+import time
+
+from common import Vector
+
+bodies = 1000
+frames = 50
+dt = 1 / 50
+gravity = Vector(0, 20)
+drag = 0.02
+
+
+def operator_frame(positions, velocities):
+    """
+    Simulates a frame of projectile motion with binary operators, the way it was done before in-place methods existed
+    """
+    for i in range(bodies):
+        velocity = velocities[i]
+        positions[i] = positions[i] + velocity * dt
+        velocities[i] = velocity + (gravity - velocity * drag) * dt
+
+
+def in_place_frame(positions, velocities):
+    """
+    Simulates the same frame with fused in-place methods
+    """
+    for i in range(bodies):
+        velocity = velocities[i]
+        positions[i].add_scaled(velocity, dt)
+        velocity.add_scaled(velocity, -drag * dt)
+        velocity.add_scaled(gravity, dt)
+
+
+def measure(frame_function):
+    """
+    Runs frame_function and measures its allocations and time
+    :param frame_function: (positions, velocities) -> None function that simulates a frame
+    :return: tuple (vectors allocated per frame, microseconds per frame)
+    """
+    positions = [Vector(i, 0) for i in range(bodies)]
+    velocities = [Vector(1, 1) for i in range(bodies)]
+
+    allocations = count_allocated_vectors(frame_function, positions, velocities)
+
+    start = time.perf_counter()
+    for i in range(frames):
+        frame_function(positions, velocities)
+    elapsed = (time.perf_counter() - start) / frames
+
+    return allocations, elapsed * 1e6
+
+
+def count_allocated_vectors(frame_function, positions, velocities):
+    """
+    Counts Vector objects created during one frame
+    """
+    created = 0
+    original_init = Vector.__init__
+
+    def counting_init(self, x, y):
+        nonlocal created
+        created += 1
+        original_init(self, x, y)
+
+    Vector.__init__ = counting_init
+    try:
+        frame_function(positions, velocities)
+    finally:
+        Vector.__init__ = original_init
+
+    return created
+
+
+def main():
+    print(f'{bodies} bodies, allocations and time per frame')
+    for name, frame_function in (('operators', operator_frame), ('in-place', in_place_frame)):
+        allocations, microseconds = measure(frame_function)
+        print(f'{name:>10}: {allocations:>6} vectors allocated, {microseconds:8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
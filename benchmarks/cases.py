@@ -0,0 +1,178 @@
+import random
+
+import pygame as pg
+
+from benchmarks import labs
+
+
+def _lab8_game(size, seed, physics_backend, headless=True):
+    """
+    Creates a Lab8 game with size physical objects spread over the field, one fifth of them enemies
+    :return: started game
+    """
+    main = labs.lab8()
+    from common import Vector
+    from cannon import Projectile
+    from enemy import Enemy
+
+    random.seed(seed)
+    game = main.Game(headless=headless, physics_backend=physics_backend, input_source=lambda: [], seed=seed)
+    game.start()
+    cannon = game.tank
+
+    min_x, max_x = game._x_border
+    min_y, max_y = game._y_border
+    for i in range(size):
+        pos = Vector(random.uniform(min_x + 25, max_x - 25), random.uniform(min_y + 25, max_y - 25))
+        if i % 5 == 0:
+            Enemy(pos, game)
+        else:
+            Projectile(pos, Vector.random_vector((50, 500)), game, cannon)
+
+    game.flush_destroyed()
+    return game
+
+
+def lab8_physics_python(size, seed):
+    game = _lab8_game(size, seed, 'python')
+    return lambda: game.step(1)
+
+
+def lab8_physics_numpy(size, seed):
+    game = _lab8_game(size, seed, 'numpy')
+    return lambda: game.step(1)
+
+
+def lab8_physics_ecs(size, seed):
+    game = _lab8_game(size, seed, 'ecs')
+    return lambda: game.step(1)
+
+
+def lab8_swarm_numpy(size, seed):
+    main = labs.lab8()
+    game = main.Game(headless=True, physics_backend='numpy', input_source=lambda: [], seed=seed, swarm_size=size)
+    game.start()
+    return lambda: game.step(1)
+
+
+def lab8_draw(size, seed):
+    game = _lab8_game(size, seed, 'python', headless=False)
+
+    def draw():
+        game.alpha = random.random()
+        game.update_display(game.draw())
+
+    return draw
+
+
+def lab8_draw_world(size, seed):
+    # density of enemies is constant, so the world is wider for bigger sizes and only it's part is visible
+    main = labs.lab8()
+    world_size = (1280 * max(1, size // 1000), 720)
+    game = main.Game(physics_backend='numpy', input_source=lambda: [], seed=seed, swarm_size=size,
+                     world_size=world_size, update_radius=1280)
+    game.start()
+
+    def draw():
+        game.alpha = random.random()
+        game.update_display(game.draw())
+
+    return draw
+
+
+def _lab8_swarm_game(size, seed):
+    """
+    Creates a Lab8 game with a swarm of size enemies on array physics backend
+    :return: game after 10 ticks
+    """
+    main = labs.lab8()
+    game = main.Game(headless=True, physics_backend='numpy', input_source=lambda: [], seed=seed, swarm_size=size)
+    game.step(10)
+    return game
+
+
+def lab8_snapshot(size, seed):
+    game = _lab8_swarm_game(size, seed)
+    return game.snapshot
+
+
+def lab8_restore(size, seed):
+    game = _lab8_swarm_game(size, seed)
+    data = game.snapshot()
+    return lambda: game.restore(data)
+
+
+def lab8_net_delta(size, seed):
+    game = _lab8_swarm_game(size, seed)
+    import network
+
+    server = network.GameServer(game)
+    base = server.capture()
+    game.step(1)
+    frame = server.capture()
+
+    def send():
+        data = network.encode_state(frame, base)
+        network.decode_state(memoryview(data)[network.NetFormat.length.size + network.NetFormat.tag.size:],
+                             {base.tick: base})
+
+    return send
+
+
+def vector_add_scaled(size, seed):
+    labs.lab8()
+    from common import Vector
+
+    random.seed(seed)
+    positions = [Vector(random.random(), random.random()) for i in range(size)]
+    velocities = [Vector(random.random(), random.random()) for i in range(size)]
+
+    def move():
+        for pos, velocity in zip(positions, velocities):
+            pos.add_scaled(velocity, 0.02)
+
+    return move
+
+
+def lab6_draw_frame(size, seed):
+    lab6 = labs.load_file('Lab6', 'main.py', 'lab6_main')
+
+    random.seed(seed)
+    pg.init()
+    lab6.FONT = pg.font.Font(None, 46)
+    screen = pg.display.set_mode((1200, 900))
+    balls = [lab6.new_ball() for i in range((size + 1) // 2)]
+    polygons = [lab6.new_polygon() for i in range(size // 2)]
+
+    return lambda: lab6.draw_frame(screen, balls, polygons, 50)
+
+
+def lab4_draw_bush(size, seed):
+    lab4 = labs.load_file('Lab4', 'Ex2.py', 'lab4_ex2')
+
+    pg.init()
+    screen = pg.display.set_mode((500, 800))
+
+    def draw_bushes():
+        random.seed(seed)
+        for i in range(size):
+            lab4.draw_bush(screen, lab4.colors, random.randint(0, 400), random.randint(300, 700), 0.3)
+
+    return draw_bushes
+
+
+# name: (setup function, sizes). Setup function takes (size, seed) and returns a function to time
+cases = {
+    'lab8_physics_python': (lab8_physics_python, (10, 100, 1000, 10000)),
+    'lab8_physics_numpy': (lab8_physics_numpy, (10, 100, 1000, 10000, 100000)),
+    'lab8_physics_ecs': (lab8_physics_ecs, (10, 100, 1000, 10000)),
+    'lab8_swarm_numpy': (lab8_swarm_numpy, (100, 1000, 10000, 50000)),
+    'lab8_draw': (lab8_draw, (10, 100, 1000, 10000)),
+    'lab8_draw_world': (lab8_draw_world, (1000, 10000, 50000)),
+    'lab8_snapshot': (lab8_snapshot, (1000, 10000)),
+    'lab8_restore': (lab8_restore, (1000, 10000)),
+    'lab8_net_delta': (lab8_net_delta, (1000, 10000)),
+    'vector_add_scaled': (vector_add_scaled, (1000, 10000, 100000)),
+    'lab6_draw_frame': (lab6_draw_frame, (1, 10, 100, 1000)),
+    'lab4_draw_bush': (lab4_draw_bush, (1, 10, 100, 1000)),
+}
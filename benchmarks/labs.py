@@ -0,0 +1,49 @@
+import importlib
+import importlib.util
+import os
+import sys
+
+repository_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_dummy_drivers():
+    """
+    Makes SDL work without a display and sound card. Must be called before pygame is initialized
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+
+def _add_to_path(lab):
+    lab_path = os.path.join(repository_root, lab)
+    if lab_path not in sys.path:
+        sys.path.insert(0, lab_path)
+    return lab_path
+
+
+def lab8():
+    """
+    Imports Lab8 main module. Lab8 modules import each other by plain names, so its directory is added to sys.path
+    :return: Lab8 main module
+    """
+    _add_to_path('Lab8')
+    return importlib.import_module('main')
+
+
+def load_file(lab, file_name, module_name):
+    """
+    Imports a lab file under a unique module name, so files with equal names in different labs don't clash
+    :param lab: directory of the lab
+    :param file_name: name of the file in the lab directory
+    :param module_name: name to import the file as
+    :return: module
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    lab_path = _add_to_path(lab)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(lab_path, file_name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
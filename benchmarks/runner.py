@@ -0,0 +1,135 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks import labs
+
+default_seed = 2020
+default_threshold = 0.1
+
+
+def calls_per_measurement(size):
+    """
+    Returns how many times a case function is called in one measurement. It depends only on size, so every run
+    does the same work and results of different commits can be compared
+    :param size: size of the case
+    :return: number of calls
+    """
+    return max(1, min(100, 10000 // size))
+
+
+def time_case(setup, size, seed, repeats):
+    """
+    Measures how long a call of case function takes. Every measurement starts from a freshly created state
+    :param setup: (size, seed) -> function that prepares the case and returns a function to time
+    :param size: size of the case
+    :param seed: seed of random generators
+    :param repeats: number of measurements
+    :return: dictionary with median and minimal seconds per call
+    """
+    calls = calls_per_measurement(size)
+    timings = []
+    for i in range(repeats):
+        function = setup(size, seed)
+        function()  # warm-up
+
+        start = time.perf_counter()
+        for j in range(calls):
+            function()
+        timings.append((time.perf_counter() - start) / calls)
+
+    return {'median': statistics.median(timings), 'min': min(timings), 'calls': calls}
+
+
+def run(case_names=None, max_size=None, repeats=5, seed=default_seed):
+    """
+    Runs benchmark cases
+    :param case_names: names of cases to run, all cases if None
+    :param max_size: cases with bigger sizes are skipped
+    :param repeats: number of measurements of every case and size
+    :param seed: seed of random generators
+    :return: dictionary with results that can be saved as JSON
+    """
+    labs.use_dummy_drivers()
+    from benchmarks.cases import cases
+
+    results = {}
+    for name, (setup, sizes) in cases.items():
+        if case_names and name not in case_names:
+            continue
+        results[name] = {}
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            timing = time_case(setup, size, seed, repeats)
+            results[name][str(size)] = timing
+            print(f'{name:>22} {size:>7}: {timing["median"] * 1000:10.3f} ms', flush=True)
+
+    return {'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'seed': seed,
+                     'repeats': repeats, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results}
+
+
+def compare(old, new, threshold=default_threshold):
+    """
+    Compares two benchmark results
+    :param old: results of the baseline
+    :param new: results to check
+    :param threshold: relative slowdown that is considered a regression
+    :return: list of (case name, size, old seconds, new seconds, ratio, is regression) tuples
+    """
+    rows = []
+    for name, sizes in new['results'].items():
+        for size, timing in sizes.items():
+            old_timing = old['results'].get(name, {}).get(size)
+            if old_timing is None:
+                continue
+            ratio = timing['median'] / old_timing['median']
+            rows.append((name, size, old_timing['median'], timing['median'], ratio, ratio > 1 + threshold))
+
+    return rows
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks of the labs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run benchmarks and save results as JSON')
+    run_parser.add_argument('-o', '--output', default='benchmark_results.json')
+    run_parser.add_argument('-c', '--case', action='append', help='case to run, can be repeated')
+    run_parser.add_argument('--max-size', type=int)
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=default_seed)
+
+    compare_parser = commands.add_parser('compare', help='compare two results and flag regressions')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=default_threshold)
+
+    arguments = parser.parse_args(arguments)
+
+    if arguments.command == 'run':
+        results = run(arguments.case, arguments.max_size, arguments.repeats, arguments.seed)
+        with open(arguments.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        return 0
+
+    with open(arguments.old) as f:
+        old = json.load(f)
+    with open(arguments.new) as f:
+        new = json.load(f)
+
+    regressions = 0
+    for name, size, old_time, new_time, ratio, is_regression in compare(old, new, arguments.threshold):
+        mark = 'REGRESSION' if is_regression else ''
+        print(f'{name:>22} {size:>7}: {old_time * 1000:10.3f} ms -> {new_time * 1000:10.3f} ms  x{ratio:5.2f} {mark}')
+        regressions += is_regression
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())